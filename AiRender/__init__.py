@@ -13,12 +13,42 @@ import sys
 import importlib
 
 # Ensure the package is reloadable
+if "AiRender.tracing" in sys.modules:
+    importlib.reload(sys.modules["AiRender.tracing"])
+if "AiRender.metrics" in sys.modules:
+    importlib.reload(sys.modules["AiRender.metrics"])
 if "AiRender.props" in sys.modules:
     importlib.reload(sys.modules["AiRender.props"])
 if "AiRender.utils" in sys.modules:
     importlib.reload(sys.modules["AiRender.utils"])
+if "AiRender.imaging" in sys.modules:
+    importlib.reload(sys.modules["AiRender.imaging"])
+if "AiRender.tiling" in sys.modules:
+    importlib.reload(sys.modules["AiRender.tiling"])
+if "AiRender.capture" in sys.modules:
+    importlib.reload(sys.modules["AiRender.capture"])
+if "AiRender.preprocess" in sys.modules:
+    importlib.reload(sys.modules["AiRender.preprocess"])
+if "AiRender.cache" in sys.modules:
+    importlib.reload(sys.modules["AiRender.cache"])
+if "AiRender.scheduler" in sys.modules:
+    importlib.reload(sys.modules["AiRender.scheduler"])
+if "AiRender.backends" in sys.modules:
+    importlib.reload(sys.modules["AiRender.backends"])
+if "AiRender.ratelimit" in sys.modules:
+    importlib.reload(sys.modules["AiRender.ratelimit"])
 if "AiRender.client" in sys.modules:
     importlib.reload(sys.modules["AiRender.client"])
+if "AiRender.async_queue" in sys.modules:
+    importlib.reload(sys.modules["AiRender.async_queue"])
+if "AiRender.variations" in sys.modules:
+    importlib.reload(sys.modules["AiRender.variations"])
+if "AiRender.changes" in sys.modules:
+    importlib.reload(sys.modules["AiRender.changes"])
+if "AiRender.live" in sys.modules:
+    importlib.reload(sys.modules["AiRender.live"])
+if "AiRender.pipeline" in sys.modules:
+    importlib.reload(sys.modules["AiRender.pipeline"])
 if "AiRender.operators" in sys.modules:
     importlib.reload(sys.modules["AiRender.operators"])
 if "AiRender.ui" in sys.modules:
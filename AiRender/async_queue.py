@@ -0,0 +1,338 @@
+import asyncio
+import functools
+import json
+import ssl
+import threading
+import time
+import urllib.parse
+
+from . import backends
+from . import client
+from . import ratelimit
+from . import scheduler
+
+# Status polling backoff (seconds)
+POLL_INITIAL = 0.25
+POLL_FACTOR = 1.5
+POLL_MAX = 4.0
+
+# Give up on a queued request after this long
+QUEUE_TIMEOUT = 600
+
+# How often a request waiting for an in-flight slot checks again (seconds)
+SLOT_POLL = 0.05
+
+async def _with_timeout(awaitable, timeout):
+    """
+    asyncio.wait_for, except that a cancel arriving just as the awaitable
+    finishes is not lost: wait_for then returns the result instead (before
+    Python 3.12), and a cancelled request would carry on polling.
+    """
+    if not hasattr(asyncio, "timeout"):
+        return await asyncio.wait_for(awaitable, timeout)
+    async with asyncio.timeout(timeout):
+        return await awaitable
+
+class ConnectionPool:
+    """
+    Keep-alive connections for the event loop, at most max_idle_per_host idle
+    ones per (scheme, host, port), all sharing one SSL context, so status
+    polls skip the TCP/TLS handshake. Only used from the loop's thread.
+    """
+    def __init__(self, ssl_context=None, max_idle_per_host=client.MAX_IDLE_PER_HOST):
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.max_idle_per_host = max_idle_per_host
+        self._idle = {}
+        self.stats = {"new_connections": 0, "reused_connections": 0}
+
+    async def request(self, method, url, body=None, headers=None, timeout=60):
+        """
+        Minimal HTTP/1.1 request. Returns (status, headers, body bytes);
+        header names are lower-cased. The body may be bytes or an iterable
+        of byte chunks (e.g. StreamingImageBody).
+        """
+        parts = urllib.parse.urlsplit(url)
+        https = parts.scheme == "https"
+        key = (parts.scheme, parts.hostname, parts.port or (443 if https else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        headers = dict(headers or {})
+        headers.setdefault("Host", parts.netloc)
+        if body is not None and "Content-Length" not in headers:
+            headers["Content-Length"] = str(len(body))
+        head = f"{method} {path} HTTP/1.1\r\n"
+        head += "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        head = head.encode('latin-1') + b"\r\n"
+
+        while True:
+            idle = self._idle.get(key)
+            reused = bool(idle)
+            if reused:
+                reader, writer = idle.pop()
+                self.stats["reused_connections"] += 1
+            else:
+                reader, writer = await _with_timeout(
+                    asyncio.open_connection(key[1], key[2], ssl=self.ssl_context if https else None), timeout
+                )
+                self.stats["new_connections"] += 1
+            try:
+                writer.write(head)
+                if isinstance(body, (bytes, bytearray)):
+                    writer.write(body)
+                elif body is not None:
+                    for chunk in body:
+                        writer.write(chunk)
+                        await writer.drain()
+                await writer.drain()
+                status, response_headers, data = await _with_timeout(_read_response(reader), timeout)
+            except asyncio.TimeoutError:
+                writer.close()
+                raise
+            except (OSError, EOFError):
+                writer.close()
+                if reused and client._is_replayable(body):
+                    # The server dropped an idle keep-alive connection, retry on a fresh one
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+
+            # Bodies read up to EOF leave nothing to reuse
+            framed = "content-length" in response_headers or "transfer-encoding" in response_headers
+            idle = self._idle.setdefault(key, [])
+            if framed and response_headers.get("connection", "").lower() != "close" \
+                    and len(idle) < self.max_idle_per_host:
+                idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, response_headers, data
+
+    def close(self):
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for _, writer in connections:
+                writer.close()
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed connection without response")
+    status = int(status_line.split()[1])
+
+    response_headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode('latin-1').partition(":")
+        response_headers[key.strip().lower()] = value.strip()
+
+    if response_headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        data = b"".join(chunks)
+    elif "content-length" in response_headers:
+        data = await reader.readexactly(int(response_headers["content-length"]))
+    else:
+        data = await reader.read()
+    return status, response_headers, data
+
+def _api_error(message, status, headers):
+    return client.APIError(message, status, client.parse_retry_after(headers.get("retry-after")))
+
+class QueueClient:
+    """
+    Submits generations to Fal's queue API and polls all of them from one
+    asyncio event loop on a background thread, so dozens of requests can
+    be in flight without an OS thread each. Each one holds a slot of the
+    scheduler's in-flight limit (the scene's Max In Flight) while it runs,
+    like a sync request, unless the client has its own max_in_flight.
+    """
+    def __init__(self, max_in_flight=None, ssl_context=None):
+        self._in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self._pool = ConnectionPool(ssl_context)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="AIRenderQueueLoop", daemon=True)
+        self._thread.start()
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "polls": 0}
+
+    def submit(self, api_key, prompt, image_url=None, width=1920, height=1080, image_path=None, endpoint=None, progress=None, image_bytes=None, mime_type=None, seed=None,
+               backend=None, strength=None, retry_policy=None):
+        """
+        Queues a generation. Returns a concurrent.futures.Future resolving to the image URL.
+        backend is a Backend (or name) as returned by client.choose_backend.
+        A submit that fails with a retryable error is sent again per
+        retry_policy, as in client.send_api_request.
+        """
+        if not isinstance(backend, backends.Backend):
+            backend = backends.get_backend(backend)
+        if backend.local:
+            # Nothing to queue remotely; run it off the loop and resolve the same way
+            generate = functools.partial(
+                client.send_api_request, api_key, prompt, image_url, strength, width, height, image_path=image_path,
+                progress=progress, image_bytes=image_bytes, seed=seed, backend=backend
+            )
+            return asyncio.run_coroutine_threadsafe(self._run_local(generate), self._loop)
+        sync_endpoint, headers, data = client.build_request(api_key, prompt, image_url, width, height, image_path, image_bytes, mime_type, seed,
+                                                            backend, strength)
+        queue_endpoint = endpoint or client.to_queue_endpoint(sync_endpoint)
+        coro = self._run(api_key, queue_endpoint, headers, data, progress, backend, retry_policy or client.RetryPolicy())
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _run_local(self, generate):
+        self.stats["submitted"] += 1
+        result = await self._loop.run_in_executor(None, generate)
+        self.stats["completed"] += 1
+        return result
+
+    async def _acquire_lease(self, api_key):
+        """
+        Waits for a rate limiter slot on the loop itself, so waiting requests
+        hold no thread. Cancelling while waiting leaves nothing to hand back.
+        """
+        started = time.monotonic()
+        while True:
+            lease, wait = ratelimit.try_acquire(api_key, started)
+            if lease is not None:
+                return lease
+            await asyncio.sleep(wait)
+
+    async def _acquire_slot(self):
+        """
+        Takes an in-flight slot by polling from the loop, so waiting requests
+        hold no thread. Returns the semaphore to release, which may have been
+        replaced by the time the request finishes.
+        """
+        while True:
+            semaphore = self._in_flight or scheduler.get_scheduler().in_flight
+            if semaphore.acquire(blocking=False):
+                return semaphore
+            await asyncio.sleep(SLOT_POLL)
+
+    async def _run(self, api_key, endpoint, headers, data, progress, backend, policy):
+        semaphore = await self._acquire_slot()
+        try:
+            for attempt in range(policy.attempts):
+                handle = None
+                try:
+                    # The key stays leased until the queued generation has finished. A 429
+                    # leaving this block pauses the key for its Retry-After, as for sync requests
+                    with await self._acquire_lease(api_key) as lease:
+                        key_headers = dict(headers, Authorization=f"Key {lease.key}")
+                        handle = await self._submit(endpoint, key_headers, data, progress)
+                        result = await self._wait(handle, {"Authorization": key_headers["Authorization"]}, lease)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Once Fal has the request, sending it again would run (and bill) it twice
+                    if handle is not None or attempt == policy.attempts - 1 or not client.is_retryable(e):
+                        self.stats["failed"] += 1
+                        raise
+                    delay = policy.delay(attempt)
+                    print(f"Queue submit failed ({e}); retry {attempt + 1}/{policy.attempts - 1} in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+        finally:
+            semaphore.release()
+
+        self.stats["completed"] += 1
+        return client.parse_result(result, backend)
+
+    async def _submit(self, endpoint, headers, data, progress):
+        self.stats["submitted"] += 1
+        if progress:
+            progress("UPLOADING")
+        status, response_headers, body = await self._pool.request("POST", endpoint, data, headers)
+        if status >= 400:
+            raise _api_error(f"Fal.ai Error: {status}", status, response_headers)
+        if progress:
+            progress("GENERATING")
+        return json.loads(body.decode('utf-8'))
+
+    async def _wait(self, handle, auth, lease):
+        try:
+            return await self._poll(handle, auth, lease)
+        except asyncio.CancelledError:
+            # Tell Fal to drop the request; don't wait long for it
+            cancel_url = handle.get("cancel_url")
+            if cancel_url:
+                try:
+                    await _with_timeout(self._pool.request("PUT", cancel_url, b"", auth), 5)
+                except Exception:
+                    pass
+            raise
+
+    async def _poll(self, handle, auth, lease):
+        deadline = time.monotonic() + QUEUE_TIMEOUT
+        delay = POLL_INITIAL
+        while True:
+            body = await self._get(handle["status_url"], auth, lease, deadline)
+            state = json.loads(body.decode('utf-8')).get("status")
+            if state == "COMPLETED":
+                break
+            if state not in ("IN_QUEUE", "IN_PROGRESS"):
+                raise RuntimeError(f"Fal.ai request failed: {state}")
+            if time.monotonic() >= deadline:
+                raise RuntimeError("Queued request timed out")
+            await asyncio.sleep(delay)
+            delay = min(delay * POLL_FACTOR, POLL_MAX)
+
+        body = await self._get(handle["response_url"], auth, lease, deadline)
+        return json.loads(body.decode('utf-8'))
+
+    async def _get(self, url, auth, lease, deadline):
+        """
+        GET for a status poll or the result. Rate limiting, server errors and
+        network failures are retried in place until the deadline; a 429
+        also pauses the key for its Retry-After.
+        """
+        delay = POLL_INITIAL
+        while True:
+            try:
+                status, headers, body = await self._pool.request("GET", url, None, auth)
+            except (OSError, EOFError, asyncio.TimeoutError) as e:
+                error = e
+            else:
+                self.stats["polls"] += 1
+                if status < 400:
+                    return body
+                error = _api_error(f"Fal.ai status error: {status}", status, headers)
+                if not client.is_retryable(error):
+                    raise error
+            if time.monotonic() >= deadline:
+                raise error
+            wait = delay
+            if getattr(error, "status", None) == 429:
+                lease.throttle(error.retry_after)
+                wait = max(wait, ratelimit.THROTTLE_PAUSE if error.retry_after is None else error.retry_after)
+            await asyncio.sleep(wait)
+            delay = min(delay * POLL_FACTOR, POLL_MAX)
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._pool.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+_queue_client = None
+_queue_client_lock = threading.Lock()
+
+def get_queue_client():
+    global _queue_client
+    with _queue_client_lock:
+        if _queue_client is None:
+            _queue_client = QueueClient()
+        return _queue_client
+
+def close_queue_client():
+    global _queue_client
+    with _queue_client_lock:
+        if _queue_client is not None:
+            _queue_client.close()
+            _queue_client = None
@@ -0,0 +1,190 @@
+import base64
+import hashlib
+
+from . import imaging
+
+# Used when a request names no backend
+DEFAULT_BACKEND = "nano-banana-pro"
+
+class Backend:
+    """
+    One generation model: where text-to-image and image-to-image requests go,
+    how their JSON payload is built and how the result URL is read back.
+
+    endpoint / edit_endpoint of None mean the client's MODEL_ENDPOINT /
+    EDIT_ENDPOINT, which farm manifests and the benchmarks override.
+    max_side caps the requested width and height; larger requests are routed
+    elsewhere. nominal_latency stands in for measured latency until the
+    router has samples. fallbacks names faster backends the router may use
+    when this one is slow or failing.
+    """
+    name = None
+    label = None
+    description = ""
+    endpoint = None
+    edit_endpoint = None
+    supports_image = True
+    max_side = None
+    nominal_latency = 10.0
+    fallbacks = ()
+    # Answered in-process; no HTTP, API key or rate limiter involved
+    local = False
+
+    def supports(self, has_image, width, height):
+        if has_image and not self.supports_image:
+            return False
+        return self.max_side is None or max(width, height) <= self.max_side
+
+    def build_payload(self, prompt, width, height, image_url=None, strength=None, seed=None):
+        raise NotImplementedError
+
+    def parse_result(self, result):
+        """
+        Extracts the image URL from the Fal.ai response.
+        """
+        # Check if result is directly an image object or list
+        if "images" in result and len(result["images"]) > 0:
+            return result["images"][0]["url"]
+
+        # Handle queued or other formats if needed (Nano Banana usually returns fast)
+        if "image" in result: # Some endpoints
+            return result["image"]["url"]
+
+        raise RuntimeError("No image found in API response")
+
+class NanoBananaPro(Backend):
+    name = "nano-banana-pro"
+    label = "Nano Banana Pro"
+    description = "Google Nano Banana Pro; image-to-image goes to the Nano Banana edit endpoint"
+    nominal_latency = 20.0
+    fallbacks = ("flux-schnell",)
+
+    def build_payload(self, prompt, width, height, image_url=None, strength=None, seed=None):
+        # The edit endpoint takes no strength; the prompt alone steers how far it departs
+        payload = {
+            "prompt": prompt,
+            "image_size": {
+                "width": width,
+                "height": height
+            },
+            "num_inference_steps": 30
+        }
+        if seed is not None:
+            payload["seed"] = seed
+        if image_url:
+            # The edit endpoint expects 'image_urls' for the base image
+            payload["image_urls"] = [image_url]
+            payload["sync_mode"] = True # Recommended for edit endpoint
+        return payload
+
+class FluxSchnell(Backend):
+    name = "flux-schnell"
+    label = "FLUX.1 Schnell"
+    description = "Few-step FLUX.1 [schnell]; image-to-image runs FLUX.1 [dev] with the scene's strength"
+    endpoint = "https://fal.run/fal-ai/flux/schnell"
+    edit_endpoint = "https://fal.run/fal-ai/flux/dev/image-to-image"
+    max_side = 2048
+    nominal_latency = 4.0
+
+    def build_payload(self, prompt, width, height, image_url=None, strength=None, seed=None):
+        payload = {
+            "prompt": prompt,
+            "image_size": {"width": width, "height": height},
+            "num_inference_steps": 12 if image_url else 4,
+            "sync_mode": True,
+        }
+        if seed is not None:
+            payload["seed"] = seed
+        if image_url:
+            payload["image_url"] = image_url
+            if strength is not None:
+                payload["strength"] = strength
+        return payload
+
+class LocalStandIn(Backend):
+    """
+    Deterministic offline stand-in: the same prompt, seed, size and init
+    image always give the same image. It blends a pattern derived from the
+    prompt into the init image by `strength`, and answers with a PNG data
+    URI straight away. Meant for testing the pipeline without a network
+    or API key.
+    """
+    name = "local"
+    label = "Local Stand-in"
+    description = "Offline deterministic placeholder images for testing; no requests are sent"
+    endpoint = "local://stand-in"
+    edit_endpoint = "local://stand-in/edit"
+    nominal_latency = 0.1
+    local = True
+
+    def build_payload(self, prompt, width, height, image_url=None, strength=None, seed=None):
+        payload = {"prompt": prompt, "image_size": {"width": width, "height": height}, "seed": seed}
+        if image_url:
+            payload["image_url"] = image_url
+            payload["strength"] = strength
+        return payload
+
+    def generate(self, payload, image_bytes=None):
+        """
+        Returns the result as a PNG data URI.
+        """
+        import numpy as np
+
+        width, height = payload["image_size"]["width"], payload["image_size"]["height"]
+        digest = hashlib.sha256(repr((payload["prompt"], payload.get("seed"))).encode('utf-8')).digest()
+        colors = np.frombuffer(digest[:12], dtype=np.uint8).reshape(4, 3).astype(np.float32)
+        u = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :, None]
+        v = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+        # Bilinear blend of four prompt-derived corner colours
+        pixels = ((1 - u) * (1 - v) * colors[0] + u * (1 - v) * colors[1]
+                  + (1 - u) * v * colors[2] + u * v * colors[3])
+
+        init = None
+        if image_bytes is not None:
+            try:
+                init = imaging.decode_png(image_bytes)
+            except ValueError:
+                pass # JPEG / WebP uploads: the pattern alone is still deterministic
+        if init is not None:
+            init = imaging.resize_area(imaging.float_to_uint8(init[:, :, :3]), width, height)
+            strength = payload.get("strength")
+            strength = 0.75 if strength is None else strength
+            pixels = init.astype(np.float32) * (1.0 - strength) + pixels * strength
+
+        png = imaging.encode_png((pixels + 0.5).clip(0, 255).astype(np.uint8), 1)
+        return "data:image/png;base64," + base64.b64encode(png).decode('ascii')
+
+_backends = {}
+
+def register(backend):
+    """
+    Adds a Backend instance to the registry, replacing one of the same name.
+    """
+    _backends[backend.name] = backend
+    return backend
+
+def get_backend(name=None):
+    """
+    The backend registered as `name` (the default backend for None).
+    """
+    name = name or DEFAULT_BACKEND
+    if name not in _backends:
+        raise RuntimeError(f"Unknown backend: {name}")
+    return _backends[name]
+
+def all_backends():
+    return list(_backends.values())
+
+# Blender needs the strings of dynamic enum items kept alive on the Python side
+_enum_items = []
+
+def enum_items(self=None, context=None):
+    """
+    Items for the scene's backend EnumProperty.
+    """
+    _enum_items[:] = [(b.name, b.label, b.description) for b in _backends.values()]
+    return _enum_items
+
+register(NanoBananaPro())
+register(FluxSchnell())
+register(LocalStandIn())
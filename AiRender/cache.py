@@ -0,0 +1,154 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+CACHE_DIR_NAME = "ai_render_cache"
+CACHE_SUFFIX = ".img"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+def get_cache_dir():
+    return os.path.join(tempfile.gettempdir(), CACHE_DIR_NAME)
+
+def make_key(endpoint, prompt, image, strength, width, height, seed=None):
+    """
+    Content hash of everything that determines a generation result.
+    The input capture (a file path or encoded bytes) is hashed by content.
+    """
+    h = hashlib.sha256()
+    parts = [endpoint, prompt, f"{strength:.4f}", f"{width}x{height}"]
+    if seed is not None:
+        # Unseeded keys stay as they were so existing cache entries still hit
+        parts.append(f"seed={seed}")
+    for part in parts:
+        h.update(part.encode('utf-8'))
+        h.update(b"\0")
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        h.update(image)
+    elif image:
+        with open(image, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+class ResultCache:
+    """
+    On-disk, content-addressed store of generated images with an LRU size cap.
+    Entries are written via rename so several Blender processes can share
+    the directory; file mtime doubles as the LRU timestamp.
+    """
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or get_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """
+        Returns the cached file path for key, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            os.utime(path) # Mark as recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, key, source_path):
+        """
+        Copies source_path into the cache under key and enforces the size cap.
+        """
+        with open(source_path, "rb") as in_file:
+            return self._write(key, lambda out_file: shutil.copyfileobj(in_file, out_file))
+
+    def put_bytes(self, key, data):
+        """
+        Stores an in-memory result under key and enforces the size cap.
+        """
+        return self._write(key, lambda out_file: out_file.write(data))
+
+    def _write(self, key, write):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out_file:
+                write(out_file)
+                out_file.flush()
+                os.fsync(out_file.fileno())
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+        return self._path(key)
+
+    def _entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue # Evicted by another process
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache fits max_bytes.
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+_cache = None
+
+def get_cache(max_bytes=None):
+    """
+    Returns the shared ResultCache, applying a new size cap if given.
+    """
+    global _cache
+    if _cache is None:
+        _cache = ResultCache()
+    if max_bytes is not None:
+        _cache.max_bytes = max_bytes
+    return _cache
@@ -0,0 +1,138 @@
+import bpy
+import os
+
+from . import utils
+
+# Capture modes (scene.ai_capture_mode)
+CAPTURE_FULL = 'FULL'
+CAPTURE_REDUCED = 'REDUCED'
+CAPTURE_VIEWPORT = 'VIEWPORT'
+
+# Cycles sample cap for reduced captures; the image is only guidance
+REDUCED_CYCLES_SAMPLES = 16
+
+class Capture:
+    """
+    Init image for a request: a file on disk, encoded bytes in memory, or raw
+    (H, W, C) uint8 pixels that still need encoding (see preprocess).
+    """
+    def __init__(self, path=None, data=None, mime_type="image/png", pixels=None):
+        self.path = path
+        self.data = data
+        self.mime_type = mime_type
+        self.pixels = pixels
+        # Set by the change detector (changes.perceptual_hash) when enabled
+        self.perceptual_hash = None
+
+    @property
+    def source(self):
+        """
+        What the cache hashes and the client streams: the bytes, or the file path.
+        """
+        return self.data if self.data is not None else self.path
+
+    def request_kwargs(self):
+        return {"image_path": self.path, "image_bytes": self.data, "mime_type": self.mime_type}
+
+    def cleanup(self):
+        self.data = None
+        self.pixels = None
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+def capture_scene(context, mode, scale_percent, path):
+    """
+    Captures the active camera's view. `path` is only written for the render
+    engine modes; the viewport mode stays in memory.
+    """
+    if mode == CAPTURE_VIEWPORT:
+        return Capture(pixels=_capture_viewport(context, scale_percent))
+    if mode == CAPTURE_REDUCED:
+        return _capture_render(context.scene, path, scale_percent, REDUCED_CYCLES_SAMPLES)
+    return _capture_render(context.scene, path, 100, None)
+
+def _capture_render(scene, path, scale_percent, max_samples):
+    """
+    F12 render with the scene's engine. Blender's Python API only exposes the
+    Render Result through a file, so this mode still writes one.
+    """
+    render = scene.render
+    saved = (render.filepath, render.image_settings.file_format, render.resolution_percentage)
+    cycles = getattr(scene, "cycles", None) if render.engine == 'CYCLES' else None
+    saved_samples = cycles.samples if cycles else None
+    try:
+        render.filepath = path
+        render.image_settings.file_format = 'PNG'
+        render.resolution_percentage = scale_percent
+        if cycles and max_samples:
+            cycles.samples = min(cycles.samples, max_samples)
+        # Render frame - This is blocking UI, which is fine for local render
+        bpy.ops.render.render(write_still=True)
+    finally:
+        render.filepath, render.image_settings.file_format, render.resolution_percentage = saved
+        if cycles:
+            cycles.samples = saved_samples
+    return Capture(path=path)
+
+def _find_view3d(context):
+    for area in context.screen.areas:
+        if area.type != 'VIEW_3D':
+            continue
+        region = next((r for r in area.regions if r.type == 'WINDOW'), None)
+        if region:
+            return area.spaces.active, region
+    return None, None
+
+def _capture_viewport(context, scale_percent):
+    """
+    Draws the camera view with the viewport renderer into an offscreen buffer
+    and returns it as an (H, W, 3) uint8 array, top row first.
+    """
+    import gpu
+    import numpy as np
+
+    scene = context.scene
+    width = max(1, scene.render.resolution_x * scale_percent // 100)
+    height = max(1, scene.render.resolution_y * scale_percent // 100)
+
+    space, region = _find_view3d(context)
+    if space is None:
+        raise RuntimeError("Viewport capture needs an open 3D Viewport")
+
+    cam = scene.camera
+    depsgraph = context.evaluated_depsgraph_get()
+    view_matrix = cam.matrix_world.inverted()
+    projection_matrix = cam.calc_matrix_camera(depsgraph, x=width, y=height)
+
+    # Keep previous results (of any camera) and gizmos out of the capture
+    planes = utils.overlay_planes()
+    planes_hidden = [plane.hide_viewport for plane in planes]
+    show_overlays = space.overlay.show_overlays
+    offscreen = gpu.types.GPUOffScreen(width, height)
+    try:
+        if planes:
+            for plane in planes:
+                plane.hide_viewport = True
+            context.view_layer.update()
+        space.overlay.show_overlays = False
+        with offscreen.bind():
+            framebuffer = gpu.state.active_framebuffer_get()
+            framebuffer.clear(color=(0.0, 0.0, 0.0, 1.0))
+            offscreen.draw_view3d(
+                scene, context.view_layer, space, region,
+                view_matrix, projection_matrix, do_color_management=True
+            )
+            buffer = framebuffer.read_color(0, 0, width, height, 4, 0, 'UBYTE')
+    finally:
+        offscreen.free()
+        space.overlay.show_overlays = show_overlays
+        for plane, hidden in zip(planes, planes_hidden):
+            plane.hide_viewport = hidden
+
+    buffer.dimensions = width * height * 4
+    # GPU rows are bottom-up; PNG wants top row first
+    pixels = np.asarray(buffer, dtype=np.uint8).reshape(height, width, 4)[::-1, :, :3]
+    return np.ascontiguousarray(pixels)
@@ -0,0 +1,139 @@
+import bpy
+import hashlib
+
+from . import imaging
+from . import utils
+from . import variations
+
+# Perceptual hash grid: HASH_SIZE x HASH_SIZE RGB cells
+HASH_SIZE = 32
+
+# Datablocks the addon itself writes; their updates never mean the scene changed
+OWN_PREFIXES = (
+    utils.OVERLAY_PLANE_NAME,
+    utils.OVERLAY_MAT_NAME,
+    utils.OVERLAY_IMAGE_NAME,
+    utils.OVERLAY_HISTORY_PREFIX,
+    variations.SHEET_IMAGE_NAME,
+)
+
+def perceptual_hash(pixels):
+    """
+    Block-mean hash of an (H, W, C) uint8 image: the image box-filtered down
+    to HASH_SIZE x HASH_SIZE RGB cells, as bytes. Averaging over each cell
+    removes render noise, while a visible edit still moves at least one
+    cell. Cells are not reduced to bits: on flat areas a binary hash flips
+    on noise alone.
+    """
+    return imaging.resize_area(pixels[:, :, :3], HASH_SIZE, HASH_SIZE).tobytes()
+
+def hash_distance(a, b):
+    """
+    Largest per-cell difference (0-255) between two perceptual hashes.
+    """
+    import numpy as np
+    if len(a) != len(b):
+        return 255
+    diff = np.frombuffer(a, dtype=np.uint8).astype(np.int16) - np.frombuffer(b, dtype=np.uint8)
+    return int(np.abs(diff).max())
+
+def _digest(values):
+    return hashlib.sha1(repr(values).encode('utf-8')).hexdigest()
+
+def _is_own(id_data):
+    return id_data.name.startswith(OWN_PREFIXES)
+
+class ChangeDetector:
+    """
+    Decides whether a render would see the same input as the last one.
+
+    The settings fingerprint covers everything sent alongside the capture
+    (prompt, strength, sizes, upload and tiling options). The scene
+    fingerprint covers what the capture sees: the camera, render settings,
+    frame and a revision counter bumped by depsgraph updates. The last
+    capture's perceptual hash backs the scene fingerprint up, because
+    depsgraph updates also fire for edits that don't change the image.
+    """
+    def __init__(self):
+        self.revision = 0
+        self.skipped_captures = 0
+        self.skipped_requests = 0
+        self._last = {}
+
+    def note_updates(self, updates):
+        """
+        Bumps the revision if any depsgraph update touches scene content.
+        Scene updates are skipped: the settings that matter are read
+        directly, and the addon's own status writes would count otherwise.
+        """
+        for update in updates:
+            id_data = update.id.original
+            if isinstance(id_data, bpy.types.Scene) or _is_own(id_data):
+                continue
+            if isinstance(id_data, bpy.types.Object) and not (
+                    update.is_updated_transform or update.is_updated_geometry or update.is_updated_shading):
+                continue # Selection and other state that doesn't show in a render
+            self.revision += 1
+            return
+
+    def settings_fingerprint(self, scene, prompt):
+        return _digest((
+            prompt, round(scene.ai_img_strength, 4), scene.ai_backend,
+            scene.render.resolution_x, scene.render.resolution_y,
+            scene.ai_upload_format, scene.ai_upload_quality, scene.ai_upload_png_compression,
+            round(scene.ai_upload_max_mpix, 3),
+            scene.ai_tiled, scene.ai_tile_size, scene.ai_tile_overlap,
+        ))
+
+    def scene_fingerprint(self, scene, camera):
+        cam = camera.data
+        return _digest((
+            self.revision, camera.name,
+            tuple(round(v, 5) for row in camera.matrix_world for v in row),
+            cam.type, round(cam.lens, 4), round(cam.ortho_scale, 4),
+            round(cam.sensor_width, 4), round(cam.sensor_height, 4),
+            round(cam.shift_x, 4), round(cam.shift_y, 4),
+            round(cam.clip_start, 4), round(cam.clip_end, 4),
+            scene.render.engine, scene.render.resolution_percentage, scene.frame_current,
+            scene.ai_capture_mode, scene.ai_capture_scale,
+        ))
+
+    def unchanged(self, camera_name, settings, scene_state):
+        """
+        True if both fingerprints match the last rendered input of the camera.
+        """
+        last = self._last.get(camera_name)
+        return last is not None and last[0] == settings and last[1] == scene_state
+
+    def similar(self, camera_name, settings, capture_hash, tolerance):
+        """
+        True if the settings match and no cell of the capture's hash is more
+        than `tolerance` levels off the camera's last rendered capture.
+        """
+        last = self._last.get(camera_name)
+        if last is None or last[0] != settings or last[2] is None or capture_hash is None:
+            return False
+        return hash_distance(last[2], capture_hash) <= tolerance
+
+    def remember(self, camera_name, settings, scene_state, capture_hash):
+        self._last[camera_name] = (settings, scene_state, capture_hash)
+
+    def stats(self):
+        return {"skipped_captures": self.skipped_captures, "skipped_requests": self.skipped_requests}
+
+_detector = ChangeDetector()
+
+def get_detector():
+    return _detector
+
+@bpy.app.handlers.persistent
+def on_depsgraph_update(scene, depsgraph):
+    _detector.note_updates(depsgraph.updates)
+
+def register_handlers():
+    if on_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update)
+
+def unregister_handlers():
+    if on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update)
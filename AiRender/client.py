@@ -1,19 +1,689 @@
+import base64
+import io
 import json
+import mimetypes
+import os
 import urllib.request
 import urllib.error
+import urllib.parse
+import http.client
+import threading
 import time
 import ssl
+import random
+import socket
+import concurrent.futures
+import email.utils
+from collections import deque
+
+from . import backends
+from . import ratelimit
+from . import tracing
 
 # Default to Google Nano Banana Pro on Fal.ai
 MODEL_ENDPOINT = "https://fal.run/google/nano-banana-pro"
+EDIT_ENDPOINT = "https://fal.run/fal-ai/nano-banana/edit"
+
+# Queue API host; same model paths as fal.run
+SYNC_HOST = "fal.run"
+QUEUE_HOST = "queue.fal.run"
+
+# Idle keep-alive connections kept open per (scheme, host, port). Requests in
+# flight are not capped here; the scheduler's in-flight limit and the rate
+# limiter decide how many run at once, and extra connections are opened for them
+MAX_IDLE_PER_HOST = 16
+
+# Raw bytes read per step when streaming an image into a request body (multiple of 3)
+STREAM_CHUNK_SIZE = 3 * 64 * 1024
+
+# Stands in for the image data URI inside the JSON payload until it is streamed
+IMAGE_PLACEHOLDER = "__AIR_STREAMED_IMAGE__"
+
+# Base64 characters decoded per step for inline data URI results (multiple of 4)
+DECODE_CHUNK_SIZE = 4 * 64 * 1024
+
+# Longest string printed verbatim when logging API responses
+LOG_STRING_LIMIT = 120
+
+# Retries for rate limits, server errors and network failures
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 16.0
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+
+# Consecutive failures that open an endpoint's circuit, and how long it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+
+# Hedged requests need this many past latencies before a threshold is trusted
+HEDGE_MIN_SAMPLES = 10
+LATENCY_WINDOW = 100
+
+# Per-attempt records kept for the panel / stats
+ATTEMPT_HISTORY = 64
+
+# While requests are routed to a fallback, every Nth one still goes to the
+# main backend so its latency statistics can recover
+ROUTE_PROBE_INTERVAL = 8
+
+# Recent error rate above which a backend counts as failing
+ROUTE_MAX_ERROR_RATE = 0.5
+
+class StreamingImageBody:
+    """
+    JSON request body whose image data URI is base64-encoded chunk by chunk
+    while it is written to the socket, so peak memory does not grow with the
+    capture size. The image comes from a file (image_path) or an in-memory
+    encoded buffer (image_bytes). Iterating again restarts the stream, which
+    lets the session replay it on a fresh connection.
+    """
+    def __init__(self, payload, image_path=None, image_bytes=None, mime_type=None, chunk_size=STREAM_CHUNK_SIZE):
+        if chunk_size % 3:
+            raise ValueError("chunk_size must be a multiple of 3")
+        encoded = json.dumps(payload).encode('utf-8')
+        marker = json.dumps(IMAGE_PLACEHOLDER).encode('utf-8')
+        if encoded.count(marker) != 1:
+            raise ValueError("Payload must contain exactly one image placeholder")
+        self.prefix, self.suffix = encoded.split(marker)
+        self.image_path = image_path
+        self.image_bytes = image_bytes
+        self.chunk_size = chunk_size
+        if mime_type is None:
+            mime_type = (mimetypes.guess_type(image_path)[0] if image_path else None) or "image/png"
+        self.uri_header = f'"data:{mime_type};base64,'.encode('utf-8')
+
+    def _open(self):
+        if self.image_bytes is not None:
+            return io.BytesIO(self.image_bytes)
+        return open(self.image_path, "rb")
+
+    def __len__(self):
+        if self.image_bytes is not None:
+            size = len(self.image_bytes)
+        else:
+            size = os.path.getsize(self.image_path)
+        encoded_size = 4 * ((size + 2) // 3)
+        return len(self.prefix) + len(self.uri_header) + encoded_size + 1 + len(self.suffix)
+
+    def __iter__(self):
+        yield self.prefix + self.uri_header
+        with self._open() as image_file:
+            while True:
+                chunk = image_file.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+        yield b'"' + self.suffix
+
+def _is_replayable(body):
+    return body is None or isinstance(body, (bytes, bytearray, StreamingImageBody))
+
+class Response:
+    """
+    Fully read HTTP response returned by ClientSession.request.
+    """
+    def __init__(self, status, reason, headers, body, bytes_received=None):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        # Bytes read off the socket, including any streamed into a sink
+        self.bytes_received = len(body) if bytes_received is None else bytes_received
+
+    def json(self):
+        # Parse straight from bytes and drop the raw body; with sync_mode the
+        # body holds a multi-MB data URI we don't want to keep twice
+        result = json.loads(self.body)
+        self.body = b""
+        return result
+
+class RequestAborted(RuntimeError):
+    pass
+
+class Abort:
+    """
+    Lets another thread abandon a request. abort() shuts down the socket the
+    request is using, so a worker blocked on the upload or on the response
+    fails straight away instead of waiting for the timeout. Aborted
+    connections are closed, never returned to the pool. An Abort created
+    with a parent is aborted along with it.
+    """
+    def __init__(self, parent=None):
+        self.aborted = False
+        self._conns = set()
+        self._children = []
+        self._lock = threading.Lock()
+        if parent is not None:
+            parent._adopt(self)
+
+    def _adopt(self, child):
+        with self._lock:
+            if not self.aborted:
+                self._children.append(child)
+                return
+        child.abort()
+
+    def attach(self, conn):
+        with self._lock:
+            self._conns.add(conn)
+
+    def detach(self, conn):
+        with self._lock:
+            self._conns.discard(conn)
+
+    def abort(self):
+        with self._lock:
+            self.aborted = True
+            conns = list(self._conns)
+            children, self._children = self._children, []
+        for child in children:
+            child.abort()
+        for conn in conns:
+            if conn.sock is not None:
+                try:
+                    conn.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def check(self):
+        if self.aborted:
+            raise RequestAborted("Request aborted")
+
+class ClientSession:
+    """
+    Keeps a bounded pool of idle keep-alive HTTP(S) connections per host so
+    the generate POST and the result download skip the TCP/TLS handshake.
+    Any number of requests may run at once; each takes an idle connection
+    or opens a new one, and at most max_idle_per_host are kept afterwards.
+    Safe to share between worker threads.
+    """
+    def __init__(self, max_idle_per_host=MAX_IDLE_PER_HOST, ssl_context=None):
+        self.max_idle_per_host = max_idle_per_host
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._stats = {"requests": 0, "new_connections": 0, "reused_connections": 0}
+
+    def _host_key(self, url):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        return (parts.scheme, parts.hostname, port), path
+
+    def _acquire(self, key, timeout):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self._stats["reused_connections"] += 1
+                return idle.pop(), True
+            self._stats["new_connections"] += 1
+
+        scheme, host, port = key
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout, context=self.ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        return conn, False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, url, body=None, headers=None, timeout=120, sink=None, on_sent=None, abort=None):
+        """
+        Performs a request over a pooled connection. The response body is
+        returned in Response.body, or streamed into the file-like `sink`.
+        on_sent is called once the request body has been written. An Abort
+        passed as `abort` can cancel the request from another thread.
+        """
+        key, path = self._host_key(url)
+        with self._lock:
+            self._stats["requests"] += 1
+        with tracing.span("http", method=method, host=key[1], bytes_sent=len(body) if body else 0) as trace:
+            response = self._send(key, path, method, body, headers, timeout, sink, on_sent, abort)
+            trace.set(status=response.status, bytes_received=response.bytes_received)
+        return response
+
+    def _send(self, key, path, method, body, headers, timeout, sink, on_sent, abort=None):
+        while True:
+            if abort is not None:
+                abort.check()
+            conn, reused = self._acquire(key, timeout)
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            if abort is not None:
+                abort.attach(conn)
+            try:
+                try:
+                    conn.request(method, path, body=body, headers=headers or {})
+                    if abort is not None:
+                        abort.check() # Aborted while connecting, before the socket could be shut down
+                    if on_sent:
+                        on_sent()
+                    resp = conn.getresponse()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    conn.close()
+                    if abort is not None:
+                        abort.check()
+                    if reused and _is_replayable(body):
+                        # The server dropped an idle keep-alive connection, retry on a fresh one
+                        continue
+                    raise
+                except Exception:
+                    conn.close()
+                    if abort is not None:
+                        abort.check()
+                    raise
+
+                received = 0
+                try:
+                    if sink is not None and resp.status == 200:
+                        while True:
+                            chunk = resp.read(64 * 1024)
+                            if not chunk:
+                                break
+                            sink.write(chunk)
+                            received += len(chunk)
+                        data = b""
+                    else:
+                        data = resp.read()
+                        received = len(data)
+                except Exception:
+                    conn.close()
+                    if abort is not None:
+                        abort.check()
+                    raise
+            finally:
+                if abort is not None:
+                    abort.detach(conn)
+
+            if resp.will_close or (abort is not None and abort.aborted):
+                conn.close()
+            else:
+                self._release(key, conn)
+            return Response(resp.status, resp.reason, resp.headers, data, received)
+
+    def stats(self):
+        """
+        Returns request / connection counters and the connection reuse ratio.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats["new_connections"] + stats["reused_connections"]
+        stats["reuse_ratio"] = stats["reused_connections"] / total if total else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Returns the process-wide shared ClientSession.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = ClientSession()
+        return _session
+
+def session_stats():
+    """
+    Counters of the shared session (see ClientSession.stats), or None before its first request.
+    """
+    with _session_lock:
+        return _session.stats() if _session is not None else None
+
+def close_session():
+    global _session, _hedge_pool
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+    with _resilience_lock:
+        if _hedge_pool is not None:
+            _hedge_pool.shutdown(wait=False)
+            _hedge_pool = None
+
+class APIError(RuntimeError):
+    """
+    Non-success HTTP response from Fal.ai; status is the HTTP status code and
+    retry_after the server's Retry-After in seconds, if it sent one.
+    """
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+def parse_retry_after(value):
+    """
+    Seconds from a Retry-After header (delta-seconds or HTTP date); None if absent or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+def is_retryable(error):
+    if isinstance(error, APIError):
+        return error.status in RETRYABLE_STATUS
+    # Timeouts, refused / reset connections, malformed responses
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+class RetryPolicy:
+    """
+    Capped exponential backoff with full jitter: attempt n waits a random
+    time in [0, min(max_delay, base_delay * 2**n)].
+    """
+    def __init__(self, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+class CircuitBreaker:
+    """
+    Fails fast after `threshold` consecutive failures. Once reset_seconds
+    have passed, one trial request is let through (half-open); its outcome
+    closes the circuit again or restarts the wait. A trial that ends without
+    a verdict (aborted, or failed before the server answered) must call
+    end_trial so the next request can try.
+    """
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """
+        Raises CircuitOpenError while the circuit is open. Returns True if
+        the caller is the half-open trial.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            waited = time.monotonic() - self.opened_at
+            if waited >= self.reset_seconds and not self._trial_running:
+                self._trial_running = True
+                return True
+            raise CircuitOpenError(
+                f"Fal.ai endpoint unavailable after {self.failures} failures; "
+                f"retrying in {max(0.0, self.reset_seconds - waited):.0f}s"
+            )
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def end_trial(self):
+        with self._lock:
+            self._trial_running = False
+
+class LatencyTracker:
+    """
+    Rolling window of successful request latencies for one endpoint, plus
+    the outcomes of its recent attempts for the error rate.
+    """
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._outcomes.append(True)
+
+    def add_failure(self):
+        with self._lock:
+            self._outcomes.append(False)
+
+    def error_rate(self):
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def percentile(self, q):
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+class AttemptRecord:
+    def __init__(self, endpoint, attempt, hedged, seconds, status=None, error=None):
+        self.endpoint = endpoint
+        self.attempt = attempt
+        self.hedged = hedged
+        self.seconds = seconds
+        self.status = status
+        self.error = error
+
+    def __repr__(self):
+        outcome = self.error or self.status
+        hedge = " hedge" if self.hedged else ""
+        return f"attempt {self.attempt + 1}{hedge}: {outcome} in {self.seconds:.2f}s"
+
+_breakers = {}
+_latencies = {}
+_attempts = deque(maxlen=ATTEMPT_HISTORY)
+_attempt_stats = {"attempts": 0, "retries": 0, "failures": 0, "hedges": 0, "hedge_wins": 0, "fast_fails": 0, "fallbacks": 0}
+_resilience_lock = threading.Lock()
+_hedge_pool = None
+
+def get_breaker(endpoint):
+    with _resilience_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker()
+        return _breakers[endpoint]
+
+def get_latency_tracker(endpoint):
+    with _resilience_lock:
+        if endpoint not in _latencies:
+            _latencies[endpoint] = LatencyTracker()
+        return _latencies[endpoint]
+
+def _count(key, n=1):
+    with _resilience_lock:
+        _attempt_stats[key] += n
+
+def _record_attempt(record):
+    with _resilience_lock:
+        _attempts.append(record)
+        _attempt_stats["attempts"] += 1
+        if record.error:
+            _attempt_stats["failures"] += 1
+
+def attempt_history():
+    with _resilience_lock:
+        return list(_attempts)
+
+def attempt_stats():
+    """
+    Counters over all requests plus the state of each endpoint's circuit breaker.
+    """
+    with _resilience_lock:
+        stats = dict(_attempt_stats)
+        breakers = dict(_breakers)
+    stats["breakers"] = {endpoint: breaker.state for endpoint, breaker in breakers.items()}
+    return stats
+
+def _get_hedge_pool():
+    global _hedge_pool
+    with _resilience_lock:
+        if _hedge_pool is None:
+            _hedge_pool = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="AIRenderHedge")
+        return _hedge_pool
+
+def _attempt(endpoint, call, attempt, hedged, abort=None):
+    """
+    Runs one attempt through the endpoint's circuit breaker and records it.
+    """
+    breaker = get_breaker(endpoint)
+    try:
+        trial = breaker.allow()
+    except CircuitOpenError:
+        _count("fast_fails")
+        raise
+    start = time.perf_counter()
+    try:
+        with tracing.span("attempt", endpoint=endpoint, attempt=attempt, hedged=hedged) as trace:
+            try:
+                result = call(hedged, abort)
+            except Exception as e:
+                seconds = time.perf_counter() - start
+                status = getattr(e, "status", None)
+                trace.set(status=status)
+                _record_attempt(AttemptRecord(endpoint, attempt, hedged, seconds, status, str(e) or type(e).__name__))
+                if is_retryable(e) and status != 429:
+                    breaker.record_failure()
+                    get_latency_tracker(endpoint).add_failure()
+                elif status is not None:
+                    # The endpoint answered (a 4xx, or rate limiting): it is up, whatever it thought of the request
+                    breaker.record_success()
+                raise
+        seconds = time.perf_counter() - start
+        breaker.record_success()
+        get_latency_tracker(endpoint).add(seconds)
+        _record_attempt(AttemptRecord(endpoint, attempt, hedged, seconds, 200))
+        return result
+    finally:
+        if trial:
+            # Aborted or unparseable trials say nothing either way; let the next request try
+            breaker.end_trial()
+
+def _hedged_attempt(endpoint, call, attempt, hedge_percentile, abort=None):
+    """
+    Runs an attempt on the calling thread and, once it has taken longer than
+    the endpoint's latency percentile, starts a duplicate on the hedge pool.
+    Whichever succeeds first wins and the other one is aborted, which closes
+    its connection and frees its rate-limit slot.
+    """
+    threshold = get_latency_tracker(endpoint).percentile(hedge_percentile) if hedge_percentile else None
+    if threshold is None:
+        return _attempt(endpoint, call, attempt, False, abort)
+
+    primary_abort = Abort(abort)
+    hedge_abort = Abort(abort)
+    lock = threading.Lock()
+    state = {"done": False, "hedge": None}
+
+    def abort_primary(future):
+        if not future.cancelled() and future.exception() is None:
+            primary_abort.abort()
+
+    def start_hedge():
+        with lock:
+            if state["done"]:
+                return
+            _count("hedges")
+            state["hedge"] = _get_hedge_pool().submit(_attempt, endpoint, call, attempt, True, hedge_abort)
+        state["hedge"].add_done_callback(abort_primary)
+
+    # A timer waits out the threshold, so only hedges that actually start take a pool thread
+    timer = threading.Timer(threshold, start_hedge)
+    timer.daemon = True
+    timer.start()
+    try:
+        result = _attempt(endpoint, call, attempt, False, primary_abort)
+    except Exception as e:
+        error = e
+    else:
+        error = None
+    finally:
+        timer.cancel()
+        with lock:
+            state["done"] = True
+            hedge = state["hedge"]
+
+    if error is None:
+        if hedge is not None:
+            hedge.cancel()
+            hedge_abort.abort()
+        return result
+    if hedge is None:
+        raise error
+    try:
+        result = hedge.result()
+    except Exception:
+        raise error
+    _count("hedge_wins")
+    return result
+
+def call_with_retries(endpoint, call, policy=None, hedge_percentile=None, is_cancelled=None, abort=None):
+    """
+    Calls `call(hedged, abort)` (one HTTP round trip that raises on failure)
+    with retries, optional hedging and the endpoint's circuit breaker. Only
+    retryable errors (429 / 5xx / timeouts / network) are retried. The call
+    gets the Abort for its own attempt, tied to `abort` if one is given.
+    """
+    policy = policy or RetryPolicy()
+    for attempt in range(policy.attempts):
+        try:
+            return _hedged_attempt(endpoint, call, attempt, hedge_percentile, abort)
+        except Exception as e:
+            last_attempt = attempt == policy.attempts - 1
+            if last_attempt or not is_retryable(e) or (is_cancelled and is_cancelled()):
+                raise
+            delay = policy.delay(attempt)
+            print(f"Request failed ({e}); retry {attempt + 1}/{policy.attempts - 1} in {delay:.1f}s")
+            _count("retries")
+            time.sleep(delay)
 
 def encode_image_to_base64(image_path):
     """
     Encodes an image file to a base64 data URI string.
+    Holds the whole image in memory; send_api_request(image_path=...) streams instead.
     """
-    import base64
-    import mimetypes
-    
     mime_type = mimetypes.guess_type(image_path)[0] or "image/png"
     
     with open(image_path, "rb") as image_file:
@@ -21,11 +691,95 @@ def encode_image_to_base64(image_path):
         
     return f"data:{mime_type};base64,{encoded_string}"
 
-def send_api_request(api_key, prompt, image_url=None, strength=0.75, width=1920, height=1080):
+def resolve_endpoint(has_image, backend=None):
     """
-    Sends a request to Fal.ai. If image_url is provided, performs Image-to-Image.
+    Returns the endpoint used for text-to-image or image-to-image requests
+    to a backend (name or Backend; the default one if None).
+    """
+    if not isinstance(backend, backends.Backend):
+        backend = backends.get_backend(backend)
+    if has_image:
+        return backend.edit_endpoint or EDIT_ENDPOINT
+    return backend.endpoint or MODEL_ENDPOINT
+
+def to_queue_endpoint(endpoint):
+    """
+    Maps a synchronous fal.run endpoint to its queue.fal.run counterpart.
+    """
+    parts = urllib.parse.urlsplit(endpoint)
+    if parts.hostname != SYNC_HOST:
+        return endpoint
+    return urllib.parse.urlunsplit(parts._replace(netloc=QUEUE_HOST))
+
+_route_lock = threading.Lock()
+_route_fallbacks = {}
+
+def _expected_latency(backend, has_image):
+    """
+    Median latency of the backend's endpoint, inflated by its error rate;
+    the backend's nominal latency until there are enough samples.
+    """
+    tracker = get_latency_tracker(resolve_endpoint(has_image, backend))
+    median = tracker.percentile(50)
+    if median is None:
+        median = backend.nominal_latency
+    return median / max(0.05, 1.0 - tracker.error_rate())
+
+def _is_failing(backend, has_image):
+    endpoint = resolve_endpoint(has_image, backend)
+    if get_breaker(endpoint).state == "open":
+        return True
+    return get_latency_tracker(endpoint).error_rate() > ROUTE_MAX_ERROR_RATE
+
+def choose_backend(has_image, width, height, backend=None, fallback_after=None):
+    """
+    Picks the Backend for one request. The requested backend (name; the
+    default if None) is replaced by one of its fallbacks when it can't
+    serve the resolution or, with fallback_after set, when it is failing
+    (circuit open or error rate above ROUTE_MAX_ERROR_RATE) or its median
+    latency is over fallback_after seconds and a fallback is expected to
+    be faster. While falling back, every ROUTE_PROBE_INTERVAL-th request
+    still goes to the main backend.
+    """
+    primary = backends.get_backend(backend)
+    candidates = [primary] + [backends.get_backend(name) for name in primary.fallbacks]
+    candidates = [b for b in candidates if b.supports(has_image, width, height)]
+    if not candidates:
+        mode = "image-to-image" if has_image else "text-to-image"
+        raise RuntimeError(f"No backend supports {mode} at {width}x{height}")
+
+    others = [b for b in candidates if b is not primary]
+    if candidates[0] is primary:
+        if fallback_after is None or not others:
+            return primary
+        failing = _is_failing(primary, has_image)
+        median = get_latency_tracker(resolve_endpoint(has_image, primary)).percentile(50)
+        if not failing and (median is None or median <= fallback_after):
+            return primary
+        with _route_lock:
+            count = _route_fallbacks[primary.name] = _route_fallbacks.get(primary.name, 0) + 1
+        if count % ROUTE_PROBE_INTERVAL == 0:
+            return primary
+
+    healthy = [b for b in others if not _is_failing(b, has_image)]
+    choice = min(healthy or others, key=lambda b: _expected_latency(b, has_image))
+    if candidates[0] is primary and not failing and \
+            _expected_latency(choice, has_image) >= _expected_latency(primary, has_image):
+        return primary # Slow, but nothing is faster
+    _count("fallbacks")
+    print(f"Routing to {choice.label} instead of {primary.label}")
+    return choice
+
+def build_request(api_key, prompt, image_url=None, width=1920, height=1080, image_path=None, image_bytes=None, mime_type=None, seed=None,
+                  backend=None, strength=None):
     """
-    if not api_key:
+    Builds (endpoint, headers, body) for a generation request. The backend
+    (name or Backend; the default if None) builds the payload. seed is only
+    sent when given, strength only by backends that take one.
+    """
+    if not isinstance(backend, backends.Backend):
+        backend = backends.get_backend(backend)
+    if not api_key and not backend.local:
         raise ValueError("API Key is missing")
 
     headers = {
@@ -33,71 +787,209 @@ def send_api_request(api_key, prompt, image_url=None, strength=0.75, width=1920,
         "Content-Type": "application/json"
     }
 
-    # API Payload
-    payload = {
-        "prompt": prompt,
-        "image_size": {
-            "width": width,
-            "height": height
-        },
-        "num_inference_steps": 30
-    }
-    
-    endpoint = MODEL_ENDPOINT
-
-    # Add Image-to-Image parameters if an image is provided
+    # Image-to-Image if an image is provided
+    streamed = image_path is not None or image_bytes is not None
+    if streamed:
+        image_url = IMAGE_PLACEHOLDER
+    payload = backend.build_payload(prompt, width, height, image_url, strength, seed)
+    endpoint = resolve_endpoint(bool(image_url), backend)
     if image_url:
-        # Switch to the Edit endpoint
-        endpoint = "https://fal.run/fal-ai/nano-banana/edit" 
-        # The edit endpoint expects 'image_urls' for the base image
-        payload["image_urls"] = [image_url]
-        payload["sync_mode"] = True # Recommended for edit endpoint
         print(f"Switching to Edit Endpoint: {endpoint}")
-    
-    data = json.dumps(payload).encode('utf-8')
-    req = urllib.request.Request(endpoint, data=data, headers=headers, method='POST')
 
-    print(f"Sending request to {endpoint}...")
-    
+    if streamed:
+        data = StreamingImageBody(payload, image_path, image_bytes, mime_type)
+        headers["Content-Length"] = str(len(data))
+    else:
+        data = json.dumps(payload).encode('utf-8')
+    return endpoint, headers, data
+
+def send_api_request(api_key, prompt, image_url=None, strength=0.75, width=1920, height=1080, session=None, image_path=None, progress=None, image_bytes=None, mime_type=None,
+                     retry_policy=None, hedge_percentile=None, is_cancelled=None, seed=None, abort=None,
+                     backend=None, fallback_after=None):
+    """
+    Sends a request to Fal.ai. If image_url is provided, performs Image-to-Image.
+    Passing image_path (a file) or image_bytes (an encoded image in memory)
+    instead streams it into the request body as a data URI.
+    progress, if given, is called with "UPLOADING" and then "GENERATING".
+    Failed attempts are retried per retry_policy; with hedge_percentile set,
+    an attempt slower than that percentile of recent ones is duplicated.
+    abort (an Abort) cancels the request, hedges included, from another thread.
+    Every attempt first takes a slot from the rate limiter, which may send it
+    with another key of the pool (see ratelimit).
+    backend (name or Backend) selects the model; with fallback_after set,
+    choose_backend may route to a faster one when it is slow or failing.
+    """
+    has_image = bool(image_url) or image_path is not None or image_bytes is not None
+    if not isinstance(backend, backends.Backend):
+        backend = choose_backend(has_image, width, height, backend, fallback_after)
+    if backend.local:
+        return _generate_locally(backend, prompt, image_url, strength, width, height, image_path, image_bytes,
+                                 seed, progress, retry_policy)
+
+    endpoint, headers, data = build_request(api_key, prompt, image_url, width, height, image_path, image_bytes, mime_type, seed,
+                                            backend, strength)
+    session = session or get_session()
+
+    def post(hedged, attempt_abort):
+        # Progress follows the primary attempt only
+        report = None if hedged else progress
+
+        def cancelled():
+            return (attempt_abort is not None and attempt_abort.aborted) or (is_cancelled is not None and is_cancelled())
+
+        with ratelimit.acquire(api_key, cancelled) as lease:
+            print(f"Sending request to {endpoint} (key {ratelimit.mask_key(lease.key)})...")
+            if report:
+                report("UPLOADING")
+            key_headers = dict(headers, Authorization=f"Key {lease.key}")
+            return _post_generation(session, endpoint, data, key_headers, report, attempt_abort, backend)
+
+    return call_with_retries(endpoint, post, retry_policy, hedge_percentile, is_cancelled, abort)
+
+def _generate_locally(backend, prompt, image_url, strength, width, height, image_path, image_bytes, seed, progress, retry_policy):
+    """
+    Runs a local backend in this thread, with the same stats and tracing as a request.
+    """
+    if image_path is not None:
+        with open(image_path, "rb") as f:
+            image_bytes = f.read()
+    elif image_bytes is None and image_url and image_url.startswith("data:"):
+        buffer = io.BytesIO()
+        decode_data_uri(image_url, buffer)
+        image_bytes = buffer.getvalue()
+    has_image = bool(image_url) or image_bytes is not None
+    payload = backend.build_payload(prompt, width, height, IMAGE_PLACEHOLDER if has_image else None, strength, seed)
+
+    def generate(hedged, abort):
+        if progress:
+            progress("GENERATING")
+        return backend.generate(payload, image_bytes)
+
+    return call_with_retries(resolve_endpoint(has_image, backend), generate, retry_policy)
+
+def _post_generation(session, endpoint, data, headers, progress, abort=None, backend=None):
     try:
-        with urllib.request.urlopen(req, timeout=120) as response:
-            if response.status == 200:
-                result = json.loads(response.read().decode('utf-8'))
-                print("API Response:", result)
-                return parse_result(result)
-            else:
-                raise RuntimeError(f"API Error: {response.status} - {response.reason}")
-                
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode('utf-8')
-        print(f"HTTP Error {e.code}: {error_body}")
-        raise RuntimeError(f"Fal.ai Error: {e.code}")
+        response = session.request(
+            "POST", endpoint, body=data, headers=headers, timeout=120,
+            on_sent=(lambda: progress("GENERATING")) if progress else None, abort=abort
+        )
     except Exception as e:
         print(f"Network Error: {e}")
         raise e
 
-def parse_result(result):
+    if response.status == 200:
+        result = response.json()
+        print("API Response:", shorten_for_log(result))
+        return parse_result(result, backend)
+
+    if response.status >= 400:
+        error_body = response.body.decode('utf-8', errors='replace')
+        print(f"HTTP Error {response.status}: {error_body}")
+        raise APIError(f"Fal.ai Error: {response.status}", response.status,
+                       parse_retry_after(response.headers.get("Retry-After")))
+    raise APIError(f"API Error: {response.status} - {response.reason}", response.status)
+
+def parse_result(result, backend=None):
     """
-    Extracts the image URL from the Fal.ai response.
+    Extracts the image URL from the Fal.ai response, as the backend (the
+    default one if None) reads it.
     """
-    # Check if result is directly an image object or list
-    if "images" in result and len(result["images"]) > 0:
-        return result["images"][0]["url"]
-    
-    # Handle queued or other formats if needed (Nano Banana usually returns fast)
-    if "image" in result: # Some endpoints
-        return result["image"]["url"]
-        
-    raise RuntimeError("No image found in API response")
+    if not isinstance(backend, backends.Backend):
+        backend = backends.get_backend(backend)
+    return backend.parse_result(result)
 
-def download_image(url, save_path):
+def shorten_for_log(value, limit=LOG_STRING_LIMIT):
+    """
+    Copy of a response with long strings (inline data URIs) truncated for printing.
+    """
+    if isinstance(value, dict):
+        return {k: shorten_for_log(v, limit) for k, v in value.items()}
+    if isinstance(value, list):
+        return [shorten_for_log(v, limit) for v in value]
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}... ({len(value)} chars)"
+    return value
+
+def decode_data_uri(uri, sink, chunk_size=DECODE_CHUNK_SIZE):
+    """
+    Decodes a data: URI into the writable `sink` a chunk at a time, without
+    materialising the full decoded image in memory. Returns bytes written.
+    """
+    if chunk_size % 4:
+        raise ValueError("chunk_size must be a multiple of 4")
+    comma = uri.find(",", 0, 512)
+    if not uri.startswith("data:") or comma < 0:
+        raise ValueError("Not a data URI")
+
+    if not uri[5:comma].endswith(";base64"):
+        data = urllib.parse.unquote_to_bytes(uri[comma + 1:])
+        sink.write(data)
+        return len(data)
+
+    written = 0
+    for start in range(comma + 1, len(uri), chunk_size):
+        data = base64.b64decode(uri[start:start + chunk_size])
+        sink.write(data)
+        written += len(data)
+    return written
+
+def fetch_image_bytes(url, session=None, abort=None):
+    """
+    Returns the result image as bytes without touching disk. Inline data URIs
+    are decoded in place.
+    """
+    buffer = io.BytesIO()
+    if url.startswith("data:"):
+        decode_data_uri(url, buffer)
+        return buffer.getvalue()
+
+    print(f"Fetching image from {url}...")
+    session = session or get_session()
+
+    def fetch(hedged, attempt_abort):
+        buffer.seek(0)
+        buffer.truncate()
+        response = session.request("GET", url, timeout=60, sink=buffer, abort=attempt_abort)
+        if response.status != 200:
+            raise APIError(f"Failed to download image: HTTP {response.status} - {response.reason}", response.status)
+
+    # Downloads are idempotent and not billed, so they are always retried
+    call_with_retries(_host_url(url), fetch, is_cancelled=(lambda: abort.aborted) if abort else None, abort=abort)
+    return buffer.getvalue()
+
+def _host_url(url):
+    parts = urllib.parse.urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def download_image(url, save_path, session=None):
     """
     Downloads the image from URL to the save_path.
+    Inline data URIs (sync_mode results) are decoded in place instead.
     """
-    print(f"Downloading image from {url}...")
+    if url.startswith("data:"):
+        print(f"Decoding inline image ({len(url)} chars)...")
+    else:
+        print(f"Downloading image from {url}...")
     try:
-        with urllib.request.urlopen(url, timeout=60) as response, open(save_path, 'wb') as out_file:
-            out_file.write(response.read())
+        if url.startswith("data:"):
+            with open(save_path, 'wb') as out_file:
+                decode_data_uri(url, out_file)
+        elif url.startswith(("http://", "https://")):
+            session = session or get_session()
+
+            def fetch(hedged, abort):
+                # Each attempt rewrites the file from the start
+                with open(save_path, 'wb') as out_file:
+                    response = session.request("GET", url, timeout=60, sink=out_file)
+                if response.status != 200:
+                    raise APIError(f"HTTP {response.status} - {response.reason}", response.status)
+
+            # As in fetch_image_bytes, downloads are always retried
+            call_with_retries(_host_url(url), fetch)
+        else:
+            # Other schemes urllib understands natively (e.g. file:)
+            with urllib.request.urlopen(url, timeout=60) as response, open(save_path, 'wb') as out_file:
+                out_file.write(response.read())
         print(f"Saved to {save_path}")
     except Exception as e:
         raise RuntimeError(f"Failed to download image: {e}")
@@ -0,0 +1,495 @@
+"""
+Headless render farm. Expands a JSON / YAML job manifest into work items
+(blend file x scene x camera x frame x prompt) and runs them on a pool of
+background Blender processes that share one limit on concurrent API requests.
+
+Coordinator (plain Python is enough; it never imports bpy):
+
+    python AiRender/farm.py manifest.json --workers 4 --max-in-flight 8 --blender /path/to/blender
+    blender -b --python AiRender/farm.py -- manifest.json --workers 4
+
+Manifest:
+
+    {
+      "output_dir": "farm_output",
+      "defaults": {"prompt": "...", "strength": 0.75, "capture": "REDUCED"},
+      "jobs": [
+        {"blend": "shots/a.blend", "scene": "Scene", "cameras": ["CamA", "CamB"],
+         "frames": "1-24x4", "prompts": ["golden hour", "overcast"]}
+      ]
+    }
+
+Relative paths are resolved against the manifest's directory. Results are
+written to <output_dir>/<blend>/<scene>/<camera>/p<prompt index>/frame_NNNN.png;
+items whose output exists are skipped, so an interrupted run resumes.
+
+Workers talk to the coordinator over stdin / stdout with JSON lines; lines
+they print to stdout start with PROTOCOL_PREFIX, everything else is log output.
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+PROTOCOL_PREFIX = "@@AIR_FARM "
+
+# Extra attempts for an item after its first failure (on any worker)
+DEFAULT_RETRIES = 2
+
+# Worker log lines kept per attempt for the report
+LOG_TAIL = 20
+
+ADDON_PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Per-item options; manifest "defaults" and job entries override these
+ITEM_DEFAULTS = {
+    "scene": None,
+    "camera": None,
+    "prompt": "",
+    "enhance_prompt": True,
+    "strength": 0.75,
+    "capture": "FULL", # FULL, REDUCED or NONE (text-to-image)
+    "capture_scale": 50,
+    "upload_max_mpix": 0.0,
+    "upload_format": "PNG",
+    "upload_quality": 90,
+    "upload_png_compression": 6,
+    "resolution": None,
+    "retry_attempts": 3,
+    "backend": None, # Name in AiRender/backends.py; None for the default model
+    "endpoint": None, # Overrides for a self-hosted or fake backend
+    "edit_endpoint": None,
+}
+
+def load_manifest(path):
+    with open(path, "r") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("YAML manifests need PyYAML; use JSON or install pyyaml")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def parse_frames(spec):
+    """
+    Frames from an int, a list, or a string like "1-24", "1-24x4" or "1,5,9".
+    """
+    if spec is None:
+        return [None]
+    if isinstance(spec, int):
+        return [spec]
+    if isinstance(spec, list):
+        return [int(f) for f in spec]
+    frames = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if "-" in part:
+            span, _, step = part.partition("x")
+            start, end = span.split("-")
+            frames.extend(range(int(start), int(end) + 1, int(step or 1)))
+        elif part:
+            frames.append(int(part))
+    return frames
+
+def item_output_path(output_dir, item):
+    blend = os.path.splitext(os.path.basename(item["blend"] or "untitled"))[0]
+    frame = item["frame"] if item["frame"] is not None else 0
+    return os.path.join(
+        output_dir, blend, item["scene"] or "scene", item["camera"] or "camera",
+        f"p{item['prompt_index']}", f"frame_{frame:04d}.png"
+    )
+
+def expand_manifest(manifest, base_dir):
+    """
+    Returns the list of work items described by the manifest.
+    """
+    output_dir = os.path.join(base_dir, manifest.get("output_dir", "farm_output"))
+    defaults = dict(ITEM_DEFAULTS, **manifest.get("defaults", {}))
+    items = []
+    for job in manifest.get("jobs", []):
+        options = dict(defaults, **{k: v for k, v in job.items() if k in ITEM_DEFAULTS})
+        if options["capture"] not in ("FULL", "REDUCED", "NONE"):
+            raise RuntimeError(f"Capture mode {options['capture']!r} is not available headless (use FULL, REDUCED or NONE)")
+        blend = job.get("blend")
+        blend = os.path.join(base_dir, blend) if blend else None
+        cameras = job.get("cameras") or [options["camera"]]
+        prompts = job.get("prompts") or [options["prompt"]]
+        for camera, frame, (prompt_index, prompt) in itertools.product(cameras, parse_frames(job.get("frames")), enumerate(prompts)):
+            item = dict(options, blend=blend, camera=camera, frame=frame, prompt=prompt, prompt_index=prompt_index)
+            item["id"] = len(items)
+            item["output"] = item_output_path(output_dir, item)
+            items.append(item)
+    return items, output_dir
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))] if values else None
+
+class FarmCoordinator:
+    """
+    Hands work items to worker processes, one item per worker at a time.
+    Workers ask for a request slot before each API call, so at most
+    max_in_flight generations run across the whole farm. Failed items are
+    re-queued (possibly onto another worker) up to `retries` times, and a
+    worker that dies is restarted.
+    """
+    def __init__(self, items, worker_command, workers=2, max_in_flight=4, retries=DEFAULT_RETRIES, verbose=False):
+        self.items = items
+        self.worker_command = worker_command
+        self.workers = workers
+        self.retries = retries
+        self.verbose = verbose
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+
+        self._pending = list(items)
+        self._unfinished = len(items)
+        self._cond = threading.Condition()
+        self.attempts = {item["id"]: [] for item in items}
+        self.results = {}
+        self.peak_in_flight = 0
+        self._active_requests = 0
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self._worker_loop, args=(index,), name=f"AIRenderFarm{index}", daemon=True)
+            for index in range(min(self.workers, len(self.items)))
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return self.results
+
+    def _next_item(self):
+        with self._cond:
+            while True:
+                if self._pending:
+                    return self._pending.pop(0)
+                if self._unfinished == 0:
+                    return None
+                # Another worker may still fail an item and re-queue it
+                self._cond.wait()
+
+    def _complete(self, item, outcome):
+        with self._cond:
+            attempts = self.attempts[item["id"]]
+            attempts.append(outcome)
+            if outcome["ok"] or len(attempts) > self.retries:
+                self.results[item["id"]] = outcome
+                self._unfinished -= 1
+            else:
+                print(f"Item {item['id']} failed on worker {outcome['worker']} ({outcome['error']}); retrying")
+                self._pending.append(item)
+            self._cond.notify_all()
+
+    def _spawn(self):
+        return subprocess.Popen(
+            self.worker_command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, text=True, bufsize=1
+        )
+
+    def _worker_loop(self, index):
+        proc = None
+        try:
+            while True:
+                item = self._next_item()
+                if item is None:
+                    break
+                start = time.perf_counter()
+                # Whatever happens, the popped item is completed or re-queued,
+                # or the other threads would wait for it forever
+                outcome = {"ok": False, "error": "Coordinator thread stopped", "log": [], "timings": {}}
+                try:
+                    if proc is None or proc.poll() is not None:
+                        proc = self._spawn()
+                    outcome = self._run_on(proc, item, index)
+                except Exception as e:
+                    outcome = dict(outcome, error=f"Worker failed: {e}")
+                finally:
+                    outcome["worker"] = index
+                    outcome["seconds"] = time.perf_counter() - start
+                    self._complete(item, outcome)
+        finally:
+            if proc is not None and proc.poll() is None:
+                try:
+                    proc.stdin.write(json.dumps({"type": "quit"}) + "\n")
+                    proc.stdin.flush()
+                    proc.wait(timeout=30)
+                except (OSError, subprocess.TimeoutExpired):
+                    proc.kill()
+
+    def _run_on(self, proc, item, index):
+        """
+        Sends one item to a worker and serves its slot requests until it reports a result.
+        """
+        log = []
+        holding = False
+        try:
+            proc.stdin.write(json.dumps({"type": "item", "item": item}) + "\n")
+            proc.stdin.flush()
+            for line in proc.stdout:
+                if not line.startswith(PROTOCOL_PREFIX):
+                    log.append(line.rstrip())
+                    del log[:-LOG_TAIL]
+                    if self.verbose:
+                        print(f"[worker {index}] {line.rstrip()}")
+                    continue
+                message = json.loads(line[len(PROTOCOL_PREFIX):])
+                if message["type"] == "acquire":
+                    self.in_flight.acquire()
+                    holding = True
+                    with self._cond:
+                        self._active_requests += 1
+                        self.peak_in_flight = max(self.peak_in_flight, self._active_requests)
+                    proc.stdin.write(json.dumps({"type": "grant"}) + "\n")
+                    proc.stdin.flush()
+                elif message["type"] == "release":
+                    self._release_slot()
+                    holding = False
+                elif message["type"] == "result":
+                    message["log"] = log
+                    return message
+        except OSError as e:
+            log.append(f"Pipe error: {e}")
+        except (ValueError, KeyError) as e:
+            # Malformed or truncated protocol line; the worker can't be trusted with another item
+            log.append(f"Protocol error: {e}")
+            proc.kill()
+        finally:
+            if holding:
+                self._release_slot()
+        proc.wait()
+        return {"ok": False, "error": f"Worker exited with code {proc.returncode}", "log": log, "timings": {}}
+
+    def _release_slot(self):
+        with self._cond:
+            self._active_requests -= 1
+        self.in_flight.release()
+
+def build_report(coordinator, skipped, wall_seconds, manifest_path):
+    results = []
+    stages = {}
+    done = failed = 0
+    for item in coordinator.items:
+        outcome = coordinator.results.get(item["id"], {})
+        if outcome.get("ok"):
+            done += 1
+            for stage, seconds in outcome.get("timings", {}).items():
+                stages.setdefault(stage, []).append(seconds)
+        else:
+            failed += 1
+        results.append({
+            "id": item["id"],
+            "blend": item["blend"], "scene": item["scene"], "camera": item["camera"],
+            "frame": item["frame"], "prompt_index": item["prompt_index"],
+            "status": "done" if outcome.get("ok") else "failed",
+            "output": item["output"],
+            "timings": outcome.get("timings", {}),
+            "attempts": [
+                {k: a.get(k) for k in ("worker", "seconds", "ok", "error")}
+                for a in coordinator.attempts[item["id"]]
+            ],
+            "log_tail": [] if outcome.get("ok") else outcome.get("log", []),
+        })
+    return {
+        "manifest": manifest_path,
+        "wall_seconds": wall_seconds,
+        "workers": coordinator.workers,
+        "max_in_flight": coordinator.max_in_flight,
+        "peak_in_flight": coordinator.peak_in_flight,
+        "items": {"total": len(coordinator.items) + skipped, "done": done, "failed": failed, "skipped": skipped},
+        "items_per_minute": done / wall_seconds * 60 if wall_seconds else 0.0,
+        "stages": {
+            stage: {"mean": sum(v) / len(v), "p50": percentile(v, 50), "p95": percentile(v, 95), "max": max(v)}
+            for stage, v in stages.items()
+        },
+        "results": results,
+    }
+
+def blender_worker_command(blender):
+    return [blender, "-b", "--python", os.path.abspath(__file__), "--", "--worker"]
+
+def run_farm(manifest_path, worker_command, workers=2, max_in_flight=4, retries=DEFAULT_RETRIES, report_path=None, force=False, verbose=False):
+    """
+    Runs every item of the manifest and writes the JSON report. Returns the report.
+    """
+    manifest = load_manifest(manifest_path)
+    items, output_dir = expand_manifest(manifest, os.path.dirname(os.path.abspath(manifest_path)))
+    todo = [item for item in items if force or not os.path.exists(item["output"])]
+    print(f"Farm: {len(todo)} item(s) to render, {len(items) - len(todo)} already done, "
+          f"{workers} worker(s), {max_in_flight} request(s) in flight")
+
+    coordinator = FarmCoordinator(todo, worker_command, workers, max_in_flight, retries, verbose)
+    start = time.perf_counter()
+    coordinator.run()
+    report = build_report(coordinator, len(items) - len(todo), time.perf_counter() - start, manifest_path)
+
+    report_path = report_path or os.path.join(output_dir, "farm_report.json")
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    counts = report["items"]
+    print(f"Farm finished in {report['wall_seconds']:.1f}s: {counts['done']} done, {counts['failed']} failed, "
+          f"{counts['skipped']} skipped ({report['items_per_minute']:.1f} items/min)")
+    for stage, stats in report["stages"].items():
+        print(f"  {stage:<10} p50 {stats['p50']:.2f}s  p95 {stats['p95']:.2f}s  max {stats['max']:.2f}s")
+    print(f"Report: {report_path}")
+    return report
+
+def _send(message):
+    print(PROTOCOL_PREFIX + json.dumps(message), flush=True)
+
+class _RequestSlot:
+    """
+    Holds one of the coordinator's farm-wide request slots.
+    """
+    def __enter__(self):
+        _send({"type": "acquire"})
+        while True:
+            line = sys.stdin.readline()
+            if not line:
+                raise RuntimeError("Coordinator closed the connection")
+            if json.loads(line).get("type") == "grant":
+                return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _send({"type": "release"})
+        return False
+
+def run_item(item, api_key):
+    """
+    Loads the item's scene, captures, generates and writes the result.
+    Returns a result message with per-stage timings.
+    """
+    import types
+    import bpy
+    from AiRender import capture, client, preprocess, operators
+
+    timings = {}
+    init_capture = None
+    stage_start = time.perf_counter()
+
+    def lap(stage):
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[stage] = now - stage_start
+        stage_start = now
+
+    # Endpoint overrides apply to this item only; later items on this worker get the defaults back
+    endpoints = client.MODEL_ENDPOINT, client.EDIT_ENDPOINT
+    try:
+        if item["endpoint"]:
+            client.MODEL_ENDPOINT = item["endpoint"]
+        if item["edit_endpoint"]:
+            client.EDIT_ENDPOINT = item["edit_endpoint"]
+
+        if item["blend"] and os.path.abspath(bpy.data.filepath or "") != os.path.abspath(item["blend"]):
+            bpy.ops.wm.open_mainfile(filepath=item["blend"])
+        scene = bpy.data.scenes[item["scene"]] if item["scene"] else bpy.context.scene
+        if item["camera"]:
+            scene.camera = bpy.data.objects[item["camera"]]
+        if item["resolution"]:
+            scene.render.resolution_x, scene.render.resolution_y = item["resolution"]
+        if item["frame"] is not None:
+            scene.frame_set(item["frame"])
+        lap("load")
+
+        if item["capture"] != "NONE":
+            if scene.camera is None:
+                raise RuntimeError("Scene has no camera")
+            capture_path = os.path.join(os.path.dirname(item["output"]), f".capture_{item['id']}.png")
+            os.makedirs(os.path.dirname(capture_path), exist_ok=True)
+            # Engine captures only read context.scene
+            raw_capture = capture.capture_scene(
+                types.SimpleNamespace(scene=scene), item["capture"], item["capture_scale"], capture_path
+            )
+            init_capture, _ = preprocess.prepare_upload(
+                raw_capture, item["upload_max_mpix"], item["upload_format"],
+                item["upload_quality"], item["upload_png_compression"]
+            )
+        lap("capture")
+
+        prompt = item["prompt"] + (operators.STYLE_SUFFIX if item["enhance_prompt"] else "")
+        with _RequestSlot():
+            lap("slot_wait")
+            result_url = client.send_api_request(
+                api_key, prompt,
+                strength=item["strength"],
+                width=scene.render.resolution_x,
+                height=scene.render.resolution_y,
+                retry_policy=client.RetryPolicy(item["retry_attempts"]),
+                backend=item["backend"],
+                **(init_capture.request_kwargs() if init_capture else {})
+            )
+        lap("generate")
+
+        data = client.fetch_image_bytes(result_url)
+        os.makedirs(os.path.dirname(item["output"]), exist_ok=True)
+        part_path = item["output"] + ".part"
+        with open(part_path, "wb") as f:
+            f.write(data)
+        os.replace(part_path, item["output"])
+        lap("download")
+        return {"type": "result", "ok": True, "output": item["output"], "bytes": len(data), "timings": timings}
+    except Exception as e:
+        return {"type": "result", "ok": False, "error": str(e) or type(e).__name__, "timings": timings}
+    finally:
+        client.MODEL_ENDPOINT, client.EDIT_ENDPOINT = endpoints
+        if init_capture:
+            init_capture.cleanup()
+
+def worker_main():
+    """
+    Serves items from the coordinator until told to quit.
+    """
+    if ADDON_PARENT not in sys.path:
+        sys.path.insert(0, ADDON_PARENT)
+    from AiRender import props, ratelimit
+
+    api_key = os.environ.get("FAL_KEY") or props.load_env_key()
+    # Spread this worker's requests over every key in .env, least recently used first
+    ratelimit.configure(pool_keys=props.load_env_keys())
+    for line in sys.stdin:
+        message = json.loads(line)
+        if message["type"] == "quit":
+            break
+        if message["type"] == "item":
+            _send(run_item(message["item"], api_key))
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="farm.py", description="Headless AI Render farm")
+    parser.add_argument("manifest", nargs="?")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Blender executable for workers")
+    parser.add_argument("--workers", type=int, default=2, help="Blender worker processes")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="API requests running at once across all workers")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Extra attempts per failed item")
+    parser.add_argument("--report", help="Report path (default: <output_dir>/farm_report.json)")
+    parser.add_argument("--force", action="store_true", help="Re-render items whose output exists")
+    parser.add_argument("--verbose", action="store_true", help="Echo worker log output")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        worker_main()
+        return 0
+    if not args.manifest:
+        parser.error("a manifest is required")
+    report = run_farm(
+        args.manifest, blender_worker_command(args.blender), args.workers, args.max_in_flight,
+        args.retries, args.report, args.force, args.verbose
+    )
+    return 1 if report["items"]["failed"] else 0
+
+if __name__ == "__main__":
+    # Under `blender -b --python farm.py -- ...` our arguments follow "--"
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    code = main(argv)
+    if code:
+        sys.exit(code)
@@ -0,0 +1,190 @@
+import struct
+import zlib
+
+# numpy ships with Blender; imported lazily so the network code stays importable without it
+
+def _png_chunk(tag, data):
+    chunk = tag + data
+    return struct.pack(">I", len(data)) + chunk + struct.pack(">I", zlib.crc32(chunk) & 0xFFFFFFFF)
+
+def encode_png(pixels, compress_level=6):
+    """
+    Encodes an (H, W, 3|4) uint8 array, top row first, to PNG bytes in memory.
+    """
+    import numpy as np
+
+    height, width, channels = pixels.shape
+    color_type = {3: 2, 4: 6}[channels]
+    # Filter type 0 (None) on every scanline: prepend a zero byte per row
+    raw = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels.reshape(height, width * channels)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", header),
+        _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), compress_level)),
+        _png_chunk(b"IEND", b""),
+    ))
+
+def float_to_uint8(pixels):
+    """
+    Converts Blender's float pixels (0..1) to uint8.
+    """
+    import numpy as np
+    return (np.clip(pixels, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+def _area_weights(src, dst):
+    """
+    (dst, src) matrix averaging each destination pixel over the source
+    pixels it covers; rows sum to 1.
+    """
+    import numpy as np
+
+    scale = src / dst
+    edges = np.arange(dst + 1, dtype=np.float64) * scale
+    lo, hi = edges[:-1, None], edges[1:, None]
+    pos = np.arange(src, dtype=np.float64)[None, :]
+    overlap = np.clip(np.minimum(hi, pos + 1) - np.maximum(lo, pos), 0.0, None)
+    return (overlap / scale).astype(np.float32)
+
+def resize_area(pixels, width, height):
+    """
+    Area-average (box filter) resize of an (H, W, C) uint8 array. Applied as
+    two matrix products so the whole image is processed in vectorised form.
+    """
+    import numpy as np
+
+    src_h, src_w, channels = pixels.shape
+    if (src_w, src_h) == (width, height):
+        return pixels
+    wy = _area_weights(src_h, height)
+    wx = _area_weights(src_w, width)
+    out = np.empty((height, width, channels), dtype=np.float32)
+    for c in range(channels):
+        out[:, :, c] = wy @ pixels[:, :, c].astype(np.float32) @ wx.T
+    return (out + 0.5).clip(0, 255).astype(np.uint8)
+
+def fit_pixel_count(width, height, max_pixels):
+    """
+    Largest size with the same aspect ratio and at most max_pixels pixels.
+    """
+    if not max_pixels or width * height <= max_pixels:
+        return width, height
+    factor = (max_pixels / (width * height)) ** 0.5
+    return max(1, int(width * factor)), max(1, int(height * factor))
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG color type -> samples per pixel
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+def _read_png_chunks(data):
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG image")
+    chunks = {"IDAT": []}
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        length, tag = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        tag = tag.decode('latin-1')
+        if tag == "IDAT":
+            chunks["IDAT"].append(body)
+        elif tag == "IEND":
+            break
+        else:
+            chunks[tag] = body
+        pos += 12 + length
+    return chunks
+
+def _unfilter(filtered, filter_types, bpp):
+    """
+    Reverses PNG scanline filters on an (H, N, bpp) uint8 array.
+    None/Sub/Up-only images are undone row by row; Average and Paeth depend
+    on the reconstructed left neighbour, so those images are processed one
+    anti-diagonal at a time, which is vectorised across all rows at once.
+    """
+    import numpy as np
+
+    height, width, _ = filtered.shape
+    x = filtered.astype(np.int16)
+
+    if set(np.unique(filter_types).tolist()) <= {0, 1, 2}:
+        out = np.empty_like(x)
+        prev = np.zeros((width, bpp), dtype=np.int16)
+        for r in range(height):
+            ft = filter_types[r]
+            if ft == 1:
+                out[r] = np.cumsum(x[r], axis=0) & 0xFF
+            elif ft == 2:
+                out[r] = (x[r] + prev) & 0xFF
+            else:
+                out[r] = x[r]
+            prev = out[r]
+        return out.astype(np.uint8)
+
+    # Padded by one zero row on top and one zero column on the left, then
+    # flattened so each anti-diagonal is a plain strided slice (no fancy indexing)
+    stride = width + 1
+    out = np.zeros(((height + 1) * stride, bpp), dtype=np.int16)
+    x_flat = x.reshape(height * width, bpp)
+    ft = filter_types.astype(np.int16)[:, None]
+    is_sub, is_up, is_avg, is_paeth = (ft == 1), (ft == 2), (ft == 3), (ft == 4)
+    x_step = max(1, width - 1)
+    for k in range(height + width - 1):
+        r0, r1 = max(0, k - width + 1), min(height - 1, k) + 1
+        first = (r0 + 1) * stride + (k - r0) + 1
+        cur = slice(first, first + (r1 - r0 - 1) * width + 1, width)
+        a = out[first - 1:cur.stop - 1:width]                    # left
+        b = out[first - stride:cur.stop - stride:width]          # up
+        ul = out[first - stride - 1:cur.stop - stride - 1:width] # up-left
+        rows = slice(r0, r1)
+        pa = np.abs(b - ul)
+        pb = np.abs(a - ul)
+        pc = np.abs(a + b - 2 * ul)
+        paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, ul))
+        pred = a * is_sub[rows] + b * is_up[rows] + ((a + b) >> 1) * is_avg[rows] + paeth * is_paeth[rows]
+        xs = r0 * width + (k - r0)
+        out[cur] = (x_flat[xs:xs + (r1 - r0 - 1) * x_step + 1:x_step] + pred) & 0xFF
+    return out.reshape(height + 1, stride, bpp)[1:, 1:].astype(np.uint8)
+
+def decode_png(data):
+    """
+    Decodes PNG bytes (8/16-bit grey, grey+alpha, RGB, RGBA or 8-bit palette,
+    non-interlaced) into a float32 RGBA array of shape (H, W, 4), top row first.
+    Raises ValueError for anything else so callers can fall back to Blender's loader.
+    """
+    import numpy as np
+
+    chunks = _read_png_chunks(data)
+    width, height, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", chunks["IHDR"])
+    if interlace or color_type not in _PNG_CHANNELS or depth not in (8, 16) or (color_type == 3 and depth != 8):
+        raise ValueError(f"Unsupported PNG layout (type {color_type}, depth {depth}, interlace {interlace})")
+
+    channels = _PNG_CHANNELS[color_type]
+    bpp = channels * depth // 8
+    raw = np.frombuffer(zlib.decompress(b"".join(chunks["IDAT"])), dtype=np.uint8)
+    raw = raw[:height * (width * bpp + 1)].reshape(height, width * bpp + 1)
+    samples = _unfilter(raw[:, 1:].reshape(height, width, bpp), raw[:, 0], bpp)
+
+    if depth == 16:
+        values = samples.view(">u2").reshape(height, width, channels).astype(np.float32) / 65535.0
+    else:
+        values = samples.astype(np.float32) / 255.0
+
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    if color_type == 3:
+        palette = np.frombuffer(chunks["PLTE"], dtype=np.uint8).reshape(-1, 3).astype(np.float32) / 255.0
+        alpha = np.ones(len(palette), dtype=np.float32)
+        trns = np.frombuffer(chunks.get("tRNS", b""), dtype=np.uint8)
+        alpha[:len(trns)] = trns / 255.0
+        index = samples[:, :, 0]
+        rgba[:, :, :3] = palette[index]
+        rgba[:, :, 3] = alpha[index]
+    elif channels in (1, 2):
+        rgba[:, :, :3] = values[:, :, :1]
+        if channels == 2:
+            rgba[:, :, 3] = values[:, :, 1]
+    else:
+        rgba[:, :, :channels] = values
+    return rgba
@@ -0,0 +1,111 @@
+import time
+
+from . import changes
+from . import scheduler
+
+class LiveSession:
+    """
+    Debounce and latest-wins bookkeeping for live mode. The operator reports
+    the input state every tick; once it has settled, the operator captures a
+    job and offers it here. At most one job is in flight: a newer job
+    cancels the running one (its sockets are closed and its result dropped)
+    and waits as the single pending job until that one has wound down. A
+    still newer job replaces the pending one.
+    """
+    def __init__(self, delay):
+        self.delay = delay
+        self.current = None
+        self.pending = None
+        self.generated = 0
+        self.superseded = 0
+        self.stopped = False
+        self._state = None
+        self._changed_at = None
+        self._rendered_state = None
+        self._last_capture = None
+
+    def observe(self, state, now=None):
+        """
+        Records the input state. Returns True once it has held for `delay`
+        seconds and differs from the last state a job was made for.
+        """
+        now = time.monotonic() if now is None else now
+        if state != self._state:
+            self._state = state
+            self._changed_at = now
+        return state != self._rendered_state and now - self._changed_at >= self.delay
+
+    def skip(self):
+        """
+        Marks the observed state as handled without a job (e.g. the capture failed).
+        """
+        self._rendered_state = self._state
+
+    def is_repeat(self, settings, capture_hash, tolerance):
+        """
+        True if a capture looks like the last one offered and that job is
+        still running or succeeded, e.g. when the state changed in a way the
+        camera doesn't see.
+        """
+        if self._last_capture is None or capture_hash is None:
+            return False
+        last_settings, last_hash, last_job = self._last_capture
+        if last_settings != settings or last_job.cancelled or last_job.state == scheduler.FAILED:
+            return False
+        return changes.hash_distance(last_hash, capture_hash) <= tolerance
+
+    def offer(self, job, settings=None, capture_hash=None):
+        """
+        Takes a captured job for the observed state. Returns it if it can be
+        submitted now, or None if it has to wait for a superseded job.
+        """
+        self._rendered_state = self._state
+        self._last_capture = (settings, capture_hash, job)
+        if self.pending is not None:
+            self.pending.cancel()
+            self.superseded += 1
+        if self.current is not None and not self.current.finished:
+            if not self.current.cancelled:
+                self.current.cancel()
+                self.superseded += 1
+            self.pending = job
+            return None
+        self.pending = None
+        self.current = job
+        self.generated += 1
+        return job
+
+    def next_job(self):
+        """
+        The pending job, once the job it superseded has finished.
+        """
+        if self.pending is None or (self.current is not None and not self.current.finished):
+            return None
+        self.current, self.pending = self.pending, None
+        self.generated += 1
+        return self.current
+
+    def stop(self):
+        self.stopped = True
+        for job in (self.pending, self.current):
+            if job is not None and not job.finished:
+                job.cancel()
+
+_session = None
+
+def get_session():
+    """
+    The running live session, or None when live mode is off.
+    """
+    return _session
+
+def start(delay):
+    global _session
+    _session = LiveSession(delay)
+    return _session
+
+def stop():
+    global _session
+    if _session is not None:
+        _session.stop()
+        _session = None
@@ -0,0 +1,307 @@
+import csv
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+# Job stages with recorded durations, in the order a job passes through them
+STAGES = ("CAPTURING", "UPLOADING", "GENERATING", "DOWNLOADING")
+
+METRICS_FILE_NAME = "metrics.sqlite"
+
+# Samples kept on disk; the oldest are dropped when the store is opened
+MAX_SAMPLES = 50000
+
+# Histogram buckets: bucket i covers BUCKET_BASE * BUCKET_GROWTH ** (i, i + 1) seconds
+BUCKET_BASE = 0.01
+BUCKET_GROWTH = 1.15
+BUCKET_COUNT = 96 # Up to ~6.6 hours
+
+# A histogram needs this many samples before estimates are taken from it
+MIN_SAMPLES = 5
+
+# Upper bounds of the resolution (megapixels) and payload (MB) classes samples are grouped by
+RESOLUTION_CLASSES = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+PAYLOAD_CLASSES = (0.0, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+
+def get_metrics_path():
+    return os.path.join(os.path.expanduser("~"), ".ai_render", METRICS_FILE_NAME)
+
+def _class_of(value, bounds):
+    for bound in bounds:
+        if value <= bound:
+            return bound
+    return math.inf
+
+def resolution_class(width, height):
+    return _class_of(width * height / 1e6, RESOLUTION_CLASSES)
+
+def payload_class(payload_bytes):
+    return _class_of(payload_bytes / 1e6, PAYLOAD_CLASSES)
+
+class Histogram:
+    """
+    Streaming histogram of durations on log-spaced buckets (~7% wide), so
+    quantiles stay within a few percent whatever the scale and memory is
+    fixed however many samples arrive.
+    """
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        if seconds <= BUCKET_BASE:
+            index = 0
+        else:
+            index = min(BUCKET_COUNT - 1, int(math.log(seconds / BUCKET_BASE, BUCKET_GROWTH)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """
+        Duration below which a fraction q of the samples fall, interpolated
+        geometrically inside the bucket; None if empty.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                within = (rank - seen) / n
+                return BUCKET_BASE * BUCKET_GROWTH ** (index + within)
+            seen += n
+        return BUCKET_BASE * BUCKET_GROWTH ** BUCKET_COUNT
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+class MetricsStore:
+    """
+    Per-stage job durations, appended to a SQLite file so they survive
+    restarts, with in-memory histograms for quantiles. Samples are grouped
+    by stage, endpoint, resolution class and payload class; lookups fall
+    back to coarser groups until one has MIN_SAMPLES samples.
+    Safe to share between threads; lookups never wait on a disk write.
+    """
+    def __init__(self, path=None):
+        self.path = path or get_metrics_path()
+        # _lock guards the histograms, _db_lock the connection
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._histograms = {}
+        self.samples = 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            "ts REAL, stage TEXT, endpoint TEXT, width INTEGER, height INTEGER, payload INTEGER, seconds REAL)"
+        )
+        self._prune()
+        self._load()
+
+    def _prune(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM samples").fetchone()
+        if count > MAX_SAMPLES:
+            self._db.execute(
+                "DELETE FROM samples WHERE rowid IN (SELECT rowid FROM samples ORDER BY rowid LIMIT ?)",
+                (count - MAX_SAMPLES,)
+            )
+            self._db.commit()
+
+    def _load(self):
+        for stage, endpoint, width, height, payload, seconds in self._db.execute(
+                "SELECT stage, endpoint, width, height, payload, seconds FROM samples"):
+            self._add(stage, endpoint, width, height, payload, seconds)
+
+    @staticmethod
+    def _keys(stage, endpoint, width, height, payload_bytes):
+        """
+        Group keys from the most to the least specific.
+        """
+        res = resolution_class(width, height)
+        size = payload_class(payload_bytes)
+        return (
+            (stage, endpoint, res, size),
+            (stage, endpoint, res, None),
+            (stage, endpoint, None, None),
+            (stage, None, None, None),
+        )
+
+    def _add(self, stage, endpoint, width, height, payload_bytes, seconds):
+        for key in self._keys(stage, endpoint, width, height, payload_bytes):
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.add(seconds)
+        self.samples += 1
+
+    def record(self, stage_seconds, endpoint, width, height, payload_bytes):
+        """
+        Stores the durations of one finished job ({stage: seconds}; stages
+        outside STAGES are ignored).
+        """
+        now = time.time()
+        rows = [
+            (now, stage, endpoint, width, height, payload_bytes, seconds)
+            for stage, seconds in stage_seconds.items() if stage in STAGES
+        ]
+        with self._lock:
+            for row in rows:
+                self._add(*row[1:])
+        with self._db_lock:
+            self._db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def histogram(self, stage, endpoint, width, height, payload_bytes):
+        """
+        The most specific histogram for the request with enough samples, or None.
+        """
+        with self._lock:
+            for key in self._keys(stage, endpoint, width, height, payload_bytes):
+                histogram = self._histograms.get(key)
+                if histogram is not None and histogram.count >= MIN_SAMPLES:
+                    return histogram
+        return None
+
+    def estimate(self, stage, endpoint, width, height, payload_bytes, q=0.5):
+        histogram = self.histogram(stage, endpoint, width, height, payload_bytes)
+        if histogram is None:
+            return None
+        with self._lock:
+            return histogram.quantile(q)
+
+    def eta(self, state, elapsed_in_state, stage_seconds, endpoint, width, height, payload_bytes):
+        """
+        (seconds left, fraction done) for a job in `state` from the median
+        stage durations, or None without enough history. A stage running
+        over its median counts as nearly done rather than done.
+        """
+        if state not in STAGES and state != "QUEUED":
+            return None
+        remaining = 0.0
+        # Jobs are captured before they are queued
+        start = STAGES.index(state) if state in STAGES else STAGES.index("UPLOADING")
+        for stage in STAGES[start:]:
+            median = self.estimate(stage, endpoint, width, height, payload_bytes)
+            if median is None:
+                if stage in ("UPLOADING", "GENERATING"):
+                    return None # The stages that dominate; no guess without them
+                continue
+            if stage == state:
+                # Past the median, the p90 is the better bound for what is left
+                expected = median if elapsed_in_state < median else \
+                    self.estimate(stage, endpoint, width, height, payload_bytes, 0.9)
+                remaining += max(expected - elapsed_in_state, 0.05 * expected)
+            else:
+                remaining += median
+        done = sum(stage_seconds.get(stage, 0.0) for stage in STAGES)
+        if state in STAGES:
+            done += elapsed_in_state
+        return remaining, done / (done + remaining) if done + remaining > 0 else 0.0
+
+    def summary(self):
+        """
+        Rows of (stage, endpoint, resolution class, payload class, count,
+        mean, p50, p90, p99) for every fully specific group.
+        """
+        with self._lock:
+            return [
+                (stage, endpoint, res, size, h.count, h.mean, h.quantile(0.5), h.quantile(0.9), h.quantile(0.99))
+                for (stage, endpoint, res, size), h in self._histograms.items()
+                if endpoint is not None and res is not None and size is not None
+            ]
+
+    def export(self, path):
+        """
+        Writes every sample as CSV, or for a .json path the per-group
+        quantile summary together with the samples. Returns the sample count.
+        """
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT ts, stage, endpoint, width, height, payload, seconds FROM samples ORDER BY rowid"
+            ).fetchall()
+        columns = ("timestamp", "stage", "endpoint", "width", "height", "payload_bytes", "seconds")
+        if path.lower().endswith(".json"):
+            summary_columns = ("stage", "endpoint", "max_megapixels", "max_payload_mb", "count", "mean", "p50", "p90", "p99")
+            summary = [
+                dict(zip(summary_columns, (row[:2] + tuple(None if v == math.inf else v for v in row[2:4]) + row[4:])))
+                for row in self.summary()
+            ]
+            with open(path, "w") as f:
+                json.dump({"summary": summary, "samples": [dict(zip(columns, row)) for row in rows]}, f, indent=1)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+        return len(rows)
+
+    def close(self):
+        with self._db_lock:
+            self._db.close()
+
+# The shared store is only published once its history has loaded, so readers
+# check _store without a lock; _open_lock just keeps two threads from opening it
+_store = None
+_open_lock = threading.Lock()
+_load_scheduled = False
+
+def get_store():
+    """
+    The shared store, opened (and its history loaded) on first use. Blocks
+    while the history loads; the main thread uses loaded_store instead.
+    """
+    global _store
+    store = _store
+    if store is not None:
+        return store
+    with _open_lock:
+        if _store is None:
+            _store = MetricsStore()
+        return _store
+
+def loaded_store(schedule):
+    """
+    The shared store, or None while its history is not loaded yet. The first
+    call hands the load to `schedule` (e.g. the scheduler's run_in_worker).
+    """
+    global _load_scheduled
+    store = _store
+    if store is not None:
+        return store
+    with _open_lock:
+        if _load_scheduled or _store is not None:
+            return _store
+        _load_scheduled = True
+    schedule(_load_store)
+    return None
+
+def _load_store():
+    try:
+        get_store()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Failed to open job metrics: {e}")
+
+def sample_count():
+    """
+    Samples in the shared store, or None if it isn't loaded yet (loading
+    reads the whole history, which the panel shouldn't wait on).
+    """
+    store = _store
+    return store.samples if store is not None else None
+
+def close_store():
+    global _store, _load_scheduled
+    with _open_lock:
+        store, _store = _store, None
+        _load_scheduled = False
+    if store is not None:
+        store.close()
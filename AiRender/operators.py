@@ -1,93 +1,311 @@
 import bpy
+import copy
+import os
+import sqlite3
 import threading
 import time
+from . import backends
 from . import client
 from . import utils
+from . import cache
+from . import scheduler
+from . import async_queue
+from . import pipeline
+from . import capture
+from . import preprocess
+from . import imaging
+from . import tracing
+from . import variations
+from . import tiling
+from . import changes
+from . import live
+from . import metrics
+from . import props
+from . import ratelimit
 
-_active_job = False
+STYLE_SUFFIX = ", high quality CGI render, physically based rendering, detailed materials and textures, 8k, cinematic lighting, photorealistic, Ray Tracing, Global Illumination, sharp details, professional photography"
 
-class AIRenderJob(threading.Thread):
-    def __init__(self, context, init_image_path):
+def build_prompt(scene, prompt=None):
+    """
+    Final prompt sent to the API (default: the scene prompt), including the
+    auto-enhance suffix.
+    """
+    if prompt is None:
+        prompt = scene.ai_prompt
+    if scene.ai_enhance_prompt:
+        prompt += STYLE_SUFFIX
+    return prompt
+
+class AIRenderJob(scheduler.Job):
+    # Tracing span from job creation to the result showing on the overlay
+    first_pixel_span = "first_pixel"
+
+    def __init__(self, context, init_capture=None, camera=None, result_path=None):
         super().__init__()
         self.context = context
-        self.init_image_path = init_image_path
+        self.init_capture = init_capture
+        # The result goes onto this camera's overlay plane
+        camera = camera or context.scene.camera
+        self.camera_name = camera.name if camera else None
         
-        # Prepare Prompt
-        prompt = context.scene.ai_prompt
-        if context.scene.ai_enhance_prompt:
-            style_suffix = ", high quality CGI render, physically based rendering, detailed materials and textures, 8k, cinematic lighting, photorealistic, Ray Tracing, Global Illumination, sharp details, professional photography"
-            prompt += style_suffix
-            
-        self.param_prompt = prompt
+        self.param_prompt = build_prompt(context.scene)
+        self.param_seed = None
         self.param_api_key = context.scene.ai_api_key
         self.param_strength = context.scene.ai_img_strength
         self.param_w = context.scene.render.resolution_x
         self.param_h = context.scene.render.resolution_y
+        self.param_cache = context.scene.ai_cache_enabled
+        self.param_cache_bytes = context.scene.ai_cache_size_mb * 1024 * 1024
+        self.cache_key = None
+        # An existing result file (e.g. a promoted variation) skips generation
+        self.cached_path = result_path
+        self.param_submit_mode = context.scene.ai_submit_mode
+        self.result_url = None
+        self.success = False
+        self._future = None
+        # Closes the job's sockets when it is cancelled mid-request
+        self._abort = client.Abort()
+        self.param_history = context.scene.ai_overlay_history
+        self.output_path = None
+        self.error_status = "API Error"
+        self._main_thread_steps = None
+        self.upload_record = None
+        self._upload_started = None
+        self.param_in_memory = context.scene.ai_result_in_memory
+        self.param_save_dir = bpy.path.abspath(context.scene.ai_results_dir) if context.scene.ai_save_results else None
+        self.result_pixels = None
+        self.result_size = None
+        self._created = time.perf_counter()
+        self._generate_started = None
+        # (settings, scene, capture hash) remembered by the change detector once the result is shown
+        self.fingerprint = None
+        self.param_retry_policy, self.param_hedge_percentile = request_resilience(context.scene)
+        self.param_backend, self.param_fallback_after = request_routing(context.scene)
+        # The Backend this job's request goes to, chosen when it runs
+        self.backend = None
+        # Progressive renders: the low-resolution PreviewJob shown before this job's result
+        self.preview = None
+        # Seconds from the job's creation until its result was on the overlay
+        self.first_pixel_seconds = None
     
     def run(self):
-        global _active_job
-        _active_job = True
-        
         try:
-            # Step 1: Encode Image (Base64) - Bypass Upload
-            image_url = None
-            if self.init_image_path:
-                print(f"Encoding {self.init_image_path}...")
-                image_url = client.encode_image_to_base64(self.init_image_path)
-                print(f"Encoded Image (Base64 prefix): {image_url[:30]}...")
-
-            # Step 2: Generate
+            # Route first: results are cached per backend, so a fallback's never stands in for the main model's
+            if not self.cached_path:
+                self.backend = client.choose_backend(
+                    self.init_capture is not None, self.param_w, self.param_h, self.param_backend, self.param_fallback_after
+                )
+            # Step 0: Skip the round trip entirely if this exact request was made before
+            if self.param_cache and not self.cached_path:
+                result_cache = cache.get_cache(self.param_cache_bytes)
+                self.cache_key = cache.make_key(
+                    client.resolve_endpoint(self.init_capture is not None, self.backend),
+                    self.param_prompt,
+                    self.init_capture.source if self.init_capture else None,
+                    self.param_strength,
+                    self.param_w,
+                    self.param_h,
+                    self.param_seed
+                )
+                with tracing.span("cache_lookup", job_id=self.job_id) as trace:
+                    self.cached_path = result_cache.get(self.cache_key)
+                    trace.set(hit=self.cached_path is not None)
+
+            if self.cached_path:
+                print(f"Cache hit: {self.cached_path}")
+                self._finish()
+                return
+
+            if self.param_submit_mode == 'QUEUE':
+                # Hand off to the shared event loop; this worker is free again immediately
+                print(f"Queueing generation request... (Strength: {self.param_strength})")
+                self._future = async_queue.get_queue_client().submit(
+                    self.param_api_key,
+                    self.param_prompt,
+                    width=self.param_w,
+                    height=self.param_h,
+                    progress=self._on_progress,
+                    seed=self.param_seed,
+                    backend=self.backend,
+                    strength=self.param_strength,
+                    retry_policy=self.param_retry_policy,
+                    **self._image_kwargs()
+                )
+                self._future.add_done_callback(self._on_queue_done)
+                return
+
+            # Step 1 + 2: Generate. The capture is base64-streamed straight into
+            # the request body instead of being encoded up front.
             print(f"Sending generation request... (Strength: {self.param_strength})")
-            
-            self.result_url = client.send_api_request(
-                self.param_api_key, 
-                self.param_prompt, 
-                image_url=image_url,
-                strength=self.param_strength,
-                width=self.param_w, 
-                height=self.param_h
-            )
-            self.success = True
-            self.error_msg = None
+            with scheduler.get_scheduler().in_flight:
+                if self.cancelled:
+                    raise RuntimeError("Cancelled")
+                result_url = client.send_api_request(
+                    self.param_api_key, 
+                    self.param_prompt, 
+                    strength=self.param_strength,
+                    width=self.param_w, 
+                    height=self.param_h,
+                    progress=self._on_progress,
+                    retry_policy=self.param_retry_policy,
+                    hedge_percentile=self.param_hedge_percentile,
+                    is_cancelled=lambda: self.cancelled,
+                    seed=self.param_seed,
+                    abort=self._abort,
+                    backend=self.backend,
+                    **self._image_kwargs()
+                )
+            self._trace_generate_done()
+            self._finish(result_url)
         except Exception as e:
-            self.success = False
-            self.error_msg = str(e)
-            self.result_url = None
-            print(f"Job Error: {e}")
+            self._finish(error=e)
+
+    def _on_queue_done(self, future):
+        # Runs on the asyncio loop thread; move the download onto a worker
+        def complete():
+            try:
+                result_url = future.result()
+                self._trace_generate_done()
+                self._finish(result_url)
+            except BaseException as e:
+                self._finish(error=e)
+        scheduler.get_scheduler().run_in_worker(complete)
+
+    def _finish(self, result_url=None, error=None):
+        """
+        Worker-side completion: downloads and caches the result so that the
+        main thread only has to touch bpy datablocks.
+        """
+        self._remove_capture()
+        self.result_url = result_url
+        data = None
+        if error is None and not self.cancelled:
+            try:
+                if self.cached_path:
+                    with open(self.cached_path, "rb") as f:
+                        data = f.read()
+                else:
+                    self.set_state(scheduler.DOWNLOADING)
+                    with tracing.span("download", job_id=self.job_id) as trace:
+                        data = client.fetch_image_bytes(result_url, abort=self._abort)
+                        trace.set(bytes=len(data))
+                    if self.cache_key:
+                        with tracing.span("cache_put", job_id=self.job_id, bytes=len(data)):
+                            cache.get_cache().put_bytes(self.cache_key, data)
+                with tracing.span("decode", job_id=self.job_id, in_memory=self.param_in_memory):
+                    self._prepare_result(data)
+            except Exception as e:
+                self.error_status = "Download Failed"
+                error = e
+        self._complete(error, data)
+
+    def _complete(self, error, data):
+        """
+        Records the outcome and hands the result to the main thread.
+        """
+        self.success = error is None
+        self.error_msg = (str(error) or type(error).__name__) if error else None
+        if error:
+            print(f"Job Error: {self.error_msg}")
+
+        if self.cancelled:
+            self.set_state(scheduler.CANCELLED)
+            return
+
+        preview = self.preview
+        if error is None and preview is not None and not preview.finished and preview.first_pixel_seconds is None:
+            # The full result got here first; showing the preview now would only flash it
+            preview.cancel()
+            print(f"Progressive: full result of job {self.job_id} arrived first; preview cancelled")
 
         # Schedule the UI update on the main thread
+        self._main_thread_steps = self._apply_result_steps()
         bpy.app.timers.register(self._main_thread_callback)
 
-    def _main_thread_callback(self):
-        scene = self.context.scene
-        
-        if self.success:
+        # Optional background save, off the path to the visible overlay
+        if data is not None and self.param_save_dir:
+            self._save_result(data)
+
+    def _prepare_result(self, data):
+        """
+        Decodes the result into a flat float32 RGBA buffer (bottom row first, as
+        Blender stores pixels) so the main thread only has to foreach_set it.
+        Formats the NumPy decoder can't handle go through a file instead.
+        """
+        if self.param_in_memory:
             try:
-                scene.ai_status = "Downloading Image..."
-                temp_path = utils.get_temp_path()
-                client.download_image(self.result_url, temp_path)
-                
-                scene.ai_status = "Updating Viewport..."
-                plane = utils.get_or_create_overlay_plane(self.context)
-                if plane:
-                    utils.fit_overlay_to_camera(plane, scene)
-                    mat = utils.create_overlay_material(scene, temp_path)
-                    if plane.data.materials:
-                        plane.data.materials[0] = mat
-                    else:
-                        plane.data.materials.append(mat)
-                
-                # Force Viewport Update
-                utils.force_viewport_shading(self.context)
-                
-                scene.ai_status = "Done"
-            except Exception as e:
-                scene.ai_status = "Download Failed"
-                print(f"Download/Update Error: {e}")
+                import numpy as np
+                rgba = imaging.decode_png(data)
+                self.result_size = (rgba.shape[1], rgba.shape[0])
+                self.result_pixels = np.ascontiguousarray(rgba[::-1]).ravel()
+                return
+            except ValueError as e:
+                print(f"In-memory decode unavailable ({e}); loading from file")
+
+        if self.cached_path:
+            self.output_path = self.cached_path
         else:
-            scene.ai_status = "API Error"
-            print(f"API Job Failed: {self.error_msg}")
-            
+            self.output_path = utils.get_temp_path(f"ai_render_output_{self.job_id}.png")
+            with open(self.output_path, "wb") as f:
+                f.write(data)
+
+    def _save_result(self, data):
+        try:
+            with tracing.span("save_result", job_id=self.job_id, bytes=len(data)):
+                os.makedirs(self.param_save_dir, exist_ok=True)
+                ext = "png" if data.startswith(imaging.PNG_SIGNATURE) else "jpg"
+                path = os.path.join(self.param_save_dir, f"ai_result_{time.strftime('%Y%m%d_%H%M%S')}_{self.job_id}.{ext}")
+                with open(path, "wb") as f:
+                    f.write(data)
+            print(f"Saved result to {path}")
+        except OSError as e:
+            print(f"Failed to save result: {e}")
+
+    def cancel(self):
+        super().cancel()
+        self._abort.abort()
+        if self._future:
+            self._future.cancel()
+        if self.preview is not None:
+            self.preview.cancel()
+
+    def _on_progress(self, state):
+        # UPLOADING -> GENERATING brackets the time spent writing the request body
+        now = time.perf_counter()
+        if state == scheduler.UPLOADING:
+            self._upload_started = now
+        elif state == scheduler.GENERATING and self._upload_started:
+            self._generate_started = now
+            payload_bytes = self.upload_record.payload_bytes if self.upload_record else 0
+            tracing.get_tracer().record("upload", self._upload_started, now, {"job_id": self.job_id, "bytes": payload_bytes})
+            if self.upload_record:
+                self.upload_record.upload_seconds = now - self._upload_started
+                preprocess.record_upload(self.upload_record)
+                print(f"Upload: {self.upload_record}")
+        self.set_state(state)
+
+    def _trace_generate_done(self):
+        # GENERATING -> result URL is the time Fal spent on inference (plus queueing)
+        if self._generate_started:
+            tracing.get_tracer().record("generate", self._generate_started, time.perf_counter(), {"job_id": self.job_id})
+
+    def _image_kwargs(self):
+        return self.init_capture.request_kwargs() if self.init_capture else {}
+
+    def _remove_capture(self):
+        if self.init_capture:
+            self.init_capture.cleanup()
+
+    def _apply_result_steps(self):
+        """
+        Main-thread datablock updates, one small step per yield so the timer
+        callback can spread them over several ticks.
+        """
+        scene = self.context.scene
+
+        if not self.success:
+            scene.ai_status = self.error_status
+            self.set_state(scheduler.FAILED)
             print(f"API Job Failed: {self.error_msg}")
             
             # Show error in a popup
@@ -96,23 +314,548 @@ class AIRenderJob(threading.Thread):
             def draw_error(popup, context):
                 popup.layout.label(text=f"Error: {msg}")
             bpy.context.window_manager.popup_menu(draw_error, title="AI Render Error", icon='ERROR')
+            return
+
+        scene.ai_status = "Updating Viewport..."
+        yield
+        yield from self._show_on_overlay()
+        if self.fingerprint and self.camera_name:
+            changes.get_detector().remember(self.camera_name, *self.fingerprint)
+
+        scene.ai_status = "Done"
+        preview = self.preview
+        if preview is not None and preview.first_pixel_seconds is not None and self.first_pixel_seconds is not None:
+            scene.ai_status = f"Done: preview after {preview.first_pixel_seconds:.1f}s, full after {self.first_pixel_seconds:.1f}s"
+            print(f"Progressive: first pixel of job {self.job_id} after {preview.first_pixel_seconds:.2f}s (preview), "
+                  f"{self.first_pixel_seconds:.2f}s (full)")
+        self._done()
+
+    def _show_on_overlay(self):
+        """
+        Puts the result on the camera's overlay plane (steps for _apply_result_steps).
+        """
+        scene = self.context.scene
+        camera = bpy.data.objects.get(self.camera_name) if self.camera_name else None
+        plane = utils.get_or_create_overlay_plane(self.context, camera)
+        yield
+        if plane:
+            utils.fit_overlay_to_camera(plane, scene, camera)
+            yield
+            history = self.param_history
+            if self.preview is not None and self.preview.first_pixel_seconds is not None:
+                history = 0 # The preview already took this result's history slot; replace it in place
+            mat = utils.create_overlay_material(
+                scene, self.output_path, history,
+                pixels=self.result_pixels, size=self.result_size, camera=camera
+            )
+            self.result_pixels = None
+            yield
+            if plane.data.materials:
+                plane.data.materials[0] = mat
+            else:
+                plane.data.materials.append(mat)
+            now = time.perf_counter()
+            self.first_pixel_seconds = now - self._created
+            tracing.get_tracer().record(self.first_pixel_span, self._created, now, {"job_id": self.job_id})
+            yield
+
+        # Force Viewport Update
+        utils.force_viewport_shading(self.context)
+
+    def _done(self):
+        self.set_state(scheduler.DONE)
+        tracing.get_tracer().record("job", self._created, time.perf_counter(), {"job_id": self.job_id})
+        if self.backend is None or self.cached_path:
+            return # Cache hits and promoted results say nothing about request times
+        stage_seconds = dict(self.stage_seconds)
+        key = self._metrics_key()
+
+        def record():
+            try:
+                metrics.get_store().record(stage_seconds, *key)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Failed to record metrics: {e}")
+        # SQLite commits stay off the main thread
+        scheduler.get_scheduler().run_in_worker(record)
 
-        global _active_job
-        _active_job = False
+    def _metrics_key(self):
+        """
+        (endpoint, width, height, payload bytes) that this job's stage times are filed under.
+        """
+        endpoint = client.resolve_endpoint(self.init_capture is not None, self.backend or self.param_backend)
+        payload_bytes = self.upload_record.payload_bytes if self.upload_record else 0
+        return endpoint, self.param_w, self.param_h, payload_bytes
+
+    def eta(self):
+        """
+        (seconds left, fraction done) predicted from past jobs like this
+        one, or None while there is too little history.
+        """
+        if self.finished or self.cached_path:
+            return None
+        # The history loads off the main thread; estimates start on a later redraw
+        store = metrics.loaded_store(scheduler.get_scheduler().run_in_worker)
+        if store is None:
+            return None
+        return store.eta(
+            self.state, time.perf_counter() - self.state_since, self.stage_seconds, *self._metrics_key()
+        )
+
+    def _main_thread_callback(self):
+        if self.cancelled:
+            self.set_state(scheduler.CANCELLED)
+            return None
+
+        with utils.main_thread_stall.measure(), tracing.span("viewport_update", job_id=self.job_id):
+            deadline = time.perf_counter() + utils.MAIN_THREAD_BUDGET
+            try:
+                while True:
+                    next(self._main_thread_steps)
+                    if time.perf_counter() >= deadline:
+                        return 0.0 # Continue on the next tick
+            except StopIteration:
+                pass
+            except Exception as e:
+                self.context.scene.ai_status = "Update Failed"
+                self.error_msg = str(e)
+                self.set_state(scheduler.FAILED)
+                print(f"Viewport Update Error: {e}")
+
+        print(f"Main-thread stall: {utils.main_thread_stall.summary()}")
         return None # Unregister timer
 
+def prepare_upload(scene, raw_capture):
+    """
+    Applies the scene's upload size / format settings to a fresh capture.
+    """
+    return preprocess.prepare_upload(
+        raw_capture,
+        scene.ai_upload_max_mpix,
+        scene.ai_upload_format,
+        scene.ai_upload_quality,
+        scene.ai_upload_png_compression
+    )
+
+class PreviewJob(AIRenderJob):
+    """
+    First pass of a progressive render: the same request as `full_job` at a
+    fraction of the resolution, run alongside it. Its result goes onto the
+    same overlay and is replaced in place by the full-resolution result; if
+    that arrives first, the full job cancels the preview. Failures are only
+    logged, since the full job reports its own.
+    """
+    first_pixel_span = "first_pixel_preview"
+
+    def __init__(self, context, full_job, factor, init_capture, upload_record):
+        super().__init__(context, init_capture)
+        self.full_job = full_job
+        self.camera_name = full_job.camera_name
+        self.param_w = max(64, round(full_job.param_w * factor))
+        self.param_h = max(64, round(full_job.param_h * factor))
+        self.upload_record = upload_record
+        # Timed from the same capture as the full job, and it takes the full result's history slot
+        self._created = full_job._created
+        self.param_history = full_job.param_history
+        self.param_save_dir = None
+        full_job.preview = self
+
+    @property
+    def progress(self):
+        return f"preview of #{self.full_job.job_id}"
+
+    def _apply_result_steps(self):
+        if not self.success:
+            self.set_state(scheduler.FAILED)
+            print(f"Preview failed: {self.error_msg}")
+            return
+
+        yield from self._show_on_overlay()
+        if self.first_pixel_seconds is not None and not self.full_job.finished:
+            self.context.scene.ai_status = f"Preview after {self.first_pixel_seconds:.1f}s; refining..."
+        self._done()
+
+def preview_upload(scene, pixels, factor):
+    """
+    Downscales captured (H, W, C) uint8 pixels by `factor` and prepares them
+    for a progressive preview's upload. Returns (Capture, UploadRecord).
+    """
+    height, width = pixels.shape[:2]
+    small = imaging.resize_area(pixels, max(1, round(width * factor)), max(1, round(height * factor)))
+    return prepare_upload(scene, capture.Capture(pixels=small))
+
+class VariationJob(AIRenderJob):
+    """
+    Generates one variation of a shared capture. The result goes into the
+    contact sheet instead of the overlay; it is kept on disk so the tile can
+    be promoted later.
+    """
+    def __init__(self, context, session, variation, init_capture, upload_record):
+        super().__init__(context, init_capture)
+        self.session = session
+        self.variation = variation
+        self.param_prompt = build_prompt(context.scene, variation.prompt)
+        self.param_seed = variation.seed
+        self.upload_record = upload_record
+        # Saving happens when a variation is promoted
+        self.param_save_dir = None
+        self._placed = False
+        variation.job = self
+
+    def cancel(self):
+        super().cancel()
+        if self.variation.state == variations.PENDING:
+            self.variation.state = variations.CANCELLED
+
+    def _prepare_result(self, data):
+        ext = "png" if data.startswith(imaging.PNG_SIGNATURE) else "jpg"
+        path = utils.get_temp_path(f"ai_variation_{self.session.session_id}_{self.variation.index}.{ext}")
+        with open(path, "wb") as f:
+            f.write(data)
+        self.variation.result_path = path
+        try:
+            rgba = imaging.decode_png(data)
+        except ValueError as e:
+            # Left for the main thread, which can load any format through Blender
+            print(f"In-memory decode unavailable ({e}); loading from file")
+            return
+        self.session.sheet.place(self.variation.index, imaging.float_to_uint8(rgba))
+        self._placed = True
+
+    def _apply_result_steps(self):
+        scene = self.context.scene
+        if not self.success:
+            self.variation.state = variations.FAILED
+            self.set_state(scheduler.FAILED)
+            print(f"Variation {self.variation.label} failed: {self.error_msg}")
+            return
+
+        if not self._placed:
+            self.session.sheet.place(self.variation.index, preprocess.load_pixels(self.variation.result_path))
+        yield
+        self.variation.state = variations.READY
+        if self.session is variations.get_session():
+            variations.show_sheet(self.context, self.session)
+            ready = sum(1 for v in self.session.variations if v.state == variations.READY)
+            scene.ai_status = f"Variations: {ready}/{len(self.session.variations)} ready"
+        self._done()
+
+class TiledRenderJob(AIRenderJob):
+    """
+    Renders a capture as overlapping tiles requested concurrently (at most
+    the in-flight limit at once) and stitches them with feathered seams.
+    Tiles are cached individually, so re-running after a failure only
+    requests the tiles that did not come back.
+    """
+    def __init__(self, context, camera=None):
+        super().__init__(context, camera=camera)
+        scene = context.scene
+        self.source_pixels = None
+        self.param_tile_size = scene.ai_tile_size
+        self.param_tile_overlap = scene.ai_tile_overlap
+        self.param_png_compression = scene.ai_upload_png_compression
+        self.param_max_in_flight = scene.ai_max_in_flight
+        self.tiles_total = 0
+        self.tiles_done = 0
+        self.tiles_failed = 0
+        # Tiles finish on several pool threads at once
+        self._tiles_lock = threading.Lock()
+
+    def _metrics_key(self):
+        endpoint, width, height, _ = super()._metrics_key()
+        # Tiled jobs spend GENERATING on many requests; keep them apart from single ones
+        return endpoint + "#tiled", width, height, 0
+
+    @property
+    def progress(self):
+        if not self.tiles_total:
+            return None
+        failed = f", {self.tiles_failed} failed" if self.tiles_failed else ""
+        return f"tiles {self.tiles_done}/{self.tiles_total}{failed}"
+
+    def run(self):
+        import concurrent.futures
+        import numpy as np
+
+        error = None
+        data = None
+        try:
+            height, width = self.source_pixels.shape[:2]
+            boxes = tiling.tile_grid(width, height, self.param_tile_size, self.param_tile_overlap)
+            self.tiles_total = len(boxes)
+            # One backend for every tile, or the seams would show two models
+            self.backend = client.choose_backend(True, boxes[0][2], boxes[0][3], self.param_backend, self.param_fallback_after)
+            self.set_state(scheduler.GENERATING)
+            print(f"Tiled render: {len(boxes)} tiles of {boxes[0][2]}x{boxes[0][3]}")
+            workers = min(len(boxes), self.param_max_in_flight)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="AIRenderTile") as pool:
+                futures = [pool.submit(self._render_tile, i, box) for i, box in enumerate(boxes)]
+                tiles = []
+                for future in futures:
+                    try:
+                        tiles.append(future.result())
+                    except Exception as e:
+                        print(f"Tile failed: {e}")
+                        self.tiles_failed += 1
+                        tiles.append(None)
+            if self.cancelled:
+                raise RuntimeError("Cancelled")
+            if self.tiles_failed:
+                raise RuntimeError(f"{self.tiles_failed} of {len(boxes)} tiles failed; render again to retry only those")
+
+            with tracing.span("stitch", job_id=self.job_id, tiles=len(boxes)):
+                rgba = tiling.stitch(tiles, boxes, width, height)
+                self.result_size = (width, height)
+                self.result_pixels = np.ascontiguousarray(rgba[::-1]).ravel()
+            if self.param_save_dir:
+                data = imaging.encode_png(imaging.float_to_uint8(rgba[:, :, :3]))
+        except Exception as e:
+            self.error_status = "Tiled Render Failed"
+            error = e
+        self.source_pixels = None
+        self._complete(error, data)
+
+    def _render_tile(self, index, box):
+        """
+        Runs on the tile pool: one tile from crop to decoded (h, w, 4) floats.
+        """
+        x, y, w, h = box
+        if self.cancelled:
+            raise RuntimeError("Cancelled")
+        with tracing.span("tile", job_id=self.job_id, tile=index) as trace:
+            tile_png = imaging.encode_png(self.source_pixels[y:y + h, x:x + w], self.param_png_compression)
+            key = cached = None
+            if self.param_cache:
+                key = cache.make_key(client.resolve_endpoint(True, self.backend), self.param_prompt, tile_png,
+                                     self.param_strength, w, h)
+                cached = cache.get_cache(self.param_cache_bytes).get(key)
+            trace.set(cached=cached is not None)
+            if cached:
+                with open(cached, "rb") as f:
+                    data = f.read()
+            else:
+                with scheduler.get_scheduler().in_flight:
+                    if self.cancelled:
+                        raise RuntimeError("Cancelled")
+                    url = client.send_api_request(
+                        self.param_api_key, self.param_prompt, strength=self.param_strength,
+                        width=w, height=h, image_bytes=tile_png, mime_type="image/png",
+                        retry_policy=self.param_retry_policy, hedge_percentile=self.param_hedge_percentile,
+                        is_cancelled=lambda: self.cancelled, abort=self._abort, backend=self.backend
+                    )
+                data = client.fetch_image_bytes(url, abort=self._abort)
+                if key:
+                    cache.get_cache().put_bytes(key, data)
+            rgba = imaging.decode_png(data)
+            if rgba.shape[:2] != (h, w):
+                # The model may answer at its own size; bring it back to the tile box
+                rgba = imaging.resize_area(imaging.float_to_uint8(rgba), w, h).astype("float32") / 255.0
+        with self._tiles_lock:
+            self.tiles_done += 1
+        return rgba
+
+def request_resilience(scene):
+    """
+    Returns (retry policy, hedge percentile or None) from the scene settings.
+    """
+    hedge_percentile = scene.ai_hedge_percentile if scene.ai_hedge_enabled else None
+    return client.RetryPolicy(scene.ai_retry_attempts), hedge_percentile
+
+def request_routing(scene):
+    """
+    Returns (backend name, fallback latency threshold in seconds or None) from the scene settings.
+    """
+    return scene.ai_backend, scene.ai_fallback_after if scene.ai_fallback_enabled else None
+
+def has_credentials(scene):
+    """
+    True if requests can be made: an API key is set or the backend runs locally.
+    """
+    return bool(scene.ai_api_key) or backends.get_backend(scene.ai_backend).local
+
+def _capture_raw(context, temp_name, camera, trace_args, mode=None, scale=None):
+    # Our utils.create_overlay_plane sets hide_render=True, so previous
+    # results do not appear in the F12 render.
+    scene = context.scene
+    mode = mode or scene.ai_capture_mode
+    scale = scale or scene.ai_capture_scale
+    temp_render_path = utils.get_temp_path(temp_name)
+    active_camera = scene.camera
+    try:
+        # Captures always look through scene.camera
+        if camera is not None:
+            scene.camera = camera
+        with tracing.span("capture", mode=mode, **trace_args):
+            return capture.capture_scene(context, mode, scale, temp_render_path)
+    finally:
+        scene.camera = active_camera
+
+def capture_upload(context, temp_name, camera=None, with_hash=False, mode=None, scale=None, **trace_args):
+    """
+    Captures `camera` (default: the scene camera) on the main thread and
+    prepares it for upload. Returns (Capture, UploadRecord). with_hash sets
+    the capture's perceptual hash; mode / scale override the scene's
+    capture settings.
+    """
+    raw_capture = _capture_raw(context, temp_name, camera, trace_args, mode, scale)
+    return _prepare_capture(context.scene, raw_capture, with_hash, trace_args)
+
+def capture_progressive(context, temp_name, camera, factor, with_hash=False, **trace_args):
+    """
+    capture_upload for progressive renders: also prepares a copy of the
+    capture downscaled by `factor` for the preview pass. Returns
+    (Capture, UploadRecord, preview Capture, preview UploadRecord).
+    """
+    scene = context.scene
+    raw_capture = _capture_raw(context, temp_name, camera, trace_args)
+    pixels = _raw_pixels(scene, raw_capture)
+    with tracing.span("preprocess", preview=True, **trace_args):
+        preview, preview_record = preview_upload(scene, pixels, factor)
+    prepared, record = _prepare_capture(scene, raw_capture, with_hash, trace_args, pixels)
+    return prepared, record, preview, preview_record
+
+def _raw_pixels(scene, raw_capture):
+    pixels = raw_capture.pixels
+    if pixels is None:
+        pixels = preprocess.load_pixels(raw_capture.path)
+        if scene.ai_upload_format != 'PNG' or scene.ai_upload_max_mpix:
+            raw_capture.pixels = pixels # Re-encoded anyway; don't load twice
+    return pixels
+
+def _prepare_capture(scene, raw_capture, with_hash, trace_args, pixels=None):
+    capture_hash = None
+    if with_hash:
+        with tracing.span("perceptual_hash", **trace_args):
+            capture_hash = changes.perceptual_hash(pixels if pixels is not None else _raw_pixels(scene, raw_capture))
+    with tracing.span("preprocess", **trace_args) as trace:
+        prepared, record = prepare_upload(scene, raw_capture)
+        trace.set(bytes=record.payload_bytes, format=record.format)
+    prepared.perceptual_hash = capture_hash
+    return prepared, record
+
+def capture_pixels(context, temp_name, camera=None, **trace_args):
+    """
+    Captures `camera` on the main thread at full size and returns its
+    (H, W, 3) uint8 pixels, top row first, for tiled renders.
+    """
+    raw_capture = _capture_raw(context, temp_name, camera, trace_args)
+    try:
+        if raw_capture.pixels is not None:
+            return raw_capture.pixels[:, :, :3]
+        with tracing.span("preprocess", **trace_args):
+            return preprocess.load_pixels(raw_capture.path)
+    finally:
+        raw_capture.cleanup()
+
+def capture_and_submit(context, camera=None, min_workers=0):
+    """
+    Captures `camera` (default: the scene camera) on the main thread and
+    queues its generation job. Raises if the capture fails; the job is
+    then tracked as failed.
+
+    With "Skip Unchanged" on, returns None without capturing when neither
+    the scene nor the settings changed since the camera's last result, and
+    returns a SKIPPED job without a request when the capture looks the same.
+    """
+    scene = context.scene
+    progressive = scene.ai_progressive
+    # Progressive renders need a worker each for the preview and the full pass
+    job_scheduler = get_job_scheduler(scene, max(min_workers, 2) if progressive else min_workers)
+    camera = camera or scene.camera
+    detector = changes.get_detector()
+    check = scene.ai_skip_unchanged and camera is not None and \
+        bpy.data.images.get(utils.overlay_names(camera)[2]) is not None
+    if check:
+        settings = detector.settings_fingerprint(scene, build_prompt(scene))
+        scene_state = detector.scene_fingerprint(scene, camera)
+        if detector.unchanged(camera.name, settings, scene_state):
+            detector.skipped_captures += 1
+            print(f"Unchanged: {camera.name}; keeping the last result")
+            return None
+
+    tiled = scene.ai_tiled
+    job = TiledRenderJob(context, camera=camera) if tiled else AIRenderJob(context, camera=camera)
+    job.set_state(scheduler.CAPTURING)
+    job_scheduler.track(job)
+
+    # Render to a per-job temp path so queued jobs don't overwrite each other's input
+    temp_name = f"ai_input_capture_{job.job_id}.png"
+    factor = scene.ai_progressive_scale / 100
+    preview_capture = None
+    try:
+        if tiled:
+            job.source_pixels = capture_pixels(context, temp_name, camera, job_id=job.job_id)
+            capture_hash = changes.perceptual_hash(job.source_pixels) if check else None
+            if progressive:
+                with tracing.span("preprocess", preview=True, job_id=job.job_id):
+                    preview_capture = preview_upload(scene, job.source_pixels, factor)
+        elif progressive:
+            job.init_capture, job.upload_record, *preview_capture = capture_progressive(
+                context, temp_name, camera, factor, with_hash=check, job_id=job.job_id
+            )
+            capture_hash = job.init_capture.perceptual_hash
+        else:
+            job.init_capture, job.upload_record = capture_upload(
+                context, temp_name, camera, with_hash=check, job_id=job.job_id
+            )
+            capture_hash = job.init_capture.perceptual_hash
+    except Exception as e:
+        job.error_msg = str(e)
+        job.set_state(scheduler.FAILED)
+        raise
+
+    if check:
+        job.fingerprint = (settings, scene_state, capture_hash)
+        if detector.similar(camera.name, settings, capture_hash, scene.ai_skip_tolerance):
+            # Same picture as last time: keep the result, and skip the capture too next time
+            detector.remember(camera.name, settings, scene_state, capture_hash)
+            detector.skipped_requests += 1
+            if job.init_capture:
+                job.init_capture.cleanup()
+            if preview_capture:
+                preview_capture[0].cleanup()
+            job.source_pixels = None
+            job.set_state(scheduler.SKIPPED)
+            print(f"Capture of {camera.name} matches the last one; keeping the last result")
+            return job
+
+    if preview_capture:
+        # Queued first so it starts first; the full pass follows on another worker
+        job_scheduler.submit(PreviewJob(context, job, factor, *preview_capture))
+    job_scheduler.submit(job)
+    return job
+
+def build_variations(scene):
+    """
+    Variations for the scene's variation mode: one per prompt preset, one
+    per "|"-separated prompt, or the scene prompt with consecutive seeds.
+    """
+    mode = scene.ai_variation_mode
+    if mode == 'PRESETS':
+        presets = AIR_OT_apply_preset.PROMPT_PRESETS.items()
+        return [variations.Variation(i, key.title(), prompt) for i, (key, prompt) in enumerate(presets)]
+    if mode == 'PROMPTS':
+        prompts = [p.strip() for p in scene.ai_variation_prompts.split("|") if p.strip()]
+        return [variations.Variation(i, p if len(p) <= 24 else p[:23] + "…", p) for i, p in enumerate(prompts)]
+    first = scene.ai_variation_seed
+    seeds = range(first, first + scene.ai_variation_count)
+    return [variations.Variation(i, f"Seed {seed}", scene.ai_prompt, seed) for i, seed in enumerate(seeds)]
+
+def get_job_scheduler(scene, min_workers=0):
+    """
+    Returns the shared scheduler sized from the scene settings, and applies
+    the scene's per-key request limits.
+    """
+    ratelimit.configure(scene.ai_rate_limit, scene.ai_key_concurrency,
+                        props.load_env_keys() if scene.ai_key_pool else ())
+    return scheduler.get_scheduler(max(scene.ai_worker_count, min_workers), scene.ai_max_in_flight)
+
 class AIR_OT_render(bpy.types.Operator):
     bl_idname = "air.render"
     bl_label = "AI Render"
     bl_description = "Generate image using Fal.ai"
 
     def execute(self, context):
-        global _active_job
-        if _active_job:
-            self.report({'WARNING'}, "Job already running")
-            return {'CANCELLED'}
-
-        if not context.scene.ai_api_key:
+        if not has_credentials(context.scene):
             self.report({'ERROR'}, "Please set your Fal.ai API Key first")
             return {'CANCELLED'}
 
@@ -120,33 +863,405 @@ class AIR_OT_render(bpy.types.Operator):
             self.report({'ERROR'}, "No Active Camera. Please add a camera to the scene.")
             return {'CANCELLED'}
 
-        # 1. Render the current viewport (init image)
-        # We need to temporarily hide the overlay plane so we don't render the previous result
-        # into the new input!
+        # 1. Capture the camera view (init image)
         scene = context.scene
-        overlay_was_enabled = scene.ai_overlay_enabled
-        if overlay_was_enabled:
-            # Temporarily hide it for render
-            utils.update_overlay_visibility(scene) # Logic might need adjustment.
-            # Or manually find object and hide_render is already True?
-            # Our utils.create_overlay_plane sets hide_render=True, so it Should not appear in F12 render.
-            pass
-            
+        tracing.get_tracer().enabled = scene.ai_trace_enabled
         context.scene.ai_status = "Capturing Viewport..."
-        
-        # Render to temp path
-        import os
-        import tempfile
-        temp_render_path = os.path.join(tempfile.gettempdir(), "ai_input_capture.png")
-        
-        scene.render.filepath = temp_render_path
-        scene.render.image_settings.file_format = 'PNG'
-        
-        # Render frame - This is blocking UI, which is fine for local render
-        bpy.ops.render.render(write_still=True)
-        
+        try:
+            job = capture_and_submit(context)
+        except Exception as e:
+            scene.ai_status = "Capture Failed"
+            self.report({'ERROR'}, f"Capture failed: {e}")
+            return {'CANCELLED'}
+
+        if job is None or job.state == scheduler.SKIPPED:
+            scene.ai_status = "Unchanged"
+            self.report({'INFO'}, "Nothing changed since the last render; kept its result")
+            return {'FINISHED'}
         context.scene.ai_status = "Uploading..."
-        AIRenderJob(context, temp_render_path).start()
+        return {'FINISHED'}
+
+def cameras_to_render(context):
+    """
+    Selected cameras, or every camera in the scene when none is selected.
+    """
+    selected = [obj for obj in context.selected_objects if obj.type == 'CAMERA']
+    if selected:
+        return selected
+    return sorted((obj for obj in context.scene.objects if obj.type == 'CAMERA'), key=lambda obj: obj.name)
+
+class AIR_OT_render_cameras(bpy.types.Operator):
+    bl_idname = "air.render_cameras"
+    bl_label = "AI Render Cameras"
+    bl_description = ("Capture every selected camera (all scene cameras if none is selected) one after another "
+                      "and generate them concurrently; each result goes onto that camera's own overlay")
+
+    _timer = None
+
+    def invoke(self, context, event):
+        scene = context.scene
+        if not has_credentials(scene):
+            self.report({'ERROR'}, "Please set your Fal.ai API Key first")
+            return {'CANCELLED'}
+        self._cameras = cameras_to_render(context)
+        if not self._cameras:
+            self.report({'ERROR'}, "No cameras in the scene")
+            return {'CANCELLED'}
+
+        tracing.get_tracer().enabled = scene.ai_trace_enabled
+        self._total = len(self._cameras)
+        self._failed = []
+        # Enough workers that every camera's request can be in flight at once
+        # (up to the in-flight limit), rather than queueing behind each other
+        self._min_workers = min(self._total, scene.ai_max_in_flight)
+        context.window_manager.modal_handler_add(self)
+        self._timer = context.window_manager.event_timer_add(0.05, window=context.window)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self._cameras = []
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        # One capture per tick: the UI stays responsive and each request goes
+        # out as soon as its capture is done, overlapping the next capture
+        if self._cameras:
+            camera = self._cameras.pop(0)
+            try:
+                capture_and_submit(context, camera, self._min_workers)
+            except Exception as e:
+                self._failed.append(camera.name)
+                print(f"Capture failed for {camera.name}: {e}")
+            captured = self._total - len(self._cameras)
+            context.scene.ai_status = f"Cameras: captured {captured}/{self._total}"
+            return {'RUNNING_MODAL'}
+
+        context.window_manager.event_timer_remove(self._timer)
+        if self._failed:
+            self.report({'WARNING'}, f"Capture failed for: {', '.join(self._failed)}")
+        else:
+            self.report({'INFO'}, f"Submitted {self._total} camera(s)")
+        return {'FINISHED'}
+
+def capture_live_preview(context):
+    """
+    Captures a low-resolution viewport preview and returns its job, not yet
+    submitted. Returns (job, settings fingerprint, capture hash).
+    """
+    scene = context.scene
+    job = AIRenderJob(context)
+    factor = scene.ai_live_scale / 100
+    job.param_w = max(64, round(job.param_w * factor))
+    job.param_h = max(64, round(job.param_h * factor))
+    # Previews are throwaway: no history entries, no saved files
+    job.param_history = 0
+    job.param_save_dir = None
+    job.set_state(scheduler.CAPTURING)
+    job_scheduler = get_job_scheduler(scene)
+    job_scheduler.track(job)
+    try:
+        job.init_capture, job.upload_record = capture_upload(
+            context, f"ai_live_capture_{job.job_id}.png", with_hash=True,
+            mode=capture.CAPTURE_VIEWPORT, scale=scene.ai_live_scale, job_id=job.job_id
+        )
+    except Exception as e:
+        job.error_msg = str(e)
+        job.set_state(scheduler.FAILED)
+        raise
+    job.set_state(scheduler.QUEUED)
+    settings = changes.get_detector().settings_fingerprint(scene, job.param_prompt)
+    return job, settings, job.init_capture.perceptual_hash
+
+class AIR_OT_live_render(bpy.types.Operator):
+    bl_idname = "air.live_render"
+    bl_label = "AI Live Render"
+    bl_description = ("Toggle live mode: once edits settle, capture a low-resolution viewport preview and generate it. "
+                      "A newer edit cancels the request still running")
+
+    _timer = None
+
+    def invoke(self, context, event):
+        scene = context.scene
+        if live.get_session():
+            live.stop() # The running instance sees this on its next tick
+            scene.ai_status = "Live mode off"
+            return {'FINISHED'}
+        if not has_credentials(scene):
+            self.report({'ERROR'}, "Please set your Fal.ai API Key first")
+            return {'CANCELLED'}
+
+        tracing.get_tracer().enabled = scene.ai_trace_enabled
+        self._session = live.start(scene.ai_live_delay)
+        context.window_manager.modal_handler_add(self)
+        self._timer = context.window_manager.event_timer_add(0.1, window=context.window)
+        scene.ai_status = "Live mode on"
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        session = self._session
+        if session.stopped:
+            context.window_manager.event_timer_remove(self._timer)
+            return {'FINISHED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        scene = context.scene
+        job = session.next_job()
+        if job:
+            get_job_scheduler(scene).submit(job)
+
+        camera = scene.camera
+        if camera is None:
+            return {'RUNNING_MODAL'}
+        session.delay = scene.ai_live_delay
+        detector = changes.get_detector()
+        state = (
+            detector.settings_fingerprint(scene, build_prompt(scene)),
+            detector.scene_fingerprint(scene, camera),
+            scene.ai_live_scale,
+        )
+        if not session.observe(state):
+            return {'RUNNING_MODAL'}
+
+        try:
+            job, settings, capture_hash = capture_live_preview(context)
+        except Exception as e:
+            session.skip()
+            scene.ai_status = "Live capture failed"
+            print(f"Live capture failed: {e}")
+            return {'RUNNING_MODAL'}
+        if session.is_repeat(settings, capture_hash, scene.ai_skip_tolerance):
+            # An update the camera doesn't see (or our own overlay): keep the running / shown result
+            session.skip()
+            job.init_capture.cleanup()
+            job.set_state(scheduler.SKIPPED)
+            return {'RUNNING_MODAL'}
+        if session.offer(job, settings, capture_hash):
+            get_job_scheduler(scene).submit(job)
+        scene.ai_status = f"Live: {session.generated} generated, {session.superseded} superseded"
+        return {'RUNNING_MODAL'}
+
+class AIR_OT_render_variations(bpy.types.Operator):
+    bl_idname = "air.render_variations"
+    bl_label = "AI Render Variations"
+    bl_description = ("Capture once and generate one result per preset, prompt or seed concurrently from the same "
+                      "input; results fill a contact sheet as they arrive")
+
+    def execute(self, context):
+        scene = context.scene
+        if not has_credentials(scene):
+            self.report({'ERROR'}, "Please set your Fal.ai API Key first")
+            return {'CANCELLED'}
+        if not scene.camera:
+            self.report({'ERROR'}, "No Active Camera. Please add a camera to the scene.")
+            return {'CANCELLED'}
+        items = build_variations(scene)
+        if not items:
+            self.report({'ERROR'}, "No variations: enter prompts separated by |")
+            return {'CANCELLED'}
+
+        tracing.get_tracer().enabled = scene.ai_trace_enabled
+        session = variations.start_session(items, scene.render.resolution_x / scene.render.resolution_y)
+        scene.ai_status = "Capturing Viewport..."
+        try:
+            shared, record = capture_upload(
+                context, f"ai_variations_capture_{session.session_id}.png", session=session.session_id
+            )
+            # Every request streams the same encoded bytes; nothing is re-captured or re-encoded
+            data = shared.data
+            if data is None:
+                with open(shared.path, "rb") as f:
+                    data = f.read()
+                shared.cleanup()
+        except Exception as e:
+            for item in items:
+                item.state = variations.FAILED
+            scene.ai_status = "Capture Failed"
+            self.report({'ERROR'}, f"Capture failed: {e}")
+            return {'CANCELLED'}
+
+        job_scheduler = get_job_scheduler(scene, min(len(items), scene.ai_max_in_flight))
+        for item in items:
+            job_capture = capture.Capture(data=data, mime_type=shared.mime_type)
+            job_scheduler.submit(VariationJob(context, session, item, job_capture, copy.copy(record)))
+        scene.ai_status = f"Variations: 0/{len(items)} ready"
+        return {'FINISHED'}
+
+class AIR_OT_promote_variation(bpy.types.Operator):
+    bl_idname = "air.promote_variation"
+    bl_label = "Use Variation"
+    bl_description = "Show this variation on the active camera's overlay (double-click a tile of the contact sheet in the Image Editor)"
+    index: bpy.props.IntProperty(default=-1) # type: ignore
+
+    def invoke(self, context, event):
+        session = variations.get_session()
+        if self.index < 0:
+            # Double-click in the Image Editor: pick the tile under the mouse
+            space = context.space_data
+            image = getattr(space, "image", None)
+            if session is None or image is None or image.name != variations.SHEET_IMAGE_NAME:
+                return {'PASS_THROUGH'}
+            u, v = context.region.view2d.region_to_view(event.mouse_region_x, event.mouse_region_y)
+            index = session.sheet.tile_at(u, v)
+            if index is None or index >= len(session.variations):
+                return {'PASS_THROUGH'}
+            self.index = index
+        return self.execute(context)
+
+    def execute(self, context):
+        scene = context.scene
+        session = variations.get_session()
+        if session is None or not 0 <= self.index < len(session.variations):
+            return {'CANCELLED'}
+        variation = session.variations[self.index]
+        if variation.state != variations.READY or not variation.result_path:
+            self.report({'WARNING'}, f"{variation.label} is not ready")
+            return {'CANCELLED'}
+        if not scene.camera:
+            self.report({'ERROR'}, "No Active Camera. Please add a camera to the scene.")
+            return {'CANCELLED'}
+
+        # Goes through the normal result path (decode, overlay, optional save) without a request
+        get_job_scheduler(scene).submit(AIRenderJob(context, result_path=variation.result_path))
+        scene.ai_status = f"Using {variation.label}"
+        return {'FINISHED'}
+
+class AIR_OT_render_batch(bpy.types.Operator):
+    bl_idname = "air.render_batch"
+    bl_label = "AI Render Frame Range"
+    bl_description = "Capture and generate every frame of the scene frame range, overlapping capture with network work. Frames with existing outputs are skipped"
+
+    _timer = None
+    _pipeline = None
+
+    def invoke(self, context, event):
+        scene = context.scene
+        if not has_credentials(scene):
+            self.report({'ERROR'}, "Please set your Fal.ai API Key first")
+            return {'CANCELLED'}
+        if not scene.camera:
+            self.report({'ERROR'}, "No Active Camera. Please add a camera to the scene.")
+            return {'CANCELLED'}
+
+        tracing.get_tracer().enabled = scene.ai_trace_enabled
+        output_dir = bpy.path.abspath(scene.ai_batch_output_dir)
+        frames = range(scene.frame_start, scene.frame_end + 1, scene.frame_step)
+        self._frames = pipeline.pending_frames(output_dir, frames)
+        self._total = len(frames)
+        if not self._frames:
+            self.report({'INFO'}, "All frames already generated")
+            return {'CANCELLED'}
+
+        self._pipeline = pipeline.BatchPipeline(
+            scene.ai_api_key,
+            build_prompt(scene),
+            scene.ai_img_strength,
+            scene.render.resolution_x,
+            scene.render.resolution_y,
+            output_dir,
+            generate_workers=scene.ai_max_in_flight,
+            resilience=request_resilience(scene),
+            backend=scene.ai_backend
+        )
+        self._original_frame = scene.frame_current
+        self._skipped = self._total - len(self._frames)
+
+        context.window_manager.modal_handler_add(self)
+        self._timer = context.window_manager.event_timer_add(0.1, window=context.window)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        scene = context.scene
+        if event.type == 'ESC':
+            self._pipeline.cancel()
+            self._frames = []
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        # Render the next frame only while the generate stage has room (backpressure).
+        # Workers keep uploading / downloading earlier frames during this blocking render.
+        if self._frames and self._pipeline.can_accept():
+            frame = self._frames.pop(0)
+            scene.frame_set(frame)
+            capture_path = utils.get_temp_path(f"ai_batch_capture_{frame:04d}.png")
+            try:
+                with tracing.span("capture", frame=frame, mode=scene.ai_capture_mode):
+                    frame_capture = capture.capture_scene(
+                        context, scene.ai_capture_mode, scene.ai_capture_scale, capture_path
+                    )
+                frame_capture, _ = prepare_upload(scene, frame_capture)
+                self._pipeline.put_capture(frame, frame_capture)
+            except Exception as e:
+                self._pipeline.failed[frame] = str(e)
+            if not self._frames:
+                self._pipeline.close()
+
+        done = self._skipped + len(self._pipeline.completed)
+        scene.ai_status = f"Batch: {done}/{self._total} done, {len(self._pipeline.failed)} failed"
+
+        if self._pipeline.is_finished():
+            return self._finish(context)
+        return {'RUNNING_MODAL'}
+
+    def _finish(self, context):
+        scene = context.scene
+        context.window_manager.event_timer_remove(self._timer)
+        scene.frame_set(self._original_frame)
+
+        failed = self._pipeline.failed
+        if self._pipeline.cancelled:
+            self.report({'WARNING'}, "Batch cancelled; re-run to resume")
+        elif failed:
+            self.report({'WARNING'}, f"{len(failed)} frame(s) failed: {sorted(failed)}; re-run to retry")
+        else:
+            self.report({'INFO'}, f"Batch finished: {scene.ai_batch_output_dir}")
+        return {'FINISHED'}
+
+class AIR_OT_purge_overlay_images(bpy.types.Operator):
+    bl_idname = "air.purge_overlay_images"
+    bl_label = "Purge Overlay Images"
+    bl_description = "Remove orphaned AI result images and the overlay history"
+
+    def execute(self, context):
+        removed = utils.purge_overlay_images(keep_history=False)
+        self.report({'INFO'}, f"Removed {removed} image(s)")
+        return {'FINISHED'}
+
+class AIR_OT_show_overlay_history(bpy.types.Operator):
+    bl_idname = "air.show_overlay_history"
+    bl_label = "Show Previous Result"
+    bl_description = "Display a previous AI result on the active camera's overlay (empty shows the latest)"
+    image_name: bpy.props.StringProperty() # type: ignore
+
+    def execute(self, context):
+        camera = context.scene.camera
+        if camera is None:
+            return {'CANCELLED'}
+        current = utils.overlay_names(camera)[2]
+        img = bpy.data.images.get(self.image_name or current)
+        if img is None:
+            return {'CANCELLED'}
+        if self.image_name and img.get("air_history_owner") != current:
+            self.report({'WARNING'}, f"{self.image_name} is not a result of {camera.name}")
+            return {'CANCELLED'}
+        utils.show_overlay_image(img, camera)
+        return {'FINISHED'}
+
+class AIR_OT_cancel_job(bpy.types.Operator):
+    bl_idname = "air.cancel_job"
+    bl_label = "Cancel AI Job"
+    bl_description = "Cancel a queued or running AI render job (0 cancels all)"
+    job_id: bpy.props.IntProperty(default=0) # type: ignore
+
+    def execute(self, context):
+        job_scheduler = scheduler.get_scheduler()
+        if self.job_id:
+            job_scheduler.cancel(self.job_id)
+        else:
+            job_scheduler.cancel_all()
+        context.scene.ai_status = "Cancelled"
         return {'FINISHED'}
 
 class AIR_OT_apply_preset(bpy.types.Operator):
@@ -167,15 +1282,105 @@ class AIR_OT_apply_preset(bpy.types.Operator):
             context.scene.ai_prompt = self.PROMPT_PRESETS[self.preset_key]
         return {'FINISHED'}
 
+class AIR_OT_export_trace(bpy.types.Operator):
+    bl_idname = "air.export_trace"
+    bl_label = "Export Trace"
+    bl_description = "Write recorded stage timings as Chrome trace-event JSON (open in chrome://tracing or Perfetto)"
+    filepath: bpy.props.StringProperty(subtype='FILE_PATH', default="ai_render_trace.json") # type: ignore
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        path = bpy.path.abspath(self.filepath)
+        try:
+            count = tracing.get_tracer().export_chrome(path)
+        except OSError as e:
+            self.report({'ERROR'}, f"Trace export failed: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Wrote {count} spans to {path}")
+        return {'FINISHED'}
+
+class AIR_OT_export_metrics(bpy.types.Operator):
+    bl_idname = "air.export_metrics"
+    bl_label = "Export Metrics"
+    bl_description = ("Write the recorded per-stage job durations for capacity planning: "
+                      "every sample as CSV, or with a .json name the per-group quantiles plus the samples")
+    filepath: bpy.props.StringProperty(subtype='FILE_PATH', default="ai_render_metrics.csv") # type: ignore
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        path = bpy.path.abspath(self.filepath)
+        try:
+            count = metrics.get_store().export(path)
+        except (OSError, sqlite3.Error) as e:
+            self.report({'ERROR'}, f"Metrics export failed: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Wrote {count} samples to {path}")
+        return {'FINISHED'}
+
+class AIR_OT_reset_trace(bpy.types.Operator):
+    bl_idname = "air.reset_trace"
+    bl_label = "Reset Trace"
+    bl_description = "Discard recorded stage timings"
+
+    def execute(self, context):
+        tracing.get_tracer().reset()
+        return {'FINISHED'}
+
+class AIR_OT_clear_cache(bpy.types.Operator):
+    bl_idname = "air.clear_cache"
+    bl_label = "Clear Result Cache"
+    bl_description = "Delete all cached AI results from disk"
+
+    def execute(self, context):
+        cache.get_cache().clear()
+        self.report({'INFO'}, "AI result cache cleared")
+        return {'FINISHED'}
+
 classes = (
     AIR_OT_render,
+    AIR_OT_render_cameras,
+    AIR_OT_render_variations,
+    AIR_OT_live_render,
+    AIR_OT_promote_variation,
     AIR_OT_apply_preset,
+    AIR_OT_clear_cache,
+    AIR_OT_cancel_job,
+    AIR_OT_render_batch,
+    AIR_OT_purge_overlay_images,
+    AIR_OT_show_overlay_history,
+    AIR_OT_export_trace,
+    AIR_OT_export_metrics,
+    AIR_OT_reset_trace,
 )
 
+# (keymap, item) pairs added in register()
+_keymaps = []
+
 def register():
     for c in classes:
         bpy.utils.register_class(c)
+    changes.register_handlers()
+    keyconfig = bpy.context.window_manager.keyconfigs.addon
+    if keyconfig: # None in background mode
+        km = keyconfig.keymaps.new(name="Image", space_type='IMAGE_EDITOR')
+        kmi = km.keymap_items.new(AIR_OT_promote_variation.bl_idname, 'LEFTMOUSE', 'DOUBLE_CLICK')
+        _keymaps.append((km, kmi))
 
 def unregister():
+    live.stop()
+    for km, kmi in _keymaps:
+        km.keymap_items.remove(kmi)
+    _keymaps.clear()
+    changes.unregister_handlers()
     for c in reversed(classes):
         bpy.utils.unregister_class(c)
+    scheduler.shutdown()
+    async_queue.close_queue_client()
+    client.close_session()
+    metrics.close_store()
@@ -0,0 +1,149 @@
+import os
+import queue
+import threading
+
+from . import client
+from . import scheduler
+from . import tracing
+
+# Captures / results allowed to wait between stages before upstream stalls
+DEFAULT_QUEUE_SIZE = 2
+
+def output_path(output_dir, frame):
+    return os.path.join(output_dir, f"frame_{frame:04d}.png")
+
+def pending_frames(output_dir, frames):
+    """
+    Frames whose numbered output is missing, so an interrupted batch resumes
+    where it stopped. Outputs are renamed into place only once complete.
+    """
+    pending = []
+    for frame in frames:
+        path = output_path(output_dir, frame)
+        if not (os.path.exists(path) and os.path.getsize(path) > 0):
+            pending.append(frame)
+    return pending
+
+class BatchPipeline:
+    """
+    Generate and download stages for a frame-range batch. The main thread
+    renders captures and feeds them in with put_capture(); bounded queues
+    between stages keep it from racing ahead of the network.
+
+        capture (main) -> [capture_queue] -> generate (N threads)
+                       -> [download_queue] -> download (1 thread) -> frame_NNNN.png
+    """
+    def __init__(self, api_key, prompt, strength, width, height, output_dir,
+                 generate_workers=2, queue_size=DEFAULT_QUEUE_SIZE, resilience=(None, None), backend=None):
+        self.api_key = api_key
+        self.prompt = prompt
+        self.strength = strength
+        self.width = width
+        self.height = height
+        self.output_dir = output_dir
+        self.retry_policy, self.hedge_percentile = resilience
+        # No latency fallback: every frame of a sequence comes from the same model
+        self.backend = backend
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.capture_queue = queue.Queue(maxsize=queue_size)
+        self.download_queue = queue.Queue(maxsize=queue_size)
+        self.completed = []
+        self.failed = {}
+        self.cancelled = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._generators_left = generate_workers
+
+        self._threads = [
+            threading.Thread(target=self._generate_stage, name="AIRenderBatchGenerate", daemon=True)
+            for _ in range(generate_workers)
+        ]
+        self._threads.append(threading.Thread(target=self._download_stage, name="AIRenderBatchDownload", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def can_accept(self):
+        return not self.capture_queue.full()
+
+    def put_capture(self, frame, frame_capture):
+        self.capture_queue.put((frame, frame_capture))
+
+    def close(self):
+        """
+        Signals that no more captures will arrive. Never blocks the caller.
+        """
+        self._closed = True
+
+    def cancel(self):
+        self.cancelled = True
+        self.close()
+
+    def is_finished(self):
+        return not any(t.is_alive() for t in self._threads)
+
+    def _fail(self, frame, error):
+        with self._lock:
+            self.failed[frame] = str(error)
+        print(f"Batch frame {frame} failed: {error}")
+
+    def _next_capture(self):
+        while True:
+            try:
+                return self.capture_queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._closed:
+                    return None
+
+    def _generate_stage(self):
+        while True:
+            item = self._next_capture()
+            if item is None:
+                break
+            frame, frame_capture = item
+            try:
+                if self.cancelled:
+                    continue
+                with scheduler.get_scheduler().in_flight, tracing.span("generate", frame=frame):
+                    url = client.send_api_request(
+                        self.api_key,
+                        self.prompt,
+                        strength=self.strength,
+                        width=self.width,
+                        height=self.height,
+                        retry_policy=self.retry_policy,
+                        hedge_percentile=self.hedge_percentile,
+                        is_cancelled=lambda: self.cancelled,
+                        backend=self.backend,
+                        **frame_capture.request_kwargs()
+                    )
+                self.download_queue.put((frame, url))
+            except Exception as e:
+                self._fail(frame, e)
+            finally:
+                frame_capture.cleanup()
+
+        with self._lock:
+            self._generators_left -= 1
+            last = self._generators_left == 0
+        if last:
+            self.download_queue.put(None)
+
+    def _download_stage(self):
+        while True:
+            item = self.download_queue.get()
+            if item is None:
+                return
+            frame, url = item
+            if self.cancelled:
+                continue
+            final_path = output_path(self.output_dir, frame)
+            part_path = final_path + ".part"
+            try:
+                with tracing.span("download", frame=frame):
+                    client.download_image(url, part_path)
+                os.replace(part_path, final_path)
+                with self._lock:
+                    self.completed.append(frame)
+            except Exception as e:
+                self._fail(frame, e)
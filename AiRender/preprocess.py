@@ -0,0 +1,115 @@
+import bpy
+import os
+import threading
+from collections import deque
+
+from . import capture
+from . import imaging
+from . import utils
+
+UPLOAD_FORMATS = {
+    'PNG': "image/png",
+    'JPEG': "image/jpeg",
+    'WEBP': "image/webp",
+}
+
+# Per-request upload records kept for the panel
+UPLOAD_HISTORY = 32
+
+class UploadRecord:
+    def __init__(self, width, height, fmt, quality, payload_bytes):
+        self.width = width
+        self.height = height
+        self.format = fmt
+        self.quality = quality
+        self.payload_bytes = payload_bytes
+        self.upload_seconds = None
+
+    def __repr__(self):
+        upload = f"{self.upload_seconds:.2f}s" if self.upload_seconds is not None else "n/a"
+        return f"{self.width}x{self.height} {self.format} q{self.quality} {self.payload_bytes / 1e6:.2f} MB upload {upload}"
+
+_history = deque(maxlen=UPLOAD_HISTORY)
+_history_lock = threading.Lock()
+
+def record_upload(record):
+    with _history_lock:
+        _history.append(record)
+
+def upload_history():
+    with _history_lock:
+        return list(_history)
+
+def load_pixels(path):
+    """
+    Reads an image file through Blender into an (H, W, C) uint8 array, top row first.
+    """
+    import numpy as np
+
+    img = bpy.data.images.load(path, check_existing=False)
+    try:
+        width, height = img.size
+        channels = img.channels
+        buf = np.empty(width * height * channels, dtype=np.float32)
+        img.pixels.foreach_get(buf)
+    finally:
+        bpy.data.images.remove(img)
+    return imaging.float_to_uint8(buf.reshape(height, width, channels)[::-1, :, :3])
+
+def _encode_with_blender(pixels, fmt, quality, path):
+    """
+    JPEG / WebP encoding through Blender's image writers (numpy has no codec).
+    """
+    import numpy as np
+
+    height, width, channels = pixels.shape
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    rgba[:, :, :channels] = pixels[::-1] / 255.0
+    img = bpy.data.images.new("AI_Upload_Encode", width, height, alpha=False)
+    try:
+        img.pixels.foreach_set(rgba.ravel())
+        img.filepath_raw = path
+        img.file_format = fmt
+        try:
+            img.save(filepath=path, quality=quality)
+        except TypeError:
+            img.save() # Blender < 3.4: no quality argument, uses the writer default
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        bpy.data.images.remove(img)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def prepare_upload(source, max_megapixels, fmt, quality, png_compression):
+    """
+    Downscales a Capture to at most max_megapixels and re-encodes it in the
+    chosen format. Returns (Capture, UploadRecord). Runs on the main thread
+    because decoding engine captures and JPEG/WebP encoding go through bpy.
+    """
+    if source.pixels is None and fmt == 'PNG' and not max_megapixels:
+        # Nothing to do; stream the engine's PNG as-is
+        size = os.path.getsize(source.path)
+        return source, UploadRecord(0, 0, 'PNG', png_compression, size)
+
+    pixels = source.pixels if source.pixels is not None else load_pixels(source.path)
+    height, width = pixels.shape[:2]
+    new_w, new_h = imaging.fit_pixel_count(width, height, int(max_megapixels * 1e6))
+    pixels = imaging.resize_area(pixels, new_w, new_h)
+
+    if fmt == 'PNG':
+        data = imaging.encode_png(pixels, compress_level=png_compression)
+    else:
+        try:
+            data = _encode_with_blender(pixels, fmt, quality, utils.get_temp_path(f"ai_upload_{id(pixels)}.{fmt.lower()}"))
+        except TypeError:
+            # This Blender build cannot write the format (WebP needs 3.4+)
+            print(f"{fmt} encoding unavailable, falling back to JPEG")
+            fmt = 'JPEG'
+            data = _encode_with_blender(pixels, fmt, quality, utils.get_temp_path(f"ai_upload_{id(pixels)}.jpg"))
+
+    source.cleanup()
+    prepared = capture.Capture(data=data, mime_type=UPLOAD_FORMATS[fmt])
+    return prepared, UploadRecord(new_w, new_h, fmt, quality if fmt != 'PNG' else png_compression, len(data))
@@ -1,5 +1,8 @@
 import bpy
 from .utils import update_overlay_visibility, update_overlay_opacity
+from . import backends
+from . import tracing
+from . import tiling
 
 def update_resolution_callback(self, context):
     scene = context.scene
@@ -21,6 +24,13 @@ def update_resolution_callback(self, context):
             cam.data.sensor_width = base_sensor * aspect
         cam.data.update()
 
+def update_tile_overlap(self, context):
+    scene = context.scene
+    # Keep the overlap within half a tile, as tiling.tile_grid does
+    limit = tiling.clamp_overlap(scene.ai_tile_size, scene.ai_tile_overlap)
+    if scene.ai_tile_overlap != limit:
+        scene.ai_tile_overlap = limit
+
 def load_env_key():
     import os
     # Look for .env in the parent directory of this addon package
@@ -41,6 +51,28 @@ def load_env_key():
             pass
     return ""
 
+def load_env_keys():
+    """
+    All Fal.ai keys in the same .env, for the key pool: FAL_KEY, any
+    FAL_KEY_<suffix> and the comma separated FAL_KEYS, in file order.
+    """
+    import os
+    env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
+    keys = []
+    if os.path.exists(env_path):
+        try:
+            with open(env_path, 'r') as f:
+                for line in f:
+                    name, _, value = line.strip().partition("=")
+                    name = name.strip()
+                    if name == "FAL_KEYS":
+                        keys.extend(k.strip() for k in value.split(","))
+                    elif name == "FAL_KEY" or name.startswith("FAL_KEY_"):
+                        keys.append(value.strip())
+        except OSError:
+            pass
+    return [k for k in dict.fromkeys(keys) if k]
+
 def register_properties():
     # Scene Properties
     bpy.types.Scene.ai_prompt = bpy.props.StringProperty(
@@ -96,11 +128,318 @@ def register_properties():
         update=lambda self, ctx: update_overlay_opacity(ctx.scene)
     )
 
+    bpy.types.Scene.ai_overlay_history = bpy.props.IntProperty(
+        name="History",
+        description="Number of previous results kept as images (0 = reuse one image in place)",
+        min=0,
+        max=32,
+        default=0
+    )
+
+    bpy.types.Scene.ai_result_in_memory = bpy.props.BoolProperty(
+        name="In-Memory Results",
+        description="Decode results on the worker and write pixels straight into the overlay image, skipping temp files",
+        default=False
+    )
+
+    bpy.types.Scene.ai_save_results = bpy.props.BoolProperty(
+        name="Save Results",
+        description="Also write every result to the results folder in the background",
+        default=False
+    )
+
+    bpy.types.Scene.ai_results_dir = bpy.props.StringProperty(
+        name="Results Folder",
+        default="//ai_render/results/",
+        subtype='DIR_PATH'
+    )
+
     bpy.types.Scene.ai_status = bpy.props.StringProperty(
         name="Status",
         default="Idle"
     )
 
+    bpy.types.Scene.ai_capture_mode = bpy.props.EnumProperty(
+        name="Capture",
+        description="How the init image is captured before each request",
+        items=[
+            ('FULL', "Full Render", "F12 render with the scene's engine at full resolution"),
+            ('REDUCED', "Reduced Render", "Scene engine at Capture Scale, Cycles samples capped"),
+            ('VIEWPORT', "Viewport", "Fast offscreen viewport draw, encoded in memory without a temp file"),
+        ],
+        default='FULL'
+    )
+
+    bpy.types.Scene.ai_capture_scale = bpy.props.IntProperty(
+        name="Capture Scale",
+        description="Resolution percentage for Reduced and Viewport captures",
+        subtype='PERCENTAGE',
+        min=10,
+        max=100,
+        default=50
+    )
+
+    bpy.types.Scene.ai_upload_max_mpix = bpy.props.FloatProperty(
+        name="Max Upload MP",
+        description="Downscale the init image to at most this many megapixels before upload (0 = keep size)",
+        min=0.0,
+        max=50.0,
+        default=0.0
+    )
+
+    bpy.types.Scene.ai_upload_format = bpy.props.EnumProperty(
+        name="Upload Format",
+        items=[
+            ('JPEG', "JPEG", "Smallest payload; lossy"),
+            ('WEBP', "WebP", "Small lossy payload (Blender 3.4+)"),
+            ('PNG', "PNG", "Lossless; largest payload"),
+        ],
+        default='PNG'
+    )
+
+    bpy.types.Scene.ai_upload_quality = bpy.props.IntProperty(
+        name="Quality",
+        description="JPEG / WebP quality of the uploaded init image",
+        min=1,
+        max=100,
+        default=90
+    )
+
+    bpy.types.Scene.ai_upload_png_compression = bpy.props.IntProperty(
+        name="PNG Level",
+        description="zlib level for PNG uploads (higher = smaller, slower)",
+        min=0,
+        max=9,
+        default=6
+    )
+
+    bpy.types.Scene.ai_submit_mode = bpy.props.EnumProperty(
+        name="Submit Mode",
+        items=[
+            ('SYNC', "Synchronous", "Block a worker thread on fal.run until the image is ready"),
+            ('QUEUE', "Queue (Async)", "Submit to Fal's queue API and poll from a shared event loop"),
+        ],
+        default='SYNC'
+    )
+
+    bpy.types.Scene.ai_worker_count = bpy.props.IntProperty(
+        name="Workers",
+        description="Worker threads processing queued AI render jobs",
+        min=1,
+        max=32,
+        default=2
+    )
+
+    bpy.types.Scene.ai_max_in_flight = bpy.props.IntProperty(
+        name="Max In-Flight",
+        description="Maximum number of API requests running at the same time",
+        min=1,
+        max=64,
+        default=4
+    )
+
+    bpy.types.Scene.ai_backend = bpy.props.EnumProperty(
+        name="Model",
+        description="Backend that generates the images",
+        items=backends.enum_items
+    )
+
+    bpy.types.Scene.ai_fallback_enabled = bpy.props.BoolProperty(
+        name="Fallback",
+        description="Route single renders to a faster model while the selected one is slow or failing. Batches always use the selected model",
+        default=False
+    )
+
+    bpy.types.Scene.ai_fallback_after = bpy.props.FloatProperty(
+        name="When Slower Than",
+        description="Median latency of recent requests above which the faster fallback model is used",
+        min=1.0,
+        max=300.0,
+        default=30.0,
+        subtype='TIME'
+    )
+
+    bpy.types.Scene.ai_rate_limit = bpy.props.IntProperty(
+        name="Requests / Min",
+        description="Requests started per minute and API key (0 = no pacing). Slowed down automatically while Fal.ai answers 429",
+        min=0,
+        max=6000,
+        default=0
+    )
+
+    bpy.types.Scene.ai_key_concurrency = bpy.props.IntProperty(
+        name="Per Key",
+        description="Requests running at the same time per API key; halved on 429 and grown back on success",
+        min=1,
+        max=64,
+        default=8
+    )
+
+    bpy.types.Scene.ai_key_pool = bpy.props.BoolProperty(
+        name="Key Pool",
+        description="Spread requests over every key in .env (FAL_KEY, FAL_KEY_<n>, FAL_KEYS=a,b,...), least loaded first",
+        default=False
+    )
+
+    bpy.types.Scene.ai_retry_attempts = bpy.props.IntProperty(
+        name="Attempts",
+        description="Tries per request; rate limits, server errors and timeouts are retried with exponential backoff",
+        min=1,
+        max=10,
+        default=3
+    )
+
+    bpy.types.Scene.ai_hedge_enabled = bpy.props.BoolProperty(
+        name="Hedge Slow Requests",
+        description="Send a duplicate request when one runs slower than most recent ones and keep whichever finishes first. Duplicates are billed",
+        default=False
+    )
+
+    bpy.types.Scene.ai_hedge_percentile = bpy.props.IntProperty(
+        name="Hedge After",
+        description="Latency percentile of recent requests after which a duplicate is sent",
+        min=50,
+        max=99,
+        default=95,
+        subtype='PERCENTAGE'
+    )
+
+    bpy.types.Scene.ai_batch_output_dir = bpy.props.StringProperty(
+        name="Batch Output",
+        description="Directory for numbered frame_NNNN.png results of frame-range batches",
+        default="//ai_render/",
+        subtype='DIR_PATH'
+    )
+
+    bpy.types.Scene.ai_cache_enabled = bpy.props.BoolProperty(
+        name="Cache Results",
+        description="Reuse the previous result when prompt, capture and settings are unchanged",
+        default=False
+    )
+
+    bpy.types.Scene.ai_cache_size_mb = bpy.props.IntProperty(
+        name="Cache Size (MB)",
+        description="Maximum disk space used by cached results; least recently used are evicted first",
+        min=16,
+        max=65536,
+        default=512
+    )
+
+    bpy.types.Scene.ai_trace_enabled = bpy.props.BoolProperty(
+        name="Trace Stages",
+        description="Record timing spans for every render stage (capture, upload, generation, download, viewport update)",
+        default=False,
+        update=lambda self, ctx: setattr(tracing.get_tracer(), "enabled", ctx.scene.ai_trace_enabled)
+    )
+
+    bpy.types.Scene.ai_skip_unchanged = bpy.props.BoolProperty(
+        name="Skip Unchanged",
+        description="Keep the last result instead of capturing and generating again when the scene, camera, "
+                    "prompt and settings haven't changed, or when the new capture looks the same as the last one",
+        default=False
+    )
+
+    bpy.types.Scene.ai_skip_tolerance = bpy.props.IntProperty(
+        name="Tolerance",
+        description="Largest brightness difference (0-255) of any 32x32 block average for a capture to count as the same picture. 0 only matches near-exact captures",
+        min=0,
+        max=64,
+        default=4
+    )
+
+    bpy.types.Scene.ai_live_delay = bpy.props.FloatProperty(
+        name="Settle Time",
+        description="Seconds without edits before live mode generates",
+        min=0.1,
+        max=5.0,
+        default=0.75,
+        subtype='TIME'
+    )
+
+    bpy.types.Scene.ai_live_scale = bpy.props.IntProperty(
+        name="Preview Scale",
+        description="Live previews are captured from the viewport and generated at this percentage of the render resolution",
+        min=10,
+        max=100,
+        default=25,
+        subtype='PERCENTAGE'
+    )
+
+    bpy.types.Scene.ai_tiled = bpy.props.BoolProperty(
+        name="Tiled",
+        description="Split the capture into overlapping tiles, generate them concurrently and blend the seams. "
+                    "For resolutions beyond what the model renders natively",
+        default=False
+    )
+
+    bpy.types.Scene.ai_tile_size = bpy.props.IntProperty(
+        name="Tile Size",
+        description="Width and height of each tile in pixels",
+        min=256,
+        max=2048,
+        default=1024,
+        update=update_tile_overlap
+    )
+
+    bpy.types.Scene.ai_tile_overlap = bpy.props.IntProperty(
+        name="Overlap",
+        description="Minimum pixels shared by neighbouring tiles; seams are feathered across this band. "
+                    "At most half the tile size",
+        min=16,
+        max=512,
+        default=128,
+        update=update_tile_overlap
+    )
+
+    bpy.types.Scene.ai_progressive = bpy.props.BoolProperty(
+        name="Progressive",
+        description="Also send a fast low-resolution request and show its result first; "
+                    "the full-resolution result replaces it when it arrives",
+        default=False
+    )
+
+    bpy.types.Scene.ai_progressive_scale = bpy.props.IntProperty(
+        name="Preview Scale",
+        description="Resolution of the progressive preview as a percentage of the render resolution",
+        min=5,
+        max=50,
+        default=25,
+        subtype='PERCENTAGE'
+    )
+
+    bpy.types.Scene.ai_variation_mode = bpy.props.EnumProperty(
+        name="Vary",
+        description="What changes between variations",
+        items=[
+            ('PRESETS', "Presets", "One variation per prompt preset"),
+            ('PROMPTS', "Prompts", "One variation per prompt, separated by |"),
+            ('SEEDS', "Seeds", "The current prompt with consecutive seeds (for models that take a seed)"),
+        ],
+        default='PRESETS'
+    )
+
+    bpy.types.Scene.ai_variation_prompts = bpy.props.StringProperty(
+        name="Prompts",
+        description="Prompts to compare, separated by |",
+        default="",
+        maxlen=4000
+    )
+
+    bpy.types.Scene.ai_variation_count = bpy.props.IntProperty(
+        name="Count",
+        description="Number of seeds to try",
+        min=2,
+        max=16,
+        default=4
+    )
+
+    bpy.types.Scene.ai_variation_seed = bpy.props.IntProperty(
+        name="First Seed",
+        description="Seed of the first variation; the others count up from it",
+        min=0,
+        default=1
+    )
+
 def unregister_properties():
     del bpy.types.Scene.ai_prompt
     del bpy.types.Scene.ai_api_key
@@ -109,4 +448,43 @@ def unregister_properties():
     del bpy.types.Scene.ai_resolution
     del bpy.types.Scene.ai_overlay_enabled
     del bpy.types.Scene.ai_overlay_opacity
+    del bpy.types.Scene.ai_overlay_history
+    del bpy.types.Scene.ai_result_in_memory
+    del bpy.types.Scene.ai_save_results
+    del bpy.types.Scene.ai_results_dir
     del bpy.types.Scene.ai_status
+    del bpy.types.Scene.ai_capture_mode
+    del bpy.types.Scene.ai_capture_scale
+    del bpy.types.Scene.ai_upload_max_mpix
+    del bpy.types.Scene.ai_upload_format
+    del bpy.types.Scene.ai_upload_quality
+    del bpy.types.Scene.ai_upload_png_compression
+    del bpy.types.Scene.ai_submit_mode
+    del bpy.types.Scene.ai_worker_count
+    del bpy.types.Scene.ai_max_in_flight
+    del bpy.types.Scene.ai_backend
+    del bpy.types.Scene.ai_fallback_enabled
+    del bpy.types.Scene.ai_fallback_after
+    del bpy.types.Scene.ai_rate_limit
+    del bpy.types.Scene.ai_key_concurrency
+    del bpy.types.Scene.ai_key_pool
+    del bpy.types.Scene.ai_retry_attempts
+    del bpy.types.Scene.ai_hedge_enabled
+    del bpy.types.Scene.ai_hedge_percentile
+    del bpy.types.Scene.ai_batch_output_dir
+    del bpy.types.Scene.ai_cache_enabled
+    del bpy.types.Scene.ai_cache_size_mb
+    del bpy.types.Scene.ai_trace_enabled
+    del bpy.types.Scene.ai_skip_unchanged
+    del bpy.types.Scene.ai_skip_tolerance
+    del bpy.types.Scene.ai_live_delay
+    del bpy.types.Scene.ai_live_scale
+    del bpy.types.Scene.ai_tiled
+    del bpy.types.Scene.ai_tile_size
+    del bpy.types.Scene.ai_tile_overlap
+    del bpy.types.Scene.ai_progressive
+    del bpy.types.Scene.ai_progressive_scale
+    del bpy.types.Scene.ai_variation_mode
+    del bpy.types.Scene.ai_variation_prompts
+    del bpy.types.Scene.ai_variation_count
+    del bpy.types.Scene.ai_variation_seed
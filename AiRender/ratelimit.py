@@ -0,0 +1,265 @@
+import threading
+import time
+
+# Requests per API key running at once until configured otherwise; high
+# enough that scripts which never call configure() are not held back
+DEFAULT_CONCURRENCY = 64
+
+# Pause after a 429 that came without a Retry-After header
+THROTTLE_PAUSE = 2.0
+
+# Longest single wait before cancellation is checked again
+WAIT_SLICE = 0.1
+
+class KeyLimiter:
+    """
+    Token bucket plus concurrency limit for one API key.
+
+    `rate` is the configured pace in requests per second (0: no pacing) and
+    `max_concurrent` the configured number of requests in flight. Both adapt
+    to rate limiting: a 429 halves the current rate and concurrency limit
+    and pauses the key for the Retry-After time; successes win them back
+    step by step (additive increase, multiplicative decrease).
+    All state is guarded by the module's condition variable.
+    """
+    def __init__(self, key, rate=0.0, max_concurrent=DEFAULT_CONCURRENCY):
+        now = time.monotonic()
+        self.key = key
+        self.rate = rate
+        self.max_concurrent = max_concurrent
+        self.current_rate = rate
+        self.limit = max_concurrent
+        self.tokens = float(max_concurrent)
+        self.blocked_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self.last_started = 0.0
+        self._updated = now
+        self._successes = 0
+        # Slot-seconds spent in flight, for utilisation
+        self._busy = 0.0
+        self._busy_mark = now
+        self._since = now
+
+    def configure(self, rate, max_concurrent):
+        if rate != self.rate:
+            self.rate = self.current_rate = rate
+        if max_concurrent != self.max_concurrent:
+            self.max_concurrent = self.limit = max_concurrent
+
+    def _advance(self, now):
+        if self.current_rate > 0:
+            self.tokens = min(self.max_concurrent, self.tokens + (now - self._updated) * self.current_rate)
+        self._updated = now
+        self._busy += self.in_flight * (now - self._busy_mark)
+        self._busy_mark = now
+
+    def ready_in(self, now):
+        """
+        Seconds until a request may start on this key; None while it is only
+        waiting for a request of its own to finish.
+        """
+        self._advance(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.current_rate > 0 and self.tokens < 1.0:
+            wait = max(wait, (1.0 - self.tokens) / self.current_rate)
+        if self.in_flight >= self.limit:
+            return None
+        return wait
+
+    def start(self, now):
+        self._advance(now)
+        if self.current_rate > 0:
+            self.tokens -= 1.0
+        self.in_flight += 1
+        self.requests += 1
+        self.last_started = now
+
+    def finish(self, now, throttled=False, retry_after=None, success=True):
+        self._advance(now)
+        self.in_flight -= 1
+        if throttled:
+            self.throttle(now, retry_after)
+            return
+        if not success:
+            return # Network errors and cancellations say nothing about the quota
+        self._successes += 1
+        if self.rate > 0:
+            self.current_rate = min(self.rate, self.current_rate + self.rate / 10)
+        if self.limit < self.max_concurrent and self._successes >= self.limit:
+            self.limit += 1
+            self._successes = 0
+
+    def throttle(self, now, retry_after=None):
+        """
+        Backs off after a 429: halves the rate and concurrency limit and
+        pauses the key for retry_after seconds (THROTTLE_PAUSE if None).
+        """
+        self._advance(now)
+        self.throttled += 1
+        self._successes = 0
+        self.limit = max(1, self.limit // 2)
+        if self.rate > 0:
+            self.current_rate = max(self.rate / 16, self.current_rate / 2)
+        self.tokens = min(self.tokens, 0.0)
+        pause = retry_after if retry_after is not None else THROTTLE_PAUSE
+        self.blocked_until = max(self.blocked_until, now + pause)
+
+    def stats(self, now):
+        self._advance(now)
+        elapsed = now - self._since
+        return {
+            "key": mask_key(self.key),
+            "in_flight": self.in_flight,
+            "limit": self.limit,
+            "max_concurrent": self.max_concurrent,
+            "rate": self.current_rate * 60,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "waited": self.waited,
+            "paused": max(0.0, self.blocked_until - now),
+            "utilisation": self._busy / (self.max_concurrent * elapsed) if elapsed > 0 else 0.0,
+        }
+
+class Lease:
+    """
+    One request's hold on a key. Leaving the `with` block releases it; an
+    exception with status 429 counts as rate limiting, honouring its
+    retry_after. Other failures only free the slot.
+    """
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.key = limiter.key
+
+    def __enter__(self):
+        return self
+
+    def throttle(self, retry_after=None):
+        """
+        Reports a 429 on a follow-up call (e.g. a status poll) made while
+        the lease is still held.
+        """
+        with _cond:
+            self.limiter.throttle(time.monotonic(), retry_after)
+
+    def __exit__(self, exc_type, exc, tb):
+        status = getattr(exc, "status", None)
+        release(self.limiter, throttled=status == 429, retry_after=getattr(exc, "retry_after", None),
+                success=exc is None)
+        return False
+
+_limiters = {}
+_pool_keys = ()
+_settings = {"rate": 0.0, "max_concurrent": DEFAULT_CONCURRENCY}
+_cond = threading.Condition()
+
+def mask_key(key):
+    """
+    Short form of an API key that is safe to show and log.
+    """
+    return f"...{key[-4:]}" if len(key) > 8 else "..."
+
+def configure(rate_per_minute=0, max_concurrent=DEFAULT_CONCURRENCY, pool_keys=()):
+    """
+    Sets the per-key limits and the extra keys requests may be spread over.
+    Adaptive state of keys whose limits didn't change is kept.
+    """
+    global _pool_keys
+    with _cond:
+        _settings["rate"] = rate_per_minute / 60.0
+        _settings["max_concurrent"] = max(1, max_concurrent)
+        _pool_keys = tuple(k for k in dict.fromkeys(pool_keys) if k)
+        for limiter in _limiters.values():
+            limiter.configure(_settings["rate"], _settings["max_concurrent"])
+        _cond.notify_all()
+
+def keys_for(api_key):
+    """
+    The keys a request made with `api_key` may use: the key itself, then the pool.
+    """
+    with _cond:
+        return tuple(dict.fromkeys((api_key,) + _pool_keys))
+
+def _limiter(key):
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = _limiters[key] = KeyLimiter(key, _settings["rate"], _settings["max_concurrent"])
+    return limiter
+
+def _pick(limiters, now):
+    """
+    Returns (limiter, None) for the least loaded key that may start now, or
+    (None, seconds until one might).
+    """
+    ready = []
+    soonest = None
+    for limiter in limiters:
+        wait = limiter.ready_in(now)
+        if wait == 0.0:
+            ready.append(limiter)
+        elif wait is not None:
+            soonest = wait if soonest is None else min(soonest, wait)
+    if ready:
+        # Least loaded first; among equals the one used longest ago (round robin)
+        return min(ready, key=lambda l: (l.in_flight / l.limit, l.last_started)), None
+    return None, soonest
+
+def _start(limiters, started):
+    """
+    Leases the best key of `limiters` if one may start now. Returns (Lease,
+    None) or (None, seconds to wait before trying again). Call with _cond held.
+    """
+    now = time.monotonic()
+    limiter, wait = _pick(limiters, now)
+    if limiter is None:
+        return None, WAIT_SLICE if wait is None else min(wait, WAIT_SLICE)
+    limiter.start(now)
+    limiter.waited += now - started
+    return Lease(limiter), None
+
+def acquire(api_key, is_cancelled=None):
+    """
+    Blocks until one of the keys for `api_key` may send a request and
+    returns its Lease. Raises RuntimeError("Cancelled") once is_cancelled()
+    turns true while waiting.
+    """
+    keys = keys_for(api_key)
+    started = time.monotonic()
+    with _cond:
+        limiters = [_limiter(key) for key in keys]
+        while True:
+            if is_cancelled and is_cancelled():
+                raise RuntimeError("Cancelled")
+            lease, wait = _start(limiters, started)
+            if lease is not None:
+                return lease
+            _cond.wait(wait)
+
+def try_acquire(api_key, started=None):
+    """
+    Non-blocking acquire for callers that wait on their own (e.g. an asyncio
+    loop). Returns (Lease, None), or (None, seconds to wait before trying
+    again). `started` is when the caller began waiting, for the stats.
+    """
+    keys = keys_for(api_key)
+    with _cond:
+        return _start([_limiter(key) for key in keys], time.monotonic() if started is None else started)
+
+def release(limiter, throttled=False, retry_after=None, success=True):
+    with _cond:
+        limiter.finish(time.monotonic(), throttled, retry_after, success)
+        _cond.notify_all()
+
+def stats():
+    """
+    Per-key counters, current limits and utilisation, in first-use order.
+    """
+    with _cond:
+        now = time.monotonic()
+        return [limiter.stats(now) for limiter in _limiters.values()]
+
+def reset():
+    with _cond:
+        _limiters.clear()
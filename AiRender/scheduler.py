@@ -0,0 +1,205 @@
+import itertools
+import queue
+import threading
+import time
+
+# Job lifecycle states
+QUEUED = "QUEUED"
+CAPTURING = "CAPTURING"
+UPLOADING = "UPLOADING"
+GENERATING = "GENERATING"
+DOWNLOADING = "DOWNLOADING"
+DONE = "DONE"
+FAILED = "FAILED"
+CANCELLED = "CANCELLED"
+SKIPPED = "SKIPPED" # Input unchanged; the previous result was kept
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED, SKIPPED)
+
+# How many finished jobs are kept around for the panel
+HISTORY_LIMIT = 8
+
+_job_ids = itertools.count(1)
+
+class Job:
+    """
+    Base work item. Subclasses implement run(), which executes on a worker
+    thread, and may call set_state() / check cancelled as they progress.
+    """
+    def __init__(self):
+        self.job_id = next(_job_ids)
+        self.state = QUEUED
+        self.error_msg = None
+        self._cancel_event = threading.Event()
+        # perf_counter() of the last state change, and seconds spent in each state so far
+        self.state_since = time.perf_counter()
+        self.stage_seconds = {}
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    def set_state(self, state):
+        # Once cancelled, only a terminal state may be recorded
+        if self.cancelled and state not in FINISHED_STATES:
+            return
+        self._enter(state)
+
+    def _enter(self, state):
+        now = time.perf_counter()
+        previous = self.state
+        self.stage_seconds[previous] = self.stage_seconds.get(previous, 0.0) + now - self.state_since
+        self.state_since = now
+        self.state = state
+
+    def cancel(self):
+        self._cancel_event.set()
+        if self.state == QUEUED:
+            self._enter(CANCELLED)
+
+    def run(self):
+        raise NotImplementedError
+
+class JobScheduler:
+    """
+    Queue of jobs served by a pool of worker threads. `in_flight` is a
+    semaphore jobs hold around their network requests, so more jobs can be
+    queued or post-processing than are talking to the API at once.
+    """
+    def __init__(self, num_workers=2, max_in_flight=4):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        # Workers the pool should have; a worker taking a stop signal only exits above this
+        self._target = 0
+        self._jobs = []
+        self._max_in_flight = max_in_flight
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.configure(num_workers, max_in_flight)
+
+    def configure(self, num_workers, max_in_flight):
+        """
+        Grows the worker pool to num_workers and resizes the in-flight limit.
+        Workers are never torn down mid-job; surplus ones exit when idle.
+        Stop signals left over from an earlier shrink are ignored once the
+        pool is down to size, so repeated resizes never empty it.
+        """
+        with self._lock:
+            if max_in_flight != self._max_in_flight:
+                # Jobs already holding the old semaphore release it, so swapping is safe
+                self._max_in_flight = max_in_flight
+                self.in_flight = threading.BoundedSemaphore(max_in_flight)
+            self._target = num_workers
+            self._workers = [w for w in self._workers if w.is_alive()]
+            while len(self._workers) < num_workers:
+                worker = threading.Thread(target=self._worker_loop, name="AIRenderWorker", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            surplus = len(self._workers) - num_workers
+        for _ in range(surplus):
+            self._queue.put(None)
+
+    def submit(self, job):
+        with self._lock:
+            self._jobs.append(job)
+            self._trim_history()
+        job.set_state(QUEUED)
+        self._queue.put(job)
+        return job
+
+    def run_in_worker(self, fn):
+        """
+        Runs a plain callable on the worker pool (e.g. completion work handed
+        off from the asyncio loop thread).
+        """
+        self._queue.put(fn)
+
+    def track(self, job):
+        """
+        Makes a job visible before it is queued (e.g. while capturing on the main thread).
+        """
+        with self._lock:
+            if job not in self._jobs:
+                self._jobs.append(job)
+                self._trim_history()
+
+    def _trim_history(self):
+        finished = [j for j in self._jobs if j.finished]
+        for job in finished[:max(0, len(finished) - HISTORY_LIMIT)]:
+            self._jobs.remove(job)
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                with self._lock:
+                    if len(self._workers) <= self._target:
+                        continue # Stale stop signal; the pool is already down to size
+                    current = threading.current_thread()
+                    if current in self._workers:
+                        self._workers.remove(current)
+                return
+            if not isinstance(job, Job):
+                try:
+                    job()
+                except Exception as e:
+                    print(f"Worker task crashed: {e}")
+                continue
+            if job.cancelled:
+                job.set_state(CANCELLED)
+                continue
+            try:
+                job.run()
+            except Exception as e:
+                job.error_msg = str(e)
+                job.set_state(FAILED)
+                print(f"Job {job.job_id} crashed: {e}")
+
+    def cancel(self, job_id):
+        for job in self.jobs():
+            if job.job_id == job_id:
+                job.cancel()
+                return True
+        return False
+
+    def cancel_all(self):
+        for job in self.jobs():
+            job.cancel()
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs)
+
+    def active_jobs(self):
+        return [j for j in self.jobs() if not j.finished]
+
+    def shutdown(self):
+        self.cancel_all()
+        with self._lock:
+            self._target = 0
+            workers = list(self._workers)
+        for _ in workers:
+            self._queue.put(None)
+
+_scheduler = None
+
+def get_scheduler(num_workers=None, max_in_flight=None):
+    """
+    Returns the shared JobScheduler, resizing it if settings are given.
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler(num_workers or 2, max_in_flight or 4)
+    elif num_workers is not None and max_in_flight is not None:
+        _scheduler.configure(num_workers, max_in_flight)
+    return _scheduler
+
+def shutdown():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown()
+        _scheduler = None
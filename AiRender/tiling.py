@@ -0,0 +1,87 @@
+import math
+
+# numpy ships with Blender; imported lazily like in imaging
+
+# Most tiles one render may request; each one is a billed generation
+MAX_TILES = 64
+
+def clamp_overlap(tile, overlap):
+    """
+    Overlap limited to half a tile, so every tile adds at least half its size.
+    """
+    return max(0, min(overlap, tile // 2))
+
+def _axis_tiles(length, tile, overlap):
+    """
+    Starts of equally sized tiles covering 0..length with at least `overlap`
+    pixels shared between neighbours; the last tile ends on the edge.
+    """
+    if length <= tile:
+        return [0], length
+    overlap = clamp_overlap(tile, overlap)
+    count = math.ceil((length - overlap) / (tile - overlap))
+    step = (length - tile) / (count - 1)
+    return [round(i * step) for i in range(count)], tile
+
+def tile_grid(width, height, tile_size, overlap, max_tiles=MAX_TILES):
+    """
+    Overlapping tile boxes (x, y, w, h), top-left origin, row by row.
+    Raises RuntimeError if the grid would need more than max_tiles tiles.
+    """
+    xs, tile_w = _axis_tiles(width, tile_size, overlap)
+    ys, tile_h = _axis_tiles(height, tile_size, overlap)
+    if len(xs) * len(ys) > max_tiles:
+        raise RuntimeError(
+            f"{width}x{height} needs {len(xs) * len(ys)} tiles of {tile_size}px, more than the limit of {max_tiles}; "
+            f"increase the tile size or lower the resolution"
+        )
+    return [(x, y, tile_w, tile_h) for y in ys for x in xs]
+
+def _ramp(starts, index, size):
+    """
+    1-D blend weights of one tile: linear ramps across the region shared with
+    each neighbour, 1 elsewhere. Neighbouring ramps sum to 1.
+    """
+    import numpy as np
+
+    weights = np.ones(size, dtype=np.float32)
+    start = starts[index]
+    if index > 0:
+        shared = starts[index - 1] + size - start
+        if shared > 0:
+            weights[:shared] = (np.arange(shared, dtype=np.float32) + 0.5) / shared
+    if index < len(starts) - 1:
+        shared = start + size - starts[index + 1]
+        if shared > 0:
+            weights[size - shared:] *= (np.arange(shared, 0, -1, dtype=np.float32) - 0.5) / shared
+    return weights
+
+def feather_weights(boxes):
+    """
+    (h, w) float32 weight map per box of a tile_grid(); the maps of
+    overlapping tiles add up to 1 everywhere, corners included.
+    """
+    import numpy as np
+
+    xs = sorted({x for x, _, _, _ in boxes})
+    ys = sorted({y for _, y, _, _ in boxes})
+    return [
+        np.outer(_ramp(ys, ys.index(y), h), _ramp(xs, xs.index(x), w))
+        for x, y, w, h in boxes
+    ]
+
+def stitch(tiles, boxes, width, height):
+    """
+    Blends (h, w, C) float tiles placed at `boxes` into one (height, width, C)
+    image with feathered seams.
+    """
+    import numpy as np
+
+    channels = tiles[0].shape[2]
+    out = np.zeros((height, width, channels), dtype=np.float32)
+    total = np.zeros((height, width), dtype=np.float32)
+    for tile, (x, y, w, h), weights in zip(tiles, boxes, feather_weights(boxes)):
+        out[y:y + h, x:x + w] += tile * weights[:, :, None]
+        total[y:y + h, x:x + w] += weights
+    out /= np.maximum(total, 1e-6)[:, :, None]
+    return out
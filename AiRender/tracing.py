@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Completed spans kept for export; older ones are dropped
+TRACE_EVENT_LIMIT = 20000
+
+# Recent durations per span name used for the panel summary
+SUMMARY_WINDOW = 50
+
+class Span:
+    """
+    Times one stage. Extra details (byte counts, status codes) can be
+    attached while it runs with set().
+    """
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+class _NullSpan:
+    """
+    Returned while tracing is disabled: entering, leaving and set() do nothing.
+    """
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Tracer:
+    """
+    Collects spans from any thread into a bounded buffer that can be written
+    out as Chrome trace-event JSON (chrome://tracing, Perfetto), and keeps a
+    rolling per-stage summary for the panel.
+    """
+    def __init__(self, enabled=False, limit=TRACE_EVENT_LIMIT):
+        self.enabled = enabled
+        self._events = deque(maxlen=limit)
+        self._recent = {}
+        self._counts = {}
+        self._thread_names = {}
+        self._lock = threading.Lock()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def record(self, name, start, end, args=None):
+        """
+        Adds a finished span with perf_counter() start / end times.
+        """
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        event = (name, start, end - start, thread.ident, dict(args) if args else None)
+        with self._lock:
+            self._events.append(event)
+            self._thread_names[thread.ident] = thread.name
+            recent = self._recent.get(name)
+            if recent is None:
+                recent = self._recent[name] = deque(maxlen=SUMMARY_WINDOW)
+            recent.append(end - start)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self):
+        """
+        Returns [(name, count, mean_seconds, max_seconds)] over the recent window,
+        in the order stages were first seen.
+        """
+        with self._lock:
+            return [
+                (name, self._counts[name], sum(recent) / len(recent), max(recent))
+                for name, recent in self._recent.items()
+            ]
+
+    def export_chrome(self, path):
+        """
+        Writes the buffered spans as Chrome trace-event JSON. Returns the event count.
+        """
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        pid = os.getpid()
+        origin = min(event[1] for event in events) if events else 0.0
+        trace = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        for name, start, duration, tid, args in events:
+            event = {
+                "name": name, "cat": "airender", "ph": "X", "pid": pid, "tid": tid,
+                "ts": (start - origin) * 1e6, "dur": duration * 1e6,
+            }
+            if args:
+                event["args"] = args
+            trace.append(event)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._recent.clear()
+            self._counts.clear()
+            self._thread_names.clear()
+
+_tracer = Tracer()
+
+def get_tracer():
+    return _tracer
+
+def span(name, **args):
+    """
+    Shorthand for get_tracer().span(); a shared no-op object when tracing is off.
+    """
+    return _tracer.span(name, **args)
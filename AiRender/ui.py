@@ -1,5 +1,16 @@
 import bpy
-from .operators import _active_job
+from . import cache
+from . import changes
+from . import client
+from . import scheduler
+from . import preprocess
+from . import ratelimit
+from . import tracing
+from . import utils
+from . import variations
+from . import live
+from . import metrics
+from . import operators
 
 class AIR_PT_panel(bpy.types.Panel):
     bl_label = "AI Render"
@@ -16,6 +27,12 @@ class AIR_PT_panel(bpy.types.Panel):
         col = layout.column()
         col.label(text="Settings")
         col.prop(scene, "ai_api_key")
+        col.prop(scene, "ai_backend")
+        row = col.row()
+        row.prop(scene, "ai_fallback_enabled")
+        sub = row.row()
+        sub.enabled = scene.ai_fallback_enabled
+        sub.prop(scene, "ai_fallback_after")
 
         # Prompt Section
         box = layout.box()
@@ -39,32 +56,205 @@ class AIR_PT_panel(bpy.types.Panel):
         # Resolution
         layout.separator()
         layout.prop(scene, "ai_resolution")
+        row = layout.row()
+        row.prop(scene, "ai_capture_mode")
+        sub = row.row()
+        sub.enabled = scene.ai_capture_mode != 'FULL'
+        sub.prop(scene, "ai_capture_scale", text="Scale")
+        row = layout.row()
+        row.prop(scene, "ai_tiled")
+        sub = row.row(align=True)
+        sub.enabled = scene.ai_tiled
+        sub.prop(scene, "ai_tile_size", text="Size")
+        sub.prop(scene, "ai_tile_overlap", text="Overlap")
+        row = layout.row()
+        row.prop(scene, "ai_progressive")
+        sub = row.row()
+        sub.enabled = scene.ai_progressive
+        sub.prop(scene, "ai_progressive_scale", text="Scale")
+
+        # Upload Preprocessing
+        upload_box = layout.box()
+        upload_box.label(text="Upload")
+        row = upload_box.row()
+        row.prop(scene, "ai_upload_format", text="")
+        if scene.ai_upload_format == 'PNG':
+            row.prop(scene, "ai_upload_png_compression")
+        else:
+            row.prop(scene, "ai_upload_quality")
+        upload_box.prop(scene, "ai_upload_max_mpix")
+        history = preprocess.upload_history()
+        if history:
+            upload_box.label(text=f"Last: {history[-1]}")
 
         # Overlay Controls
         overlay_box = layout.box()
         overlay_box.label(text="Viewport Overlay")
         overlay_box.prop(scene, "ai_overlay_enabled")
         overlay_box.prop(scene, "ai_overlay_opacity")
+        row = overlay_box.row()
+        row.prop(scene, "ai_overlay_history")
+        row.operator("air.purge_overlay_images", text="", icon='ORPHAN_DATA')
+        overlay_box.prop(scene, "ai_result_in_memory")
+        row = overlay_box.row()
+        row.prop(scene, "ai_save_results", text="Save")
+        sub = row.row()
+        sub.enabled = scene.ai_save_results
+        sub.prop(scene, "ai_results_dir", text="")
+        history = utils.overlay_history(utils.overlay_names(scene.camera)[2]) if scene.camera else []
+        if history:
+            row = overlay_box.row(align=True)
+            row.operator("air.show_overlay_history", text="Latest").image_name = ""
+            for i, img in enumerate(history, 1):
+                row.operator("air.show_overlay_history", text=f"-{i}").image_name = img.name
+
+        # Result Cache
+        cache_box = layout.box()
+        cache_box.label(text="Result Cache")
+        row = cache_box.row()
+        row.prop(scene, "ai_cache_enabled")
+        row.prop(scene, "ai_cache_size_mb")
+        stats = cache.get_cache().stats()
+        row = cache_box.row()
+        row.label(text=f"Hits: {stats['hits']}  Misses: {stats['misses']}")
+        row.operator("air.clear_cache", text="", icon='TRASH')
+        row = cache_box.row()
+        row.prop(scene, "ai_skip_unchanged")
+        sub = row.row()
+        sub.enabled = scene.ai_skip_unchanged
+        sub.prop(scene, "ai_skip_tolerance")
+        skipped = changes.get_detector().stats()
+        if skipped["skipped_captures"] or skipped["skipped_requests"]:
+            cache_box.label(text=f"Skipped: {skipped['skipped_captures']} captures, {skipped['skipped_requests']} requests")
+
+        # Stage Timings
+        trace_box = layout.box()
+        row = trace_box.row()
+        row.prop(scene, "ai_trace_enabled")
+        row.operator("air.export_trace", text="", icon='EXPORT')
+        row.operator("air.reset_trace", text="", icon='TRASH')
+        row = trace_box.row()
+        samples = metrics.sample_count()
+        row.label(text="Job history" + (f": {samples} stage samples" if samples is not None else ""))
+        row.operator("air.export_metrics", text="", icon='EXPORT')
+        if scene.ai_trace_enabled:
+            col = trace_box.column(align=True)
+            for name, count, mean, worst in tracing.get_tracer().summary():
+                col.label(text=f"{name}: {mean * 1000:.0f} ms avg, {worst * 1000:.0f} max ({count})")
 
         # Render Button
         layout.separator()
         row = layout.row()
-        # Disable if job running or no key
-        if not scene.ai_api_key:
+        # Read the scheduler live; jobs can queue while others run
+        active_jobs = scheduler.get_scheduler().active_jobs()
+        if not operators.has_credentials(scene):
             row.enabled = False
             btn_text = "Enter API Key"
-        elif _active_job:
-            row.enabled = False
-            btn_text = "Generating..."
+        elif active_jobs:
+            row.enabled = True
+            btn_text = f"Queue Render ({len(active_jobs)} running)"
         else:
             row.enabled = True
             btn_text = "Capture & Render"
             
         row.operator("air.render", text=btn_text, icon='RENDER_STILL')
+        row = layout.row()
+        row.enabled = operators.has_credentials(scene)
+        row.operator("air.render_cameras", text=f"Render {len(operators.cameras_to_render(context))} Camera(s)", icon='OUTLINER_OB_CAMERA')
+
+        # Live Mode
+        live_box = layout.box()
+        row = live_box.row()
+        row.enabled = operators.has_credentials(scene)
+        session = live.get_session()
+        row.operator("air.live_render", text="Stop Live" if session else "Start Live",
+                     icon='PAUSE' if session else 'PLAY', depress=session is not None)
+        row = live_box.row()
+        row.prop(scene, "ai_live_delay")
+        row.prop(scene, "ai_live_scale")
+        if session:
+            live_box.label(text=f"{session.generated} generated, {session.superseded} superseded")
+
+        # Variations
+        variation_box = layout.box()
+        row = variation_box.row()
+        row.label(text="Variations")
+        row.prop(scene, "ai_variation_mode", text="")
+        if scene.ai_variation_mode == 'PROMPTS':
+            variation_box.prop(scene, "ai_variation_prompts", text="")
+        elif scene.ai_variation_mode == 'SEEDS':
+            row = variation_box.row()
+            row.prop(scene, "ai_variation_count")
+            row.prop(scene, "ai_variation_seed")
+        row = variation_box.row()
+        row.enabled = operators.has_credentials(scene)
+        row.operator("air.render_variations", text="Render Variations", icon='IMGDISPLAY')
+        session = variations.get_session()
+        if session:
+            # Same layout as the contact sheet; click a tile to put it on the overlay
+            grid = variation_box.grid_flow(row_major=True, columns=session.sheet.columns, even_columns=True, align=True)
+            for variation in session.variations:
+                cell = grid.row()
+                cell.enabled = variation.state == variations.READY
+                icon = {variations.READY: 'CHECKMARK', variations.FAILED: 'ERROR',
+                        variations.CANCELLED: 'CANCEL'}.get(variation.state, 'TIME')
+                cell.operator("air.promote_variation", text=variation.label, icon=icon).index = variation.index
+
+        # Frame Range Batch
+        batch_box = layout.box()
+        batch_box.label(text=f"Frames {scene.frame_start}-{scene.frame_end} (step {scene.frame_step})")
+        batch_box.prop(scene, "ai_batch_output_dir", text="")
+        batch_box.operator("air.render_batch", text="Render Frame Range", icon='RENDER_ANIMATION')
 
         # Status
         layout.label(text=f"Status: {scene.ai_status}")
 
+        # Job Queue
+        queue_box = layout.box()
+        row = queue_box.row()
+        row.label(text="Jobs")
+        row.operator("air.cancel_job", text="Cancel All", icon='CANCEL').job_id = 0
+        queue_box.prop(scene, "ai_submit_mode")
+        row = queue_box.row()
+        row.prop(scene, "ai_worker_count")
+        row.prop(scene, "ai_max_in_flight")
+        row = queue_box.row()
+        row.prop(scene, "ai_retry_attempts")
+        row.prop(scene, "ai_hedge_enabled", text="Hedge")
+        if scene.ai_hedge_enabled:
+            queue_box.prop(scene, "ai_hedge_percentile")
+        row = queue_box.row()
+        row.prop(scene, "ai_rate_limit")
+        row.prop(scene, "ai_key_concurrency")
+        queue_box.prop(scene, "ai_key_pool")
+        for key_stats in ratelimit.stats():
+            paused = f", paused {key_stats['paused']:.0f}s" if key_stats["paused"] else ""
+            queue_box.label(
+                text=f"Key {key_stats['key']}: {key_stats['in_flight']}/{key_stats['limit']} busy, "
+                     f"{key_stats['utilisation']:.0%} used, {key_stats['requests']} sent, "
+                     f"{key_stats['throttled']} throttled{paused}",
+                icon='ERROR' if key_stats["paused"] else 'NONE'
+            )
+        stats = client.attempt_stats()
+        if stats["attempts"]:
+            queue_box.label(text=f"Attempts {stats['attempts']}: {stats['retries']} retried, {stats['failures']} failed, "
+                                 f"{stats['hedges']} hedged ({stats['hedge_wins']} won), {stats['fallbacks']} routed to a fallback")
+        connections = client.session_stats()
+        if connections and connections["requests"]:
+            queue_box.label(text=f"Connections: {connections['reuse_ratio']:.0%} reused over {connections['requests']} requests")
+        for endpoint, state in stats["breakers"].items():
+            if state != "closed":
+                queue_box.label(text=f"Circuit {state}: {endpoint}", icon='ERROR')
+        for job in scheduler.get_scheduler().jobs():
+            row = queue_box.row()
+            camera = f"  {job.camera_name}" if getattr(job, "camera_name", None) else ""
+            progress = f"  ({job.progress})" if getattr(job, "progress", None) else ""
+            eta = job.eta() if not job.finished and hasattr(job, "eta") else None
+            eta = f"  ETA {eta[0]:.0f}s ({eta[1]:.0%})" if eta else ""
+            row.label(text=f"#{job.job_id}{camera}  {job.state.title()}{progress}{eta}")
+            if not job.finished:
+                row.operator("air.cancel_job", text="", icon='X').job_id = job.job_id
+
 def register():
     bpy.utils.register_class(AIR_PT_panel)
 
@@ -1,41 +1,119 @@
 import bpy
 import os
 import tempfile
+import time
+from contextlib import contextmanager
 
 OVERLAY_PLANE_NAME = "AI_Viewport_Overlay"
 OVERLAY_MAT_NAME = "AI_Overlay_Material"
+OVERLAY_IMAGE_NAME = "AI_Overlay_Image"
+OVERLAY_HISTORY_PREFIX = "AI_Overlay_History_"
+
+# Max seconds a timer callback may spend on datablock updates per tick
+MAIN_THREAD_BUDGET = 0.004
+
+class StallMeter:
+    """
+    Records how long main-thread (timer) callbacks block the UI.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.ticks = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    @contextmanager
+    def measure(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.ticks += 1
+            self.total += elapsed
+            self.worst = max(self.worst, elapsed)
+
+    def summary(self):
+        return f"{self.ticks} ticks, total {self.total * 1000:.1f} ms, worst {self.worst * 1000:.1f} ms"
+
+main_thread_stall = StallMeter()
 
 def get_temp_path(filename="ai_render_output.png"):
     return os.path.join(tempfile.gettempdir(), filename)
 
-def get_or_create_overlay_plane(context):
+def overlay_names(camera):
+    """
+    (plane, material, image) datablock names for a camera's overlay. Every
+    camera gets its own set so several results can be shown at once.
+    """
+    suffix = f"@{camera.name}"
+    return OVERLAY_PLANE_NAME + suffix, OVERLAY_MAT_NAME + suffix, OVERLAY_IMAGE_NAME + suffix
+
+def overlay_planes():
+    return [obj for obj in bpy.data.objects if obj.name.startswith(OVERLAY_PLANE_NAME)]
+
+def overlay_materials():
+    return [mat for mat in bpy.data.materials if mat.name.startswith(OVERLAY_MAT_NAME)]
+
+def _migrate_legacy_overlay():
+    # Older versions kept one overlay (plane / material / image without a
+    # camera suffix) parented to the active camera; adopt it for that camera
+    plane = bpy.data.objects.get(OVERLAY_PLANE_NAME)
+    if plane is None or plane.parent is None:
+        return
+    names = overlay_names(plane.parent)
+    if names[0] in bpy.data.objects:
+        return
+    for collection, old, new in zip(
+            (bpy.data.objects, bpy.data.materials, bpy.data.images),
+            (OVERLAY_PLANE_NAME, OVERLAY_MAT_NAME, OVERLAY_IMAGE_NAME), names):
+        block = collection.get(old)
+        if block is not None:
+            block.name = new
+
+def _new_overlay_plane(name, scene):
+    # Built through bpy.data rather than an operator so it doesn't depend on
+    # (or change) the active object; one quad with a 0..1 UV map
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata([(-1, -1, 0), (1, -1, 0), (1, 1, 0), (-1, 1, 0)], [], [(0, 1, 2, 3)])
+    uv_layer = mesh.uv_layers.new()
+    for loop, uv in zip(uv_layer.data, ((0, 0), (1, 0), (1, 1), (0, 1))):
+        loop.uv = uv
+    plane = bpy.data.objects.new(name, mesh)
+    scene.collection.objects.link(plane)
+    return plane
+
+def get_or_create_overlay_plane(context, camera=None):
     scene = context.scene
-    cam = scene.camera
+    cam = camera or scene.camera
     if not cam:
         return None 
         # raising error here might break the thread loop if not caught, better to return None and handle upstream
 
-    if OVERLAY_PLANE_NAME in bpy.data.objects:
-        plane = bpy.data.objects[OVERLAY_PLANE_NAME]
+    _migrate_legacy_overlay()
+    name = overlay_names(cam)[0]
+    if name in bpy.data.objects:
+        plane = bpy.data.objects[name]
         # Ensure it's still parented to camera just in case
         if plane.parent != cam:
              plane.parent = cam
         return plane
 
-    bpy.ops.mesh.primitive_plane_add()
-    plane = context.active_object
-    plane.name = OVERLAY_PLANE_NAME
+    plane = _new_overlay_plane(name, scene)
     plane.parent = cam
     plane.hide_select = True
     plane.hide_render = True
+    plane.hide_viewport = not scene.ai_overlay_enabled
 
-    fit_overlay_to_camera(plane, scene)
+    fit_overlay_to_camera(plane, scene, cam)
     return plane
 
-def fit_overlay_to_camera(plane, scene):
+def fit_overlay_to_camera(plane, scene, camera=None):
     if not plane: return
     
-    cam = scene.camera
+    cam = camera or scene.camera
     if not cam: return
     render = scene.render
 
@@ -97,51 +175,183 @@ def fit_overlay_to_camera(plane, scene):
     else:
         plane.scale = (1, 1 / aspect, 1)
 
-def create_overlay_material(scene, image_path):
-    if OVERLAY_MAT_NAME in bpy.data.materials:
-        mat = bpy.data.materials[OVERLAY_MAT_NAME]
+def _is_job_output(path):
+    # Per-job download targets in the temp dir; cached results are not ours to delete
+    return os.path.basename(path).startswith("ai_render_output_") and \
+        os.path.dirname(os.path.abspath(path)) == os.path.abspath(tempfile.gettempdir())
+
+def _remove_image(img):
+    path = bpy.path.abspath(img.filepath) if img.filepath else ""
+    bpy.data.images.remove(img)
+    if path and _is_job_output(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def overlay_history(image_name=None):
+    """
+    Previous overlay results, newest first; only those retired from
+    image_name (one camera's overlay image) if given.
+    """
+    images = [
+        img for img in bpy.data.images
+        if img.name.startswith(OVERLAY_HISTORY_PREFIX) and (image_name is None or img.get("air_history_owner") == image_name)
+    ]
+    return sorted(images, key=lambda img: img.get("air_history_index", 0), reverse=True)
+
+def _retire_overlay_image(img, history_size):
+    # Keep the current result under a history name; drop the oldest beyond
+    # history_size. Each camera's overlay image keeps a history of its own
+    owner = img.name
+    history = overlay_history(owner)
+    index = max((h.get("air_history_index", 0) for h in history), default=0) + 1
+    img.name = f"{OVERLAY_HISTORY_PREFIX}{index:03d}{owner[len(OVERLAY_IMAGE_NAME):]}"
+    img["air_history_index"] = index
+    img["air_history_owner"] = owner
+    img.use_fake_user = True # Keep it alive while no material uses it
+    for old in overlay_history(owner)[history_size:]:
+        _remove_image(old)
+
+def load_overlay_image(image_path, history_size=0, image_name=OVERLAY_IMAGE_NAME):
+    """
+    Points the overlay image datablock at image_path and reloads it in
+    place instead of adding a new datablock per result. With history_size > 0
+    the previous result is kept under a history name; the oldest beyond
+    history_size are removed.
+    """
+    img = bpy.data.images.get(image_name)
+    if img is not None and history_size > 0:
+        _retire_overlay_image(img, history_size)
+        img = None
+    if img is not None and img.source != 'FILE':
+        # Previously filled from memory (set_overlay_pixels); swap for a file image
+        bpy.data.images.remove(img)
+        img = None
+    if img is None:
+        img = bpy.data.images.load(image_path, check_existing=False)
+        img.name = image_name
+        return img
+
+    previous_path = bpy.path.abspath(img.filepath)
+    img.filepath = image_path
+    img.reload()
+    if previous_path != os.path.abspath(image_path) and _is_job_output(previous_path):
+        try:
+            os.remove(previous_path)
+        except OSError:
+            pass
+    return img
+
+def set_overlay_pixels(pixels, width, height, history_size=0, image_name=OVERLAY_IMAGE_NAME):
+    """
+    Writes a flat, bottom-row-first float32 RGBA buffer into the preallocated
+    overlay image with a single foreach_set call; no file is involved.
+    """
+    img = bpy.data.images.get(image_name)
+    if img is not None and history_size > 0:
+        _retire_overlay_image(img, history_size)
+        img = None
+    if img is not None and img.source != 'GENERATED':
+        _remove_image(img)
+        img = None
+    if img is not None and tuple(img.size) != (width, height):
+        img.scale(width, height)
+    if img is None:
+        img = bpy.data.images.new(image_name, width, height, alpha=True)
+
+    img.pixels.foreach_set(pixels)
+    img.update()
+    return img
+
+def purge_overlay_images(keep_history=True):
+    """
+    Removes orphaned overlay images (including ones piled up by older versions
+    that loaded a new datablock per render) and, optionally, the history.
+    Returns the number of datablocks removed.
+    """
+    removed = 0
+    for img in list(bpy.data.images):
+        is_history = img.name.startswith(OVERLAY_HISTORY_PREFIX)
+        if is_history and not keep_history:
+            img.use_fake_user = False
+        orphan = img.users == 0
+        legacy = os.path.basename(img.filepath).startswith("ai_render_output")
+        if (is_history and not keep_history) or (orphan and legacy):
+            _remove_image(img)
+            removed += 1
+    return removed
+
+def create_overlay_material(scene, image_path=None, history_size=0, pixels=None, size=None, camera=None):
+    """
+    Builds (once) and updates the overlay material of `camera` (default: the
+    scene camera). The result comes either from image_path or, for the
+    in-memory path, from a decoded pixel buffer of the given (width, height).
+    """
+    _, mat_name, image_name = overlay_names(camera or scene.camera)
+    if mat_name in bpy.data.materials:
+        mat = bpy.data.materials[mat_name]
     else:
-        mat = bpy.data.materials.new(OVERLAY_MAT_NAME)
+        mat = bpy.data.materials.new(mat_name)
         mat.use_nodes = True
 
     nodes = mat.node_tree.nodes
     links = mat.node_tree.links
-    nodes.clear()
 
-    tex = nodes.new("ShaderNodeTexImage")
-    emission = nodes.new("ShaderNodeEmission")
-    transparent = nodes.new("ShaderNodeBsdfTransparent")
-    mix = nodes.new("ShaderNodeMixShader")
-    out = nodes.new("ShaderNodeOutputMaterial")
+    tex = nodes.get("OverlayTex")
+    mix = nodes.get("OverlayMix")
+    if tex is None or mix is None:
+        # First use (or a tree from an older version): build the node tree once
+        nodes.clear()
+
+        tex = nodes.new("ShaderNodeTexImage")
+        emission = nodes.new("ShaderNodeEmission")
+        transparent = nodes.new("ShaderNodeBsdfTransparent")
+        mix = nodes.new("ShaderNodeMixShader")
+        out = nodes.new("ShaderNodeOutputMaterial")
+
+        links.new(tex.outputs["Color"], emission.inputs["Color"])
+        links.new(transparent.outputs["BSDF"], mix.inputs[1])
+        links.new(emission.outputs["Emission"], mix.inputs[2])
+        links.new(mix.outputs["Shader"], out.inputs["Surface"])
+
+        tex.name = "OverlayTex"
+        mix.name = "OverlayMix"
 
     try:
-        img = bpy.data.images.load(image_path, check_existing=False) # Reload to force update
-        tex.image = img
+        if pixels is not None:
+            tex.image = set_overlay_pixels(pixels, size[0], size[1], history_size, image_name)
+        else:
+            tex.image = load_overlay_image(image_path, history_size, image_name)
     except Exception as e:
         print(f"Failed to load image: {e}")
         return mat
 
-    links.new(tex.outputs["Color"], emission.inputs["Color"])
-    links.new(transparent.outputs["BSDF"], mix.inputs[1])
-    links.new(emission.outputs["Emission"], mix.inputs[2])
-    links.new(mix.outputs["Shader"], out.inputs["Surface"])
-
     mix.inputs["Fac"].default_value = scene.ai_overlay_opacity
-    mix.name = "OverlayMix"
 
     return mat
 
+def show_overlay_image(img, camera):
+    """
+    Displays an existing image (e.g. a history entry) on a camera's overlay material.
+    """
+    mat = bpy.data.materials.get(overlay_names(camera)[1])
+    if mat is None:
+        return
+    tex = mat.node_tree.nodes.get("OverlayTex") if mat.node_tree else None
+    if tex:
+        tex.image = img
+
 def update_overlay_opacity(scene):
-    if OVERLAY_MAT_NAME in bpy.data.materials:
-        mat = bpy.data.materials[OVERLAY_MAT_NAME]
+    for mat in overlay_materials():
         if mat.node_tree:
             mix = mat.node_tree.nodes.get("OverlayMix")
             if mix:
                 mix.inputs["Fac"].default_value = scene.ai_overlay_opacity
 
 def update_overlay_visibility(scene):
-    if OVERLAY_PLANE_NAME in bpy.data.objects:
-        bpy.data.objects[OVERLAY_PLANE_NAME].hide_viewport = not scene.ai_overlay_enabled
+    for plane in overlay_planes():
+        plane.hide_viewport = not scene.ai_overlay_enabled
 
 def force_viewport_shading(context):
     """
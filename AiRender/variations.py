@@ -0,0 +1,179 @@
+import bpy
+import itertools
+import math
+import os
+import threading
+
+from . import imaging
+
+SHEET_IMAGE_NAME = "AI_Variations"
+
+# Longest side of one contact-sheet tile, and the gap between tiles
+TILE_SIZE = 384
+TILE_GAP = 4
+
+# Empty tiles and gaps
+BACKGROUND = (0.05, 0.05, 0.05, 1.0)
+
+# Variation states shown on the panel
+PENDING = "PENDING"
+READY = "READY"
+FAILED = "FAILED"
+CANCELLED = "CANCELLED"
+
+_session_ids = itertools.count(1)
+
+class Variation:
+    """
+    One prompt / seed combination of a variations run.
+    """
+    def __init__(self, index, label, prompt, seed=None):
+        self.index = index
+        self.label = label
+        self.prompt = prompt
+        self.seed = seed
+        self.state = PENDING
+        self.result_path = None
+        self.job = None
+
+class ContactSheet:
+    """
+    Grid of result thumbnails assembled with NumPy as results arrive. Tiles
+    are placed from worker threads; the main thread only copies the finished
+    buffer into the sheet image.
+    """
+    def __init__(self, count, aspect, tile_size=TILE_SIZE, gap=TILE_GAP):
+        import numpy as np
+
+        self.columns = max(1, math.ceil(math.sqrt(count)))
+        self.rows = max(1, math.ceil(count / self.columns))
+        if aspect >= 1.0:
+            self.tile_w, self.tile_h = tile_size, max(1, round(tile_size / aspect))
+        else:
+            self.tile_w, self.tile_h = max(1, round(tile_size * aspect)), tile_size
+        self.gap = gap
+        self.width = self.columns * self.tile_w + (self.columns + 1) * gap
+        self.height = self.rows * self.tile_h + (self.rows + 1) * gap
+        self.pixels = np.empty((self.height, self.width, 4), dtype=np.float32)
+        self.pixels[:] = BACKGROUND
+        # Bumped on every placed tile so unchanged sheets are not re-uploaded
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def tile_rect(self, index):
+        """
+        (x, y, width, height) of a tile, top-left origin.
+        """
+        row, col = divmod(index, self.columns)
+        x = self.gap + col * (self.tile_w + self.gap)
+        y = self.gap + row * (self.tile_h + self.gap)
+        return x, y, self.tile_w, self.tile_h
+
+    def tile_at(self, u, v):
+        """
+        Tile index under image coordinates (u, v) in 0..1, bottom-left origin
+        as in Blender's image editor; None over gaps or empty cells.
+        """
+        x, y = u * self.width, (1.0 - v) * self.height
+        col = int((x - self.gap) // (self.tile_w + self.gap))
+        row = int((y - self.gap) // (self.tile_h + self.gap))
+        if not (0 <= col < self.columns and 0 <= row < self.rows):
+            return None
+        tx, ty, tw, th = self.tile_rect(row * self.columns + col)
+        if not (tx <= x < tx + tw and ty <= y < ty + th):
+            return None
+        return row * self.columns + col
+
+    def place(self, index, pixels):
+        """
+        Scales an (H, W, 3|4) uint8 result (top row first) to fit its tile,
+        keeping the aspect ratio, and copies it in centred.
+        """
+        x, y, tile_w, tile_h = self.tile_rect(index)
+        height, width = pixels.shape[:2]
+        scale = min(tile_w / width, tile_h / height)
+        fit_w, fit_h = max(1, int(width * scale)), max(1, int(height * scale))
+        thumb = imaging.resize_area(pixels[:, :, :3], fit_w, fit_h) / 255.0
+        x += (tile_w - fit_w) // 2
+        y += (tile_h - fit_h) // 2
+        with self._lock:
+            self.pixels[y:y + fit_h, x:x + fit_w, :3] = thumb
+            self.pixels[y:y + fit_h, x:x + fit_w, 3] = 1.0
+            self.version += 1
+
+    def flat_pixels(self):
+        """
+        Returns (version, flat bottom-row-first buffer) ready for foreach_set.
+        """
+        import numpy as np
+        with self._lock:
+            return self.version, np.ascontiguousarray(self.pixels[::-1]).ravel()
+
+class VariationSession:
+    """
+    One variations run: the variations, their contact sheet and the sheet
+    version last shown in Blender.
+    """
+    def __init__(self, variations, aspect):
+        self.session_id = next(_session_ids)
+        self.variations = variations
+        self.sheet = ContactSheet(len(variations), aspect)
+        self.shown_version = -1
+
+    @property
+    def finished(self):
+        return all(v.state != PENDING for v in self.variations)
+
+    def cancel(self):
+        for variation in self.variations:
+            if variation.job and not variation.job.finished:
+                variation.job.cancel()
+
+    def cleanup(self):
+        for variation in self.variations:
+            if variation.result_path:
+                try:
+                    os.remove(variation.result_path)
+                except OSError:
+                    pass
+                variation.result_path = None
+
+_session = None
+
+def get_session():
+    return _session
+
+def start_session(variations, aspect):
+    """
+    Replaces the current run: unfinished requests of the previous one are
+    cancelled and its result files removed.
+    """
+    global _session
+    if _session is not None:
+        _session.cancel()
+        _session.cleanup()
+    _session = VariationSession(variations, aspect)
+    return _session
+
+def show_sheet(context, session):
+    """
+    Copies the contact sheet into its image datablock if it changed and
+    shows it in any open Image Editor. Main thread only.
+    """
+    version, pixels = session.sheet.flat_pixels()
+    if version == session.shown_version:
+        return
+    img = bpy.data.images.get(SHEET_IMAGE_NAME)
+    size = (session.sheet.width, session.sheet.height)
+    if img is not None and tuple(img.size) != size:
+        img.scale(*size)
+    if img is None:
+        img = bpy.data.images.new(SHEET_IMAGE_NAME, *size, alpha=True)
+    img.pixels.foreach_set(pixels)
+    img.update()
+    session.shown_version = version
+
+    for area in context.screen.areas if context.screen else ():
+        if area.type == 'IMAGE_EDITOR':
+            area.spaces.active.image = img
+            area.tag_redraw()
@@ -0,0 +1,283 @@
+"""
+Client benchmark suite against a local fake Fal.ai server (fake_fal.py).
+Each scenario runs in its own process so peak RSS is per scenario; results
+are compared with a saved JSON baseline and the script exits non-zero on
+a regression.
+
+Every scenario is also run as a reference: the same work done with the
+standard library alone (base64 / json, or the same HTTP request on a plain
+per-thread http.client connection), at the same concurrency in the same
+process. Throughput and median latency are gated as ratios to that
+reference, so the baseline carries over between machines and load levels.
+Absolute numbers and tail latencies (p95 / p99 of a few dozen requests are
+a handful of samples) are only reported.
+
+    python benchmarks/bench_client.py                      # run and compare with baseline.json
+    python benchmarks/bench_client.py --save-baseline      # record a new baseline
+    python benchmarks/bench_client.py --scenarios sync,queue --concurrency 1,8
+    python benchmarks/bench_client.py --scenarios sync --jitter 0.2 --error-rate 0.1 --attempts 3 --hedge-percentile 90
+
+Scenarios: encode (encode_image_to_base64), parse (parse_result), sync
+(send_api_request, text-to-image), edit (send_api_request with a streamed
+init image), queue (QueueClient.submit) and download (download_image).
+"""
+import argparse
+import base64
+import concurrent.futures
+import contextlib
+import http.client
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from common import import_addon
+from fake_fal import FakeFalServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+SCENARIOS = ("encode", "parse", "sync", "edit", "queue", "download")
+
+# Allowed slowdown of a metric's ratio to the reference, against the baseline
+# ratio, before it counts as a regression. The slowdown must also exceed
+# MIN_DELTA seconds so millisecond-scale scenarios don't fail on scheduler
+# noise. On a shared machine the ratios themselves still swing by up to ~1.7x
+# between runs at concurrency 16 (the reference and the addon compete for the
+# GIL differently), so the gate only catches gross regressions such as
+# requests being serialised; tighten --tolerance when comparing runs on a quiet box.
+DEFAULT_TOLERANCE = 1.0
+MIN_DELTA = 0.05
+MIN_RSS_DELTA_MB = 16
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[index]
+
+def make_operation(name, addon, server, capture_path, attempts=1, hedge_percentile=None):
+    """
+    Returns a callable performing one unit of work for the scenario.
+    """
+    client = addon.client
+    resilience = {"retry_policy": client.RetryPolicy(attempts, base_delay=0.05), "hedge_percentile": hedge_percentile}
+    if name == "encode":
+        return lambda i: client.encode_image_to_base64(capture_path)
+    if name == "parse":
+        response = json.dumps(server._result(sync_mode=True)).encode('utf-8')
+        return lambda i: client.parse_result(json.loads(response))
+    if name == "sync":
+        return lambda i: client.send_api_request("key", "bench", width=1024, height=1024, **resilience)
+    if name == "edit":
+        return lambda i: client.send_api_request("key", "bench", image_path=capture_path, width=1024, height=1024, **resilience)
+    if name == "queue":
+        # The bench sets the concurrency itself, not the scheduler's in-flight limit
+        queue_client = addon.async_queue.QueueClient(max_in_flight=64)
+        endpoint = server.queue_endpoint(server.model_endpoint)
+        return lambda i: queue_client.submit("key", "bench", width=1024, height=1024, endpoint=endpoint).result()
+    if name == "download":
+        directory = tempfile.mkdtemp(prefix="bench_client_")
+        url = server.base_url + "/files/result.png"
+        return lambda i: client.download_image(url, os.path.join(directory, f"{i}.png"))
+    raise ValueError(f"Unknown scenario: {name}")
+
+def make_reference(name, server, capture_path):
+    """
+    Returns a callable doing the scenario's work with the standard library
+    only, as the yardstick the addon's timings are divided by.
+    """
+    if name == "encode":
+        return lambda i: _read_and_encode(capture_path)
+    if name == "parse":
+        response = json.dumps(server._result(sync_mode=True)).encode('utf-8')
+        return lambda i: json.loads(response)
+
+    local = threading.local()
+
+    def request(method, url, body=None):
+        parts = urllib.parse.urlsplit(url)
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+        conn.request(method, parts.path, body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Reference request failed: {response.status}")
+        return data
+
+    generate = json.dumps({"prompt": "bench", "image_size": {"width": 1024, "height": 1024}}).encode('utf-8')
+    if name in ("sync", "queue"):
+        return lambda i: request("POST", server.model_endpoint, generate)
+    if name == "edit":
+        def edit(i):
+            image = _read_and_encode(capture_path).decode('ascii')
+            body = json.dumps({"prompt": "bench", "image_urls": [f"data:image/png;base64,{image}"], "sync_mode": True})
+            return request("POST", server.edit_endpoint, body.encode('utf-8'))
+        return edit
+    if name == "download":
+        return lambda i: request("GET", server.base_url + "/files/result.png")
+    raise ValueError(f"Unknown scenario: {name}")
+
+def _read_and_encode(path):
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read())
+
+def _measure(operation, concurrency, requests):
+    """
+    Runs `operation` `requests` times on `concurrency` threads after one
+    warm-up call. Returns throughput, latency percentiles and errors.
+    """
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(Exception):
+        operation(-1) # Warm up: imports, first connection
+    errors = 0
+
+    def timed(i):
+        start = time.perf_counter()
+        operation(i)
+        return time.perf_counter() - start
+
+    # The client logs every request; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(timed, i) for i in range(requests)]:
+                try:
+                    latencies.append(future.result())
+                except Exception:
+                    errors += 1
+        wall = time.perf_counter() - start
+    return {
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "errors": errors,
+    }
+
+def run_scenario(name, concurrency, requests, server_args, capture_mb, attempts=1, hedge_percentile=None):
+    """
+    Runs in a child process. Returns throughput, latency percentiles, errors
+    and peak RSS, with the reference's throughput and percentiles under "reference".
+    """
+    addon = import_addon()
+    # Poll the fake queue quickly; its latency is far below Fal's
+    addon.async_queue.POLL_INITIAL = 0.05
+
+    with FakeFalServer(**server_args) as server:
+        addon.client.MODEL_ENDPOINT = server.model_endpoint
+        addon.client.EDIT_ENDPOINT = server.edit_endpoint
+        capture_path = os.path.join(tempfile.gettempdir(), "bench_client_capture.png")
+        with open(capture_path, "wb") as f:
+            f.write(os.urandom(int(capture_mb * 1024 * 1024)))
+        reference = _measure(make_reference(name, server, capture_path), concurrency, requests)
+        result = _measure(make_operation(name, addon, server, capture_path, attempts, hedge_percentile), concurrency, requests)
+
+    result["reference"] = {k: reference[k] for k in ("throughput", "p50")}
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+def _worse(value, base, tolerance, min_delta):
+    return value > base * (1 + tolerance) and value - base > min_delta
+
+def _seconds_per_request(result, concurrency):
+    return concurrency / result["throughput"] if result["throughput"] else None
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of regression messages; higher-is-better for throughput,
+    lower-is-better for latency and memory. Timings are compared as ratios
+    to the run's own reference: the baseline ratio times this run's
+    reference gives the expected value.
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base or "reference" not in base:
+            continue
+        concurrency = int(key.rsplit("@", 1)[1])
+        # Throughput is compared as time per request so the same noise floor applies
+        timings = (
+            ("throughput", _seconds_per_request(result, concurrency), _seconds_per_request(base, concurrency),
+             _seconds_per_request(result["reference"], concurrency), _seconds_per_request(base["reference"], concurrency)),
+            ("p50", result["p50"], base["p50"], result["reference"]["p50"], base["reference"]["p50"]),
+        )
+        for metric, value, base_value, reference, base_reference in timings:
+            if not (value and base_value and reference and base_reference):
+                continue
+            expected = base_value / base_reference * reference
+            if _worse(value, expected, tolerance, MIN_DELTA):
+                regressions.append(f"{key}: {metric} {value / reference:.2f}x the reference > baseline "
+                                   f"{base_value / base_reference:.2f}x ({value * 1000:.1f} vs {expected * 1000:.1f} ms expected)")
+        if _worse(result["peak_rss_mb"], base["peak_rss_mb"], tolerance, MIN_RSS_DELTA_MB):
+            regressions.append(f"{key}: peak RSS {result['peak_rss_mb']:.0f} MB > baseline {base['peak_rss_mb']:.0f} MB")
+        if result["errors"] and not base["errors"]:
+            regressions.append(f"{key}: {result['errors']} errors, baseline {base['errors']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--image-mb", type=float, default=2.0, help="Result image size")
+    parser.add_argument("--capture-mb", type=float, default=4.0, help="Init image size for encode / edit")
+    parser.add_argument("--attempts", type=int, default=1, help="Tries per sync / edit request")
+    parser.add_argument("--hedge-percentile", type=int, default=None, help="Hedge sync / edit requests slower than this percentile")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    server_args = {
+        "latency": args.latency, "jitter": args.jitter,
+        "error_rate": args.error_rate, "image_bytes": int(args.image_mb * 1024 * 1024),
+    }
+    results = {}
+    print(f"{'scenario':<16}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'RSS MB':>9}{'p50/ref':>9}")
+    for name in args.scenarios.split(","):
+        for concurrency in map(int, args.concurrency.split(",")):
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(
+                    run_scenario, name, concurrency, args.requests, server_args, args.capture_mb,
+                    args.attempts, args.hedge_percentile
+                ).result()
+            key = f"{name}@{concurrency}"
+            results[key] = result
+            ms = lambda v: f"{v * 1000:9.1f}" if v is not None else f"{'-':>9}"
+            reference = result["reference"]["p50"]
+            ratio = f"{result['p50'] / reference:9.2f}" if result["p50"] and reference else f"{'-':>9}"
+            print(f"{key:<16}{result['throughput']:8.1f}{ms(result['p50'])}{ms(result['p95'])}{ms(result['p99'])}"
+                  f"{result['errors']:8d}{result['peak_rss_mb']:9.0f}{ratio}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            settings = {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline")}
+            json.dump({"settings": settings, "results": results}, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline; run with --save-baseline to record one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
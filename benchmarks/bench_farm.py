@@ -0,0 +1,75 @@
+"""
+Runs the headless farm (AiRender/farm.py) end to end against the fake Fal.ai
+server, with plain-Python worker processes using the bpy stub instead of
+Blender. Reports throughput and checks that the farm-wide request limit held
+and that injected failures were retried.
+
+    python benchmarks/bench_farm.py [--items 32] [--workers 4] [--max-in-flight 2] [--error-rate 0.2]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from common import REPO_ROOT
+from fake_fal import FakeFalServer
+
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "AiRender"))
+import farm # Stdlib only; importing it does not pull in bpy
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Worker processes: the real farm worker loop with bpy stubbed out
+WORKER_SHIM = (
+    "import sys; sys.path.insert(0, {bench!r}); "
+    "import common; common.install_bpy_stub(); "
+    "import farm; farm.worker_main()"
+)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-in-flight", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_farm_")
+    with FakeFalServer(latency=args.latency, jitter=args.latency / 4, error_rate=args.error_rate, image_bytes=256 * 1024) as server:
+        manifest = {
+            "output_dir": "out",
+            "defaults": {
+                "prompt": "bench", "capture": "NONE", "resolution": [512, 512],
+                # One client-side attempt so injected errors reach the farm's own retries
+                "retry_attempts": 1,
+                "endpoint": server.model_endpoint, "edit_endpoint": server.edit_endpoint,
+            },
+            "jobs": [{"cameras": ["Camera"], "frames": f"1-{args.items}"}],
+        }
+        manifest_path = os.path.join(work_dir, "manifest.json")
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+        shim = WORKER_SHIM.format(bench=BENCH_DIR)
+        env_path = os.pathsep.join((BENCH_DIR, os.path.join(REPO_ROOT, "AiRender"), REPO_ROOT))
+        os.environ["PYTHONPATH"] = env_path
+        os.environ.setdefault("FAL_KEY", "bench")
+        report = farm.run_farm(
+            manifest_path, [sys.executable, "-c", shim],
+            workers=args.workers, max_in_flight=args.max_in_flight, retries=args.retries
+        )
+
+    retried = sum(1 for r in report["results"] if len(r["attempts"]) > 1)
+    print(f"items retried: {retried}")
+    print(f"peak concurrent generations: farm {report['peak_in_flight']}, server {server.peak_active} "
+          f"(limit {args.max_in_flight})")
+    if server.peak_active > args.max_in_flight:
+        print("FAIL: request limit exceeded")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Measures how long the main thread (Blender's timer callback) is blocked
+when a result arrives, before and after moving the download onto the
+worker. Datablock updates are simulated with a fixed cost per step.
+
+    python benchmarks/bench_main_thread_stall.py [--size-mb 8] [--latency 0.2]
+"""
+import argparse
+import http.server
+import os
+import tempfile
+import threading
+import time
+import types
+from unittest import mock
+
+from common import import_addon
+
+DATABLOCK_STEP_COST = 0.001
+
+def start_image_server(size, latency):
+    payload = os.urandom(size)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def simulated_bpy_step(*args, **kwargs):
+    time.sleep(DATABLOCK_STEP_COST)
+    return mock.MagicMock()
+
+def make_context():
+    scene = types.SimpleNamespace(
+        ai_prompt="bench", ai_enhance_prompt=False, ai_api_key="key", ai_img_strength=0.75,
+        ai_cache_enabled=False, ai_cache_size_mb=16, ai_submit_mode='SYNC', ai_status="",
+        ai_result_in_memory=False, ai_save_results=False, ai_results_dir="", ai_overlay_history=0,
+        ai_retry_attempts=1, ai_hedge_enabled=False, ai_hedge_percentile=95,
+        ai_backend="nano-banana-pro", ai_fallback_enabled=False, ai_fallback_after=30.0,
+        render=types.SimpleNamespace(resolution_x=1920, resolution_y=1080),
+        camera=None,
+    )
+    return types.SimpleNamespace(scene=scene)
+
+def measure_before(client, utils, url):
+    """
+    Pre-change shape: the timer callback downloads, then updates datablocks in one go.
+    """
+    meter = utils.StallMeter()
+    with meter.measure():
+        client.download_image(url, os.path.join(tempfile.gettempdir(), "bench_stall_before.png"))
+        for _ in range(5):
+            simulated_bpy_step()
+    return meter
+
+def measure_after(operators, utils, url, bpy):
+    job = operators.AIRenderJob(make_context())
+    bpy.app.timers.register.reset_mock()
+    job._finish(url) # Worker side: download happens here, off the main thread
+    callback = bpy.app.timers.register.call_args[0][0]
+
+    utils.main_thread_stall.reset()
+    while callback() is not None:
+        pass
+    return utils.main_thread_stall
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    addon = import_addon()
+    import bpy
+    client, utils, operators = addon.client, addon.utils, addon.operators
+    for name in ("get_or_create_overlay_plane", "fit_overlay_to_camera", "create_overlay_material", "force_viewport_shading"):
+        setattr(utils, name, simulated_bpy_step)
+
+    server = start_image_server(int(args.size_mb * 1024 * 1024), args.latency)
+    url = f"http://127.0.0.1:{server.server_port}/result.png"
+
+    before = measure_before(client, utils, url)
+    after = measure_after(operators, utils, url, bpy)
+    print(f"before: {before.summary()}")
+    print(f"after:  {after.summary()}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
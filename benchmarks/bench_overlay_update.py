@@ -0,0 +1,79 @@
+"""
+Time from result bytes to an updated overlay image, comparing the temp-file
+path (write file, bpy.data.images.load) with the in-memory path (NumPy
+decode on the worker, one pixels.foreach_set on the main thread).
+Needs Blender:
+
+    blender -b --factory-startup --python benchmarks/bench_overlay_update.py -- --size 1920x1080
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bpy
+import numpy as np
+
+from AiRender import imaging, utils
+
+def make_result_png(width, height):
+    """
+    Encodes a synthetic result with Blender's own PNG writer, so filters and
+    compression match what real results look like.
+    """
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    rgba[:, :, 0] = (x / width) % 1.0
+    rgba[:, :, 1] = (y / height) % 1.0
+    rgba[:, :, 2] = np.random.default_rng(0).random((height, width), dtype=np.float32) * 0.1
+    img = bpy.data.images.new("bench_src", width, height)
+    img.pixels.foreach_set(rgba.ravel())
+    path = os.path.join(tempfile.gettempdir(), "bench_overlay_src.png")
+    img.filepath_raw = path
+    img.file_format = 'PNG'
+    img.save()
+    bpy.data.images.remove(img)
+    with open(path, "rb") as f:
+        return f.read()
+
+def file_path(data):
+    start = time.perf_counter()
+    path = utils.get_temp_path("ai_render_output_bench.png")
+    with open(path, "wb") as f:
+        f.write(data)
+    img = utils.load_overlay_image(path)
+    img.pixels[0] # Force Blender to decode the file now rather than at first draw
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+def in_memory(data):
+    start = time.perf_counter()
+    rgba = imaging.decode_png(data) # Worker thread in the addon
+    flat = np.ascontiguousarray(rgba[::-1]).ravel()
+    main_start = time.perf_counter()
+    utils.set_overlay_pixels(flat, rgba.shape[1], rgba.shape[0])
+    end = time.perf_counter()
+    return end - start, end - main_start
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    width, height = map(int, args.size.split("x"))
+
+    data = make_result_png(width, height)
+    print(f"result: {width}x{height}, {len(data) / 1e6:.1f} MB PNG")
+    for name, fn in (("file", file_path), ("in-memory", in_memory)):
+        runs = [fn(data) for _ in range(args.repeat)]
+        total = min(r[0] for r in runs)
+        main_thread = min(r[1] for r in runs)
+        print(f"{name:<10} result->overlay {total * 1000:7.1f} ms   main thread {main_thread * 1000:7.1f} ms")
+        bpy.data.images.remove(bpy.data.images[utils.OVERLAY_IMAGE_NAME])
+
+if __name__ == "__main__":
+    main()
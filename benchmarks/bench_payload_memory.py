@@ -0,0 +1,67 @@
+"""
+Compares peak Python heap usage of the in-memory request body
+(encode_image_to_base64 + json.dumps) with the streaming body used by
+send_api_request(image_path=...), at 1080p, 2K and 4K capture sizes.
+
+    python benchmarks/bench_payload_memory.py
+"""
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from common import import_addon, write_fake_capture
+
+RESOLUTIONS = [
+    ("1080p", 1920, 1080),
+    ("2K", 2048, 2048),
+    ("4K", 3840, 2160),
+]
+
+def build_payload(image_url):
+    return {
+        "prompt": "benchmark",
+        "image_size": {"width": 1920, "height": 1080},
+        "num_inference_steps": 30,
+        "image_urls": [image_url],
+        "sync_mode": True,
+    }
+
+def in_memory_body(client, path):
+    image_url = client.encode_image_to_base64(path)
+    data = json.dumps(build_payload(image_url)).encode('utf-8')
+    return len(data)
+
+def streaming_body(client, path):
+    body = client.StreamingImageBody(build_payload(client.IMAGE_PLACEHOLDER), path)
+    sent = 0
+    for chunk in body:
+        sent += len(chunk) # stands in for sock.sendall(chunk)
+    return sent
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+def main():
+    client = import_addon().client
+    print(f"{'res':<6} {'file MB':>8} {'path':<10} {'body MB':>8} {'peak MB':>8} {'time s':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, w, h in RESOLUTIONS:
+            path = os.path.join(tmp, f"capture_{label}.png")
+            file_size = write_fake_capture(path, w, h)
+            results = {}
+            for name, fn in (("in-memory", in_memory_body), ("streaming", streaming_body)):
+                size, peak, elapsed = measure(fn, client, path)
+                results[name] = size
+                print(f"{label:<6} {file_size / 1e6:8.1f} {name:<10} {size / 1e6:8.1f} {peak / 1e6:8.1f} {elapsed:7.3f}")
+            assert results["in-memory"] == results["streaming"], "body sizes differ"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+First-pixel latency of a progressive render against a single full-resolution
+request. The fake server's generation time grows with the requested pixel
+count, so the preview pass comes back well before the full one. Reports when
+each pass reached the overlay. A last run has the full result come from the
+cache, so it wins and the preview is cancelled. Datablock updates are
+simulated with a fixed cost per step, as in bench_main_thread_stall.
+
+    python benchmarks/bench_progressive.py [--width 3840] [--height 2160] [--scale 25] [--latency-per-mpix 0.3]
+"""
+import argparse
+import os
+import tempfile
+import time
+import types
+
+from common import import_addon
+from fake_fal import FakeFalServer
+from bench_main_thread_stall import simulated_bpy_step
+
+def make_context(width, height):
+    scene = types.SimpleNamespace(
+        ai_prompt="bench", ai_enhance_prompt=False, ai_api_key="key", ai_img_strength=0.75,
+        ai_cache_enabled=False, ai_cache_size_mb=16, ai_submit_mode='SYNC', ai_status="",
+        ai_result_in_memory=False, ai_save_results=False, ai_results_dir="", ai_overlay_history=0,
+        ai_retry_attempts=1, ai_hedge_enabled=False, ai_hedge_percentile=95,
+        ai_backend="nano-banana-pro", ai_fallback_enabled=False, ai_fallback_after=30.0,
+        ai_upload_max_mpix=0.0, ai_upload_format='PNG', ai_upload_quality=90, ai_upload_png_compression=1,
+        render=types.SimpleNamespace(resolution_x=width, resolution_y=height),
+        camera=None,
+    )
+    return types.SimpleNamespace(scene=scene)
+
+def run(addon, callbacks, context, pixels, factor=None, cached_path=None):
+    """
+    Submits one render (with a preview pass if factor is given) and plays the
+    main thread until every job has finished. Returns (full job, preview job).
+    """
+    operators, scheduler = addon.operators, addon.scheduler
+    job = operators.AIRenderJob(context, result_path=cached_path)
+    job.init_capture, job.upload_record = operators.prepare_upload(context.scene, addon.capture.Capture(pixels=pixels))
+    preview = None
+    if factor is not None:
+        preview = operators.PreviewJob(context, job, factor, *operators.preview_upload(context.scene, pixels, factor))
+        scheduler.get_scheduler().submit(preview)
+    scheduler.get_scheduler().submit(job)
+
+    running = []
+    while not (job.finished and (preview is None or preview.finished)) or callbacks or running:
+        while callbacks:
+            running.append(callbacks.pop(0))
+        # One timer tick each, as Blender would interleave them
+        running = [callback for callback in running if callback() is not None]
+        time.sleep(0.005)
+    return job, preview
+
+def report(label, job, preview):
+    full = f"{job.first_pixel_seconds:.2f}s" if job.first_pixel_seconds is not None else job.state.lower()
+    line = f"{label}: full {full}"
+    if preview is not None:
+        shown = f"{preview.first_pixel_seconds:.2f}s" if preview.first_pixel_seconds is not None else preview.state.lower()
+        line += f", preview {shown}"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--scale", type=int, default=25, help="Preview resolution, percent of the render")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fixed generation time per request")
+    parser.add_argument("--latency-per-mpix", type=float, default=0.3, help="Extra generation time per megapixel")
+    parser.add_argument("--capture-scale", type=int, default=25, help="Capture (upload) size, percent of the render")
+    args = parser.parse_args()
+
+    addon = import_addon()
+    import bpy
+    import numpy as np
+    utils = addon.utils
+    for name in ("get_or_create_overlay_plane", "fit_overlay_to_camera", "create_overlay_material", "force_viewport_shading"):
+        setattr(utils, name, simulated_bpy_step)
+    for module in (addon.client, addon.operators):
+        module.print = lambda *a, **k: None
+    # Keep the bench's stage times out of the user's job history
+    addon.metrics.get_metrics_path = lambda: os.path.join(tempfile.gettempdir(), "bench_progressive_metrics.sqlite")
+    callbacks = []
+    bpy.app.timers.register = callbacks.append
+    addon.scheduler.get_scheduler(4, 4)
+
+    context = make_context(args.width, args.height)
+    capture_w = args.width * args.capture_scale // 100
+    capture_h = args.height * args.capture_scale // 100
+    pixels = np.random.default_rng(0).integers(0, 256, (capture_h, capture_w, 3), dtype=np.uint8)
+    factor = args.scale / 100
+
+    with FakeFalServer(latency=args.latency, jitter=0.0, image_bytes=256 * 1024,
+                       latency_per_mpix=args.latency_per_mpix) as server:
+        addon.client.MODEL_ENDPOINT = server.model_endpoint
+        addon.client.EDIT_ENDPOINT = server.edit_endpoint
+        print(f"{args.width}x{args.height}, preview at {args.scale}%")
+        single = run(addon, callbacks, context, pixels)
+        report("single pass", *single)
+        progressive = run(addon, callbacks, context, pixels, factor)
+        report("progressive", *progressive)
+
+        cached = os.path.join(tempfile.gettempdir(), "bench_progressive_cached.png")
+        with open(cached, "wb") as f:
+            f.write(server.image)
+        job, preview = run(addon, callbacks, context, pixels, factor, cached_path=cached)
+        report("full result cached", job, preview)
+    addon.scheduler.shutdown()
+    addon.metrics.close_store()
+
+    failed = []
+    if progressive[1].first_pixel_seconds is None or progressive[1].first_pixel_seconds >= single[0].first_pixel_seconds:
+        failed.append("the preview did not reach the overlay before a single pass would have")
+    if progressive[0].first_pixel_seconds is None:
+        failed.append("the full pass did not replace the preview")
+    if preview.state != addon.scheduler.CANCELLED:
+        failed.append("the preview was not cancelled when the full result won")
+    for reason in failed:
+        print(f"FAIL: {reason}")
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
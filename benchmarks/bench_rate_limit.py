@@ -0,0 +1,74 @@
+"""
+Sustained batch load against a fake Fal.ai server that enforces per-key
+quotas (requests per second and concurrent generations per key). Compares
+sending with no client-side limits, with the limiter matched to one key's
+quota, and spread over a pool of keys. Reports throughput, 429s seen by the
+server, failed requests and the limiter's per-key stats.
+
+    python benchmarks/bench_rate_limit.py [--requests 48] [--threads 12] [--keys 3] [--key-rate 4] [--key-concurrency 2]
+"""
+import argparse
+import concurrent.futures
+import time
+
+from common import import_addon
+from fake_fal import FakeFalServer
+
+def run(addon, server, label, keys, rate_per_minute, max_concurrent, requests, threads):
+    client, ratelimit = addon.client, addon.ratelimit
+    ratelimit.reset()
+    ratelimit.configure(rate_per_minute, max_concurrent, keys[1:])
+    server.keys.clear()
+    policy = client.RetryPolicy(attempts=3, base_delay=0.05)
+
+    def one(i):
+        client.send_api_request(keys[0], "bench", width=512, height=512, retry_policy=policy)
+
+    failed = 0
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(one, i) for i in range(requests)]:
+            try:
+                future.result()
+            except Exception:
+                failed += 1
+    elapsed = time.perf_counter() - start
+
+    throttled = sum(state["throttled"] for state in server.keys.values())
+    print(f"{label}: {requests - failed}/{requests} ok in {elapsed:.2f}s "
+          f"({(requests - failed) / elapsed:.1f}/s), server 429s {throttled}")
+    for stats in ratelimit.stats():
+        print(f"    key {stats['key']}: {stats['requests']} sent, {stats['throttled']} throttled, "
+              f"limit {stats['limit']}/{stats['max_concurrent']}, {stats['utilisation']:.0%} used, "
+              f"waited {stats['waited']:.1f}s")
+    return failed, throttled
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--threads", type=int, default=12)
+    parser.add_argument("--keys", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--key-rate", type=float, default=4.0, help="Server quota: requests per second per key")
+    parser.add_argument("--key-concurrency", type=int, default=2, help="Server quota: generations at once per key")
+    args = parser.parse_args()
+
+    addon = import_addon()
+    # Each run prints one line per request; keep the report readable
+    addon.client.print = lambda *a, **k: None
+    keys = [f"bench-key-{i:04d}" for i in range(args.keys)]
+    rate = int(args.key_rate * 60)
+    with FakeFalServer(latency=args.latency, jitter=0.0, image_bytes=1024, key_rate=args.key_rate,
+                       key_burst=args.key_concurrency, key_concurrency=args.key_concurrency) as server:
+        addon.client.MODEL_ENDPOINT = server.model_endpoint
+        # Only the 429 responses themselves limit the unpaced run
+        run(addon, server, "1 key, unpaced", keys[:1], 0, args.threads, args.requests, args.threads)
+        paced = run(addon, server, "1 key, paced", keys[:1], rate, args.key_concurrency, args.requests, args.threads)
+        pooled = run(addon, server, f"{args.keys} keys, paced", keys, rate, args.key_concurrency, args.requests, args.threads)
+
+    if paced[0] or pooled[0]:
+        print("FAIL: requests failed while the limiter matched the quota")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
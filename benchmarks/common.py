@@ -0,0 +1,51 @@
+"""
+Shared helpers for the benchmark scripts. They run with a plain Python
+interpreter, so bpy is replaced by a stub before the addon is imported.
+"""
+import os
+import sys
+import types
+from unittest import mock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def install_bpy_stub():
+    """
+    Registers a minimal stand-in for the bpy module so AiRender can be
+    imported outside Blender.
+    """
+    if "bpy" in sys.modules:
+        return sys.modules["bpy"]
+
+    bpy = mock.MagicMock(name="bpy")
+    bpy.types = types.SimpleNamespace(
+        Operator=type("Operator", (), {}),
+        Panel=type("Panel", (), {}),
+        PropertyGroup=type("PropertyGroup", (), {}),
+        UIList=type("UIList", (), {}),
+        Scene=type("Scene", (), {}),
+        Image=type("Image", (), {}),
+    )
+    sys.modules["bpy"] = bpy
+    return bpy
+
+def import_addon():
+    install_bpy_stub()
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import AiRender
+    return AiRender
+
+def write_fake_capture(path, width, height, compression=0.5):
+    """
+    Writes a file the size of a PNG capture at the given resolution.
+    The bytes are random, which is all the encoder cares about.
+    """
+    size = int(width * height * 4 * compression)
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining:
+            n = min(remaining, 1 << 20)
+            f.write(os.urandom(n))
+            remaining -= n
+    return size
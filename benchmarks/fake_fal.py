@@ -0,0 +1,228 @@
+"""
+Local stand-in for the Fal.ai endpoints the addon talks to, for benchmarks.
+
+    POST /google/nano-banana-pro        sync text-to-image -> {"images": [{"url": ...}]}
+    POST /fal-ai/nano-banana/edit       sync edit; sync_mode results come back as a data URI
+    POST /queue/<model path>            queue submit -> status / response / cancel URLs
+    GET  /queue/requests/<id>/status    IN_QUEUE / IN_PROGRESS until the latency has passed
+    GET  /queue/requests/<id>           the result, as for the sync endpoints
+    PUT  /queue/requests/<id>/cancel
+    GET  /files/result.png              the result image
+
+Latency, jitter, error rate and result size are set per server. Errors are
+HTTP 500 responses; latency is applied to generation, not to file downloads.
+latency_per_mpix adds that many seconds per megapixel of the requested
+image_size, so small requests come back sooner than large ones.
+
+Optional per-key quotas (keyed on the Authorization header) answer generation
+requests over the limit with 429 and a Retry-After header: key_rate caps
+requests per second (token bucket, burst key_burst), key_concurrency the
+generations running at once.
+"""
+import base64
+import http.server
+import itertools
+import json
+import os
+import random
+import socket
+import threading
+import time
+
+MODEL_PATH = "/google/nano-banana-pro"
+EDIT_PATH = "/fal-ai/nano-banana/edit"
+QUEUE_PREFIX = "/queue"
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default backlog of 5 drops SYNs at high concurrency (1 s retransmit stalls)
+    request_queue_size = 128
+
+class FakeFalServer:
+    def __init__(self, latency=0.2, jitter=0.05, error_rate=0.0, image_bytes=2 * 1024 * 1024, seed=0,
+                 key_rate=None, key_burst=1, key_concurrency=None, retry_after=1, latency_per_mpix=0.0):
+        self.latency = latency
+        self.latency_per_mpix = latency_per_mpix
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.image = os.urandom(image_bytes)
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._queued = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        # Generation requests being processed right now, and the most seen at once
+        self.active = 0
+        self.peak_active = 0
+        self.key_rate = key_rate
+        self.key_burst = key_burst
+        self.key_concurrency = key_concurrency
+        self.retry_after = retry_after
+        # Per key: accepted generations, 429s, running now, token bucket (tokens, updated)
+        self.keys = {}
+
+        self._server = _Server(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def model_endpoint(self):
+        return self.base_url + MODEL_PATH
+
+    @property
+    def edit_endpoint(self):
+        return self.base_url + EDIT_PATH
+
+    def queue_endpoint(self, endpoint):
+        return self.base_url + QUEUE_PREFIX + endpoint[len(self.base_url):]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _delay(self, payload):
+        size = payload.get("image_size") or {}
+        megapixels = size.get("width", 0) * size.get("height", 0) / 1e6 if isinstance(size, dict) else 0.0
+        with self._lock:
+            return max(0.0, self._random.gauss(self.latency, self.jitter)) + self.latency_per_mpix * megapixels
+
+    def _admit(self, key):
+        """
+        Takes a quota slot for the key; False if it is over its limits.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self.keys.setdefault(key, {"accepted": 0, "throttled": 0, "active": 0,
+                                               "tokens": float(self.key_burst), "updated": now})
+            if self.key_rate is not None:
+                state["tokens"] = min(self.key_burst, state["tokens"] + (now - state["updated"]) * self.key_rate)
+                state["updated"] = now
+            over_rate = self.key_rate is not None and state["tokens"] < 1.0
+            over_concurrency = self.key_concurrency is not None and state["active"] >= self.key_concurrency
+            if over_rate or over_concurrency:
+                state["throttled"] += 1
+                return False
+            if self.key_rate is not None:
+                state["tokens"] -= 1.0
+            state["accepted"] += 1
+            state["active"] += 1
+            return True
+
+    def _leave(self, key):
+        with self._lock:
+            self.keys[key]["active"] -= 1
+
+    def _fails(self):
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def _result(self, sync_mode):
+        if sync_mode:
+            url = "data:image/png;base64," + base64.b64encode(self.image).decode('ascii')
+        else:
+            url = self.base_url + "/files/result.png"
+        return {"images": [{"url": url, "content_type": "image/png"}]}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; don't let Nagle hold the body back
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json", headers=None):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_json(self):
+                length = int(self.headers.get("Content-Length", 0))
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_POST(self):
+                with server._lock:
+                    server.requests += 1
+                payload = self._read_json()
+                if server._fails():
+                    return self._send(500, {"detail": "Injected error"})
+
+                if self.path.startswith(QUEUE_PREFIX + "/"):
+                    request_id = str(next(server._ids))
+                    ready_at = time.monotonic() + server._delay(payload)
+                    with server._lock:
+                        server._queued[request_id] = (ready_at, payload.get("sync_mode", False))
+                    base = f"{server.base_url}{QUEUE_PREFIX}/requests/{request_id}"
+                    return self._send(200, {
+                        "request_id": request_id,
+                        "status_url": base + "/status",
+                        "response_url": base,
+                        "cancel_url": base + "/cancel",
+                    })
+
+                if self.path not in (MODEL_PATH, EDIT_PATH):
+                    return self._send(404, {"detail": "Unknown model"})
+                key = self.headers.get("Authorization", "")
+                if not server._admit(key):
+                    return self._send(429, {"detail": "Rate limit exceeded"},
+                                      headers={"Retry-After": str(server.retry_after)})
+                with server._lock:
+                    server.active += 1
+                    server.peak_active = max(server.peak_active, server.active)
+                try:
+                    time.sleep(server._delay(payload))
+                finally:
+                    with server._lock:
+                        server.active -= 1
+                    server._leave(key)
+                self._send(200, server._result(payload.get("sync_mode", False)))
+
+            def do_GET(self):
+                if self.path.startswith("/files/"):
+                    return self._send(200, server.image, "image/png")
+
+                parts = self.path.split("/")
+                if self.path.startswith(QUEUE_PREFIX + "/requests/") and len(parts) >= 4:
+                    with server._lock:
+                        entry = server._queued.get(parts[3])
+                    if entry is None:
+                        return self._send(404, {"detail": "Unknown request"})
+                    ready_at, sync_mode = entry
+                    if self.path.endswith("/status"):
+                        status = "COMPLETED" if time.monotonic() >= ready_at else "IN_PROGRESS"
+                        return self._send(200, {"status": status})
+                    return self._send(200, server._result(sync_mode))
+                self._send(404, {"detail": "Not found"})
+
+            def do_PUT(self):
+                parts = self.path.split("/")
+                with server._lock:
+                    server._queued.pop(parts[3] if len(parts) > 3 else "", None)
+                self._send(202, {"status": "CANCELLATION_REQUESTED"})
+
+        return Handler
@@ -2,5 +2,7 @@
 # Launches Blender and loads the AiRender addon package
 # We use --python-expr to append the current directory to path and import the module
 
+# Set BLENDER to use a different Blender executable
 CURRENT_DIR=$(pwd)
-/Applications/Blender.app/Contents/MacOS/Blender --python-expr "import sys; sys.path.append('$CURRENT_DIR'); import bpy; bpy.ops.preferences.addon_enable(module='AiRender')"
+BLENDER="${BLENDER:-/Applications/Blender.app/Contents/MacOS/Blender}"
+"$BLENDER" --python-expr "import sys; sys.path.append('$CURRENT_DIR'); import bpy; bpy.ops.preferences.addon_enable(module='AiRender')"
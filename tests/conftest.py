@@ -0,0 +1,36 @@
+"""
+The addon is imported with bpy stubbed out (see benchmarks/common.py), so
+the tests run under a plain Python interpreter. pytest.ini puts the repo
+root on sys.path.
+"""
+import types
+
+import pytest
+
+from benchmarks.common import import_addon
+
+@pytest.fixture(scope="session")
+def addon():
+    return import_addon()
+
+def _make_context(**scene_overrides):
+    scene = types.SimpleNamespace(
+        ai_prompt="test", ai_enhance_prompt=False, ai_api_key="key", ai_img_strength=0.75,
+        ai_cache_enabled=False, ai_cache_size_mb=16, ai_submit_mode='SYNC', ai_status="",
+        ai_result_in_memory=False, ai_save_results=False, ai_results_dir="", ai_overlay_history=0,
+        ai_retry_attempts=1, ai_hedge_enabled=False, ai_hedge_percentile=95,
+        ai_backend="nano-banana-pro", ai_fallback_enabled=False, ai_fallback_after=30.0,
+        render=types.SimpleNamespace(resolution_x=1920, resolution_y=1080),
+        camera=None,
+    )
+    for name, value in scene_overrides.items():
+        setattr(scene, name, value)
+    return types.SimpleNamespace(scene=scene)
+
+@pytest.fixture
+def make_context():
+    """
+    Builds a stand-in for bpy.context with the scene settings a render job
+    reads; keyword arguments override scene settings.
+    """
+    return _make_context
@@ -0,0 +1,33 @@
+import os
+
+def test_least_recently_used_entries_are_evicted_first(addon, tmp_path):
+    cache = addon.cache.ResultCache(str(tmp_path), max_bytes=300)
+    for i, key in enumerate(("a", "b", "c")):
+        os.utime(cache.put_bytes(key, b"x" * 100), (1000 + i, 1000 + i))
+    assert cache.size_bytes() == 300
+
+    # Reading "a" makes "b" the oldest
+    assert cache.get("a") is not None
+    cache.put_bytes("d", b"x" * 100)
+    assert cache.get("b") is None
+    assert all(cache.get(key) for key in ("a", "c", "d"))
+    assert cache.size_bytes() == 300
+    assert cache.stats() == {"hits": 4, "misses": 1}
+
+def test_entry_larger_than_the_cap_is_not_kept(addon, tmp_path):
+    cache = addon.cache.ResultCache(str(tmp_path), max_bytes=100)
+    cache.put_bytes("small", b"x" * 50)
+    cache.put_bytes("large", b"x" * 200)
+    assert cache.size_bytes() <= 100
+    assert cache.get("large") is None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+def test_key_covers_the_capture_and_settings(addon, tmp_path):
+    make_key = addon.cache.make_key
+    capture = tmp_path / "capture.png"
+    capture.write_bytes(b"pixels")
+    key = make_key("http://endpoint", "prompt", str(capture), 0.75, 1024, 768)
+    assert key == make_key("http://endpoint", "prompt", b"pixels", 0.75, 1024, 768)
+    assert key != make_key("http://endpoint", "prompt", b"other", 0.75, 1024, 768)
+    assert key != make_key("http://endpoint", "prompt", b"pixels", 0.5, 1024, 768)
+    assert key != make_key("http://endpoint", "prompt", b"pixels", 0.75, 1024, 768, seed=1)
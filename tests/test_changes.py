@@ -0,0 +1,73 @@
+import types
+
+import pytest
+
+@pytest.fixture
+def np():
+    return pytest.importorskip("numpy")
+
+def noisy(np, base, amount, seed):
+    noise = np.random.default_rng(seed).integers(-amount, amount + 1, base.shape)
+    return (base.astype(np.int16) + noise).clip(0, 255).astype(np.uint8)
+
+def test_hash_ignores_render_noise_but_not_edits(addon, np):
+    changes = addon.changes
+    base = np.full((540, 960, 4), 128, dtype=np.uint8)
+    base[:, :480] = 60
+    reference = changes.perceptual_hash(base)
+    assert len(reference) == changes.HASH_SIZE * changes.HASH_SIZE * 3
+
+    # Per-pixel noise averages out over each cell
+    assert changes.hash_distance(reference, changes.perceptual_hash(noisy(np, base, 20, 1))) <= 2
+
+    # A small object moved into view changes its cells
+    edited = base.copy()
+    edited[200:260, 600:660, :3] = 250
+    assert changes.hash_distance(reference, changes.perceptual_hash(edited)) > 32
+
+def test_hashes_of_different_sizes_never_match(addon):
+    assert addon.changes.hash_distance(b"\x00" * 12, b"\x00" * 6) == 255
+
+def test_similar_respects_tolerance_settings_and_camera(addon, np):
+    changes = addon.changes
+    detector = changes.ChangeDetector()
+    base = np.full((64, 64, 3), 100, dtype=np.uint8)
+    last = changes.perceptual_hash(base)
+    brighter = changes.perceptual_hash(base + 5)
+    detector.remember("CamA", "settings", "scene", last)
+
+    assert detector.similar("CamA", "settings", last, 0)
+    assert not detector.similar("CamA", "settings", brighter, 4)
+    assert detector.similar("CamA", "settings", brighter, 5)
+    assert not detector.similar("CamA", "other settings", last, 64)
+    assert not detector.similar("CamB", "settings", last, 64)
+    assert not detector.similar("CamA", "settings", None, 64)
+
+def test_unchanged_needs_both_fingerprints(addon):
+    detector = addon.changes.ChangeDetector()
+    assert not detector.unchanged("CamA", "settings", "scene")
+    detector.remember("CamA", "settings", "scene", None)
+    assert detector.unchanged("CamA", "settings", "scene")
+    assert not detector.unchanged("CamA", "settings", "moved")
+    assert not detector.unchanged("CamA", "new prompt", "scene")
+
+def test_only_visible_scene_edits_bump_the_revision(addon, monkeypatch):
+    changes = addon.changes
+    Object = type("Object", (), {})
+    monkeypatch.setattr(changes.bpy.types, "Object", Object, raising=False)
+
+    def update(id_data, transform=False):
+        return types.SimpleNamespace(id=types.SimpleNamespace(original=id_data), is_updated_transform=transform,
+                                     is_updated_geometry=False, is_updated_shading=False)
+
+    def obj(name):
+        instance = Object()
+        instance.name = name
+        return instance
+
+    detector = changes.ChangeDetector()
+    detector.note_updates([update(obj(changes.utils.OVERLAY_PLANE_NAME), transform=True)])
+    detector.note_updates([update(obj("Cube"))]) # Selected, not moved
+    assert detector.revision == 0
+    detector.note_updates([update(obj("Cube"), transform=True)])
+    assert detector.revision == 1
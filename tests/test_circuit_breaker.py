@@ -0,0 +1,54 @@
+import itertools
+
+import pytest
+
+_endpoints = itertools.count()
+
+@pytest.fixture
+def half_open(addon):
+    """
+    An endpoint whose circuit has opened and is ready for its trial request.
+    """
+    client = addon.client
+    endpoint = f"http://breaker-test/{next(_endpoints)}"
+    breaker = client.get_breaker(endpoint)
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.reset_seconds
+    assert breaker.state == "half-open"
+    return endpoint, breaker
+
+def fail_with(error):
+    def call(hedged, abort):
+        raise error
+    return call
+
+@pytest.mark.parametrize("make_error", [
+    lambda client: client.RequestAborted("Request aborted"),
+    lambda client: ValueError("Malformed JSON"),
+])
+def test_trial_without_a_verdict_lets_the_next_request_try(addon, half_open, make_error):
+    client = addon.client
+    endpoint, breaker = half_open
+    with pytest.raises(Exception):
+        client._attempt(endpoint, fail_with(make_error(client)), 0, False)
+    assert breaker.state == "half-open"
+    assert client._attempt(endpoint, lambda hedged, abort: "ok", 0, False) == "ok"
+    assert breaker.state == "closed"
+
+@pytest.mark.parametrize("status", [400, 422, 429])
+def test_trial_answered_by_the_server_closes_the_circuit(addon, half_open, status):
+    client = addon.client
+    endpoint, breaker = half_open
+    with pytest.raises(client.APIError):
+        client._attempt(endpoint, fail_with(client.APIError("Fal.ai Error", status)), 0, False)
+    assert breaker.state == "closed"
+
+def test_failed_trial_reopens_the_circuit(addon, half_open):
+    client = addon.client
+    endpoint, breaker = half_open
+    with pytest.raises(client.APIError):
+        client._attempt(endpoint, fail_with(client.APIError("Fal.ai Error", 503)), 0, False)
+    assert breaker.state == "open"
+    with pytest.raises(client.CircuitOpenError):
+        client._attempt(endpoint, lambda hedged, abort: "ok", 0, False)
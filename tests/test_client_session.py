@@ -0,0 +1,154 @@
+"""
+ClientSession against a local keep-alive HTTP(S) server: connection reuse,
+recovery from idle connections the server closed, TLS pooling, and no cap
+on requests running at once.
+"""
+import http.server
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+import time
+
+import pytest
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 drops connections when many open at once
+    request_queue_size = 64
+
+class KeepAliveServer:
+    """
+    HTTP/1.1 server answering every GET with `body` after `delay` seconds.
+    Records the client address of each request and the peak number of
+    requests handled at once.
+    """
+    def __init__(self, delay=0.0, body=b"ok", ssl_context=None):
+        self.delay = delay
+        self.body = body
+        self.peers = []
+        self.sockets = []
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.sockets.append(self.connection)
+
+            def do_GET(self):
+                with server._lock:
+                    server.peers.append(self.client_address)
+                    server.active += 1
+                    server.peak_active = max(server.peak_active, server.active)
+                try:
+                    time.sleep(server.delay)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        if ssl_context is not None:
+            self._server.socket = ssl_context.wrap_socket(self._server.socket, server_side=True)
+        self.scheme = "https" if ssl_context is not None else "http"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"{self.scheme}://localhost:{self._server.server_port}/result.png"
+
+    def drop_connections(self):
+        """
+        Closes every connection from the server side, as an idle timeout would.
+        """
+        with self._lock:
+            sockets, self.sockets = self.sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+@pytest.fixture
+def server():
+    server = KeepAliveServer()
+    yield server
+    server.close()
+
+@pytest.fixture
+def session(addon):
+    session = addon.client.ClientSession()
+    yield session
+    session.close()
+
+def test_sequential_requests_reuse_one_connection(server, session):
+    for _ in range(5):
+        assert session.request("GET", server.url).body == b"ok"
+    stats = session.stats()
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 4
+    assert len(set(server.peers)) == 1
+
+def test_idle_connection_closed_by_server_is_replaced(server, session):
+    session.request("GET", server.url)
+    server.drop_connections()
+    time.sleep(0.05)
+    assert session.request("GET", server.url).body == b"ok"
+    assert session.stats()["new_connections"] == 2
+    assert len(set(server.peers)) == 2
+
+def test_concurrent_requests_are_not_capped_per_host(addon, session):
+    server = KeepAliveServer(delay=0.3)
+    try:
+        threads = [threading.Thread(target=session.request, args=("GET", server.url)) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.close()
+    assert server.peak_active == 12
+
+@pytest.fixture
+def tls_files(tmp_path):
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl is needed to make a self-signed certificate")
+    cert, key = tmp_path / "cert.pem", tmp_path / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost", "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True
+    )
+    return str(cert), str(key)
+
+def test_tls_connections_are_pooled(addon, tls_files):
+    cert, key = tls_files
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(cert, key)
+    server = KeepAliveServer(ssl_context=server_context)
+    session = addon.client.ClientSession(ssl_context=ssl.create_default_context(cafile=cert))
+    try:
+        for _ in range(3):
+            assert session.request("GET", server.url).body == b"ok"
+    finally:
+        session.close()
+        server.close()
+    assert session.stats()["new_connections"] == 1
+    assert len(set(server.peers)) == 1
@@ -0,0 +1,44 @@
+import http.server
+import threading
+
+class FlakyImageServer:
+    """
+    Serves `body`, answering the first `failures` GETs with 503.
+    """
+    def __init__(self, failures, body=b"image-bytes"):
+        self.failures = failures
+        self.requests = 0
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                status, data = (503, b"busy") if server.requests <= server.failures else (200, body)
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_port}/result.png"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def test_download_image_retries_server_errors(addon, tmp_path):
+    client = addon.client
+    server = FlakyImageServer(failures=2)
+    path = tmp_path / "result.png"
+    try:
+        client.download_image(server.url, str(path), session=client.ClientSession())
+    finally:
+        server.close()
+    assert server.requests == 3
+    assert path.read_bytes() == b"image-bytes"
@@ -0,0 +1,52 @@
+import contextlib
+import importlib
+import sys
+import threading
+
+import pytest
+
+@pytest.fixture
+def farm(addon):
+    return importlib.import_module("AiRender.farm")
+
+def make_items(farm, count):
+    manifest = {"defaults": {"capture": "NONE"}, "jobs": [{"frames": f"1-{count}"}]}
+    items, _ = farm.expand_manifest(manifest, "/tmp")
+    return items
+
+def run_with_timeout(coordinator, timeout=20):
+    runner = threading.Thread(target=coordinator.run, daemon=True)
+    runner.start()
+    runner.join(timeout)
+    assert not runner.is_alive(), "the coordinator hung"
+    return coordinator.results
+
+def test_malformed_protocol_line_fails_the_item(farm):
+    worker = "import sys; sys.stdin.readline(); print('@@AIR_FARM {\"type\": \"res', flush=True); sys.stdin.readline()"
+    coordinator = farm.FarmCoordinator(make_items(farm, 3), [sys.executable, "-c", worker], workers=2, retries=1)
+    results = run_with_timeout(coordinator)
+    assert len(results) == 3
+    assert not any(outcome["ok"] for outcome in results.values())
+
+def test_worker_that_cannot_start_fails_its_items(farm, tmp_path):
+    coordinator = farm.FarmCoordinator(make_items(farm, 3), [str(tmp_path / "no-blender")], workers=2, retries=1)
+    results = run_with_timeout(coordinator)
+    assert len(results) == 3
+    assert all("Worker failed" in outcome["error"] for outcome in results.values())
+    assert all(len(attempts) == 2 for attempts in coordinator.attempts.values())
+
+def test_endpoint_overrides_only_apply_to_their_item(farm, addon, monkeypatch):
+    client = addon.client
+    defaults = client.MODEL_ENDPOINT, client.EDIT_ENDPOINT
+    seen = []
+
+    def send_api_request(*args, **kwargs):
+        seen.append(client.MODEL_ENDPOINT)
+        raise RuntimeError("stop here")
+
+    monkeypatch.setattr(farm, "_RequestSlot", contextlib.nullcontext)
+    monkeypatch.setattr(client, "send_api_request", send_api_request)
+    item = dict(make_items(farm, 1)[0], endpoint="http://127.0.0.1:1/model", edit_endpoint="http://127.0.0.1:1/edit")
+    assert not farm.run_item(item, "key")["ok"]
+    assert seen == ["http://127.0.0.1:1/model"]
+    assert (client.MODEL_ENDPOINT, client.EDIT_ENDPOINT) == defaults
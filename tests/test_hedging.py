@@ -0,0 +1,77 @@
+import concurrent.futures
+import itertools
+import threading
+import time
+
+_endpoints = itertools.count()
+
+def hedged_endpoint(client, latency):
+    """
+    An endpoint whose recent attempts all took `latency` seconds.
+    """
+    endpoint = f"http://hedge-test/{next(_endpoints)}"
+    tracker = client.get_latency_tracker(endpoint)
+    for _ in range(client.HEDGE_MIN_SAMPLES):
+        tracker.add(latency)
+    return endpoint
+
+def sleeping_call(primary_seconds, hedge_seconds, aborted):
+    """
+    A call that takes the given time per attempt kind, or until its Abort
+    fires; records which attempts were aborted.
+    """
+    def call(hedged, abort):
+        deadline = time.monotonic() + (hedge_seconds if hedged else primary_seconds)
+        while time.monotonic() < deadline:
+            if abort.aborted:
+                aborted.append(hedged)
+                abort.check()
+            time.sleep(0.005)
+        return "hedge" if hedged else "primary"
+    return call
+
+def test_concurrent_attempts_run_in_parallel_without_hedging(addon):
+    client = addon.client
+    endpoint = hedged_endpoint(client, 0.5)
+    hedges = client.attempt_stats()["hedges"]
+    call = sleeping_call(0.3, 0.3, [])
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(32) as pool:
+        results = list(pool.map(lambda _: client.call_with_retries(endpoint, call, hedge_percentile=95), range(32)))
+    assert time.monotonic() - start < 0.45
+    assert results == ["primary"] * 32
+    assert client.attempt_stats()["hedges"] == hedges
+
+def test_hedge_win_aborts_the_primary(addon):
+    client = addon.client
+    endpoint = hedged_endpoint(client, 0.05)
+    aborted = []
+    assert client.call_with_retries(endpoint, sleeping_call(5.0, 0.05, aborted), hedge_percentile=95) == "hedge"
+    assert aborted == [False]
+
+def test_primary_win_aborts_the_hedge(addon):
+    client = addon.client
+    endpoint = hedged_endpoint(client, 0.05)
+    aborted = []
+    assert client.call_with_retries(endpoint, sleeping_call(0.2, 5.0, aborted), hedge_percentile=95) == "primary"
+    deadline = time.monotonic() + 1.0
+    while not aborted and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert aborted == [True]
+
+def test_aborting_the_request_aborts_both_attempts(addon):
+    client = addon.client
+    endpoint = hedged_endpoint(client, 0.05)
+    abort = client.Abort()
+    aborted = []
+    threading.Timer(0.3, abort.abort).start()
+    try:
+        client.call_with_retries(endpoint, sleeping_call(5.0, 5.0, aborted), hedge_percentile=95, abort=abort)
+    except client.RequestAborted:
+        pass
+    else:
+        raise AssertionError("the request was not aborted")
+    deadline = time.monotonic() + 1.0
+    while len(aborted) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(aborted) == [False, True]
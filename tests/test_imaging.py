@@ -0,0 +1,92 @@
+import struct
+import zlib
+
+import pytest
+
+@pytest.fixture
+def np():
+    return pytest.importorskip("numpy")
+
+def paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+def filter_rows(samples, filter_types, bpp):
+    """
+    Straightforward per-byte PNG filtering of an (H, W * bpp) uint8 array.
+    """
+    rows = []
+    prev = [0] * samples.shape[1]
+    for row, ft in zip(samples.tolist(), filter_types):
+        out = []
+        for i, x in enumerate(row):
+            a = row[i - bpp] if i >= bpp else 0
+            b = prev[i]
+            c = prev[i - bpp] if i >= bpp else 0
+            pred = (0, a, b, (a + b) // 2, paeth(a, b, c))[ft]
+            out.append((x - pred) & 0xFF)
+        rows.append(bytes([ft] + out))
+        prev = row
+    return b"".join(rows)
+
+def make_png(imaging, samples, color_type, depth, filter_types, bpp, extra=(), interlace=0):
+    """
+    PNG of (H, W * bpp) samples, filtered per row and split over two IDAT chunks.
+    """
+    height = samples.shape[0]
+    width = samples.shape[1] * 8 // (depth * imaging._PNG_CHANNELS[color_type])
+    header = struct.pack(">IIBBBBB", width, height, depth, color_type, 0, 0, interlace)
+    body = zlib.compress(filter_rows(samples, filter_types, bpp))
+    return b"".join([imaging.PNG_SIGNATURE, imaging._png_chunk(b"IHDR", header)]
+                    + [imaging._png_chunk(tag, data) for tag, data in extra]
+                    + [imaging._png_chunk(b"IDAT", body[:10]), imaging._png_chunk(b"IDAT", body[10:]),
+                       imaging._png_chunk(b"IEND", b"")])
+
+def test_round_trip_of_encode_png(addon, np):
+    imaging = addon.imaging
+    rng = np.random.default_rng(0)
+    for channels in (3, 4):
+        pixels = rng.integers(0, 256, (5, 7, channels), dtype=np.uint8)
+        decoded = imaging.decode_png(imaging.encode_png(pixels))
+        assert decoded.shape == (5, 7, 4)
+        assert np.array_equal(imaging.float_to_uint8(decoded[:, :, :channels]), pixels)
+        if channels == 3:
+            assert np.all(decoded[:, :, 3] == 1.0)
+
+@pytest.mark.parametrize("filter_types", [[1] * 6, [2] * 6, [3] * 6, [4] * 6, [0, 1, 2, 3, 4, 4]])
+def test_every_scanline_filter_is_undone(addon, np, filter_types):
+    imaging = addon.imaging
+    pixels = np.random.default_rng(1).integers(0, 256, (6, 9, 4), dtype=np.uint8)
+    data = make_png(imaging, pixels.reshape(6, 36), 6, 8, filter_types, 4)
+    assert np.array_equal(imaging.float_to_uint8(imaging.decode_png(data)), pixels)
+
+def test_sixteen_bit_grey_with_alpha(addon, np):
+    imaging = addon.imaging
+    values = np.random.default_rng(2).integers(0, 65536, (4, 5, 2), dtype=np.uint16)
+    data = make_png(imaging, values.astype(">u2").view(np.uint8).reshape(4, 20), 4, 16, [4, 3, 2, 1], 4)
+    decoded = imaging.decode_png(data)
+    grey, alpha = values[:, :, 0] / 65535.0, values[:, :, 1] / 65535.0
+    for channel in range(3):
+        assert np.allclose(decoded[:, :, channel], grey, atol=1e-6)
+    assert np.allclose(decoded[:, :, 3], alpha, atol=1e-6)
+
+def test_palette_with_transparency(addon, np):
+    imaging = addon.imaging
+    palette = bytes([255, 0, 0, 0, 255, 0, 0, 0, 255])
+    index = np.array([[0, 1, 2], [2, 1, 0]], dtype=np.uint8)
+    data = make_png(imaging, index, 3, 8, [0, 2], 1, extra=[(b"PLTE", palette), (b"tRNS", bytes([0]))])
+    decoded = imaging.decode_png(data)
+    assert decoded[0, 0].tolist() == [1.0, 0.0, 0.0, 0.0] # First entry is transparent
+    assert decoded[0, 2].tolist() == [0.0, 0.0, 1.0, 1.0]
+    assert decoded[1, 1].tolist() == [0.0, 1.0, 0.0, 1.0]
+
+def test_unsupported_layouts_raise_value_error(addon, np):
+    imaging = addon.imaging
+    pixels = np.zeros((2, 6), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        imaging.decode_png(make_png(imaging, pixels, 2, 8, [0, 0], 3, interlace=1))
+    with pytest.raises(ValueError):
+        imaging.decode_png(b"\xff\xd8\xff\xe0 not a PNG")
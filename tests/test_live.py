@@ -0,0 +1,69 @@
+class FakeJob:
+    def __init__(self, name):
+        self.name = name
+        self.cancelled = False
+        self.finished = False
+        self.state = None
+
+    def cancel(self):
+        self.cancelled = True
+
+def test_generates_once_the_state_has_settled(addon):
+    session = addon.live.LiveSession(delay=0.5)
+    assert not session.observe("a", now=0.0)
+    assert not session.observe("a", now=0.4)
+    # Each edit restarts the wait
+    assert not session.observe("b", now=0.45)
+    assert not session.observe("b", now=0.9)
+    assert session.observe("b", now=1.0)
+
+    session.offer(FakeJob(1))
+    assert not session.observe("b", now=5.0)
+    session.observe("a", now=5.0)
+    assert session.observe("a", now=5.5)
+
+def test_skipped_state_is_not_generated_again(addon):
+    session = addon.live.LiveSession(delay=0.0)
+    assert session.observe("a", now=0.0)
+    session.skip()
+    assert not session.observe("a", now=1.0)
+
+def test_newest_job_wins(addon):
+    session = addon.live.LiveSession(delay=0.0)
+    first, second, third = FakeJob(1), FakeJob(2), FakeJob(3)
+    assert session.offer(first) is first
+
+    # A newer job cancels the running one and waits for it to wind down
+    assert session.offer(second) is None
+    assert first.cancelled
+    assert session.next_job() is None
+
+    # A still newer one replaces the pending job
+    assert session.offer(third) is None
+    assert second.cancelled and not third.cancelled
+    assert session.superseded == 2
+
+    first.finished = True
+    assert session.next_job() is third
+    assert session.next_job() is None
+    assert session.generated == 2
+
+def test_repeat_captures_of_a_live_job_are_dropped(addon):
+    live, scheduler = addon.live, addon.scheduler
+    session = live.LiveSession(delay=0.0)
+    job = FakeJob(1)
+    session.offer(job, "settings", b"\x10" * 12)
+    assert session.is_repeat("settings", b"\x12" * 12, tolerance=2)
+    assert not session.is_repeat("settings", b"\x13" * 12, tolerance=2)
+    assert not session.is_repeat("other", b"\x10" * 12, tolerance=2)
+
+    job.state = scheduler.FAILED
+    assert not session.is_repeat("settings", b"\x10" * 12, tolerance=2)
+
+def test_stop_cancels_running_and_pending_jobs(addon):
+    session = addon.live.LiveSession(delay=0.0)
+    first, second = FakeJob(1), FakeJob(2)
+    session.offer(first)
+    session.offer(second)
+    session.stop()
+    assert session.stopped and first.cancelled and second.cancelled
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+@pytest.fixture
+def metrics(addon, tmp_path, monkeypatch):
+    metrics = addon.metrics
+    metrics.close_store()
+    monkeypatch.setattr(metrics, "get_metrics_path", lambda: str(tmp_path / "metrics.sqlite"))
+    yield metrics
+    metrics.close_store()
+
+def test_store_loads_once_off_the_calling_thread(metrics):
+    scheduled = []
+    assert metrics.loaded_store(scheduled.append) is None
+    assert metrics.loaded_store(scheduled.append) is None
+    assert metrics.sample_count() is None
+    assert len(scheduled) == 1
+
+    scheduled[0]()
+    store = metrics.loaded_store(scheduled.append)
+    assert store is metrics.get_store()
+    assert metrics.sample_count() == 0
+    assert len(scheduled) == 1
+
+def test_lookups_do_not_wait_for_a_commit(metrics):
+    store = metrics.get_store()
+    for _ in range(metrics.MIN_SAMPLES):
+        store.record({"GENERATING": 2.0}, "http://endpoint", 1024, 1024, 0)
+
+    estimates = []
+    with store._db_lock:
+        # A commit in progress holds the connection, not the histograms
+        reader = threading.Thread(target=lambda: estimates.append(
+            store.estimate("GENERATING", "http://endpoint", 1024, 1024, 0)))
+        reader.start()
+        reader.join(timeout=1.0)
+        assert not reader.is_alive()
+    assert estimates[0] == pytest.approx(2.0, rel=0.1)
+
+def test_histogram_quantiles_stay_within_a_bucket(addon):
+    histogram = addon.metrics.Histogram()
+    assert histogram.quantile(0.5) is None and histogram.mean is None
+    for seconds in range(1, 101):
+        histogram.add(float(seconds))
+    histogram.add(0.0) # Lands in the first bucket rather than failing the log
+    assert histogram.count == 101
+    assert histogram.mean == pytest.approx(5050 / 101)
+    growth = addon.metrics.BUCKET_GROWTH
+    for q, expected in ((0.5, 50.0), (0.9, 90.0), (0.99, 99.0)):
+        assert expected / growth <= histogram.quantile(q) <= expected * growth
+
+def test_estimates_fall_back_to_coarser_groups(metrics):
+    store = metrics.get_store()
+    for _ in range(metrics.MIN_SAMPLES):
+        store.record({"GENERATING": 10.0}, "http://a", 1024, 1024, 0)
+        store.record({"GENERATING": 40.0}, "http://b", 1024, 1024, 0)
+    assert store.estimate("GENERATING", "http://a", 1024, 1024, 0) == pytest.approx(10.0, rel=0.15)
+    # No samples at 4K or for this payload: the endpoint's overall history
+    assert store.estimate("GENERATING", "http://b", 3840, 2160, 1 << 20) == pytest.approx(40.0, rel=0.15)
+    # Unknown endpoint: every endpoint's history
+    assert 10.0 < store.estimate("GENERATING", "http://c", 1024, 1024, 0) < 40.0
+    assert store.estimate("DOWNLOADING", "http://a", 1024, 1024, 0) is None
+
+def test_eta_from_stage_medians(metrics):
+    store = metrics.get_store()
+    job = ("http://endpoint", 1024, 1024, 0)
+    assert store.eta("QUEUED", 0.0, {}, *job) is None
+    for _ in range(metrics.MIN_SAMPLES):
+        store.record({"UPLOADING": 1.0, "GENERATING": 10.0, "DOWNLOADING": 2.0}, *job)
+
+    remaining, fraction = store.eta("QUEUED", 0.0, {}, *job)
+    assert remaining == pytest.approx(13.0, rel=0.15) and fraction == 0.0
+
+    remaining, fraction = store.eta("GENERATING", 4.0, {"UPLOADING": 1.0}, *job)
+    assert remaining == pytest.approx(8.0, rel=0.15)
+    assert fraction == pytest.approx(5.0 / 13.0, rel=0.15)
+
+    # Running over: a little is always left, never a negative time
+    remaining, fraction = store.eta("GENERATING", 30.0, {"UPLOADING": 1.0}, *job)
+    assert 2.0 < remaining < 4.0 and fraction < 1.0
+    assert store.eta("DONE", 0.0, {}, *job) is None
@@ -0,0 +1,35 @@
+import types
+
+class FakeImage(dict):
+    """
+    Stands in for a bpy Image: a name, ID properties and a few flags.
+    """
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.filepath = ""
+        self.use_fake_user = False
+
+class FakeImages(list):
+    def get(self, name):
+        return next((img for img in self if img.name == name), None)
+
+def test_history_is_kept_per_camera(addon, monkeypatch):
+    utils = addon.utils
+    images = FakeImages()
+    monkeypatch.setattr(utils, "bpy", types.SimpleNamespace(data=types.SimpleNamespace(images=images)))
+    cameras = [types.SimpleNamespace(name=name) for name in ("CamA", "CamB")]
+
+    # Three results on each camera, interleaved as concurrent renders finish
+    for _ in range(3):
+        for camera in cameras:
+            img = FakeImage(utils.overlay_names(camera)[2])
+            images.append(img)
+            utils._retire_overlay_image(img, history_size=2)
+
+    for camera in cameras:
+        owner = utils.overlay_names(camera)[2]
+        history = utils.overlay_history(owner)
+        assert [img["air_history_index"] for img in history] == [3, 2]
+        assert all(img.name.endswith(f"@{camera.name}") for img in history)
+    assert len(utils.overlay_history()) == 4
@@ -0,0 +1,76 @@
+import threading
+import time
+
+class FakeCapture:
+    def __init__(self, frame):
+        self.frame = frame
+        self.cleaned = False
+
+    def request_kwargs(self):
+        return {"image_bytes": b"frame %d" % self.frame}
+
+    def cleanup(self):
+        self.cleaned = True
+
+def wait_until_finished(batch, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not batch.is_finished():
+        assert time.monotonic() < deadline, "the pipeline hung"
+        time.sleep(0.02)
+
+def test_frames_flow_through_and_failures_stay_per_frame(addon, monkeypatch, tmp_path):
+    pipeline, client = addon.pipeline, addon.client
+
+    def send_api_request(api_key, prompt, image_bytes=None, **kwargs):
+        if image_bytes == b"frame 3":
+            raise RuntimeError("generation failed")
+        return image_bytes.decode('ascii')
+
+    def download_image(url, path):
+        with open(path, "wb") as f:
+            f.write(url.encode('ascii'))
+
+    monkeypatch.setattr(client, "send_api_request", send_api_request)
+    monkeypatch.setattr(client, "download_image", download_image)
+    batch = pipeline.BatchPipeline("key", "prompt", 0.75, 64, 64, str(tmp_path), generate_workers=2)
+    captures = [FakeCapture(frame) for frame in range(1, 6)]
+    for capture in captures:
+        batch.put_capture(capture.frame, capture)
+    batch.close()
+    wait_until_finished(batch)
+
+    assert sorted(batch.completed) == [1, 2, 4, 5]
+    assert list(batch.failed) == [3]
+    assert all(capture.cleaned for capture in captures)
+    with open(pipeline.output_path(str(tmp_path), 2), "rb") as f:
+        assert f.read() == b"frame 2"
+    # A rerun only picks up the frame that failed
+    assert pipeline.pending_frames(str(tmp_path), range(1, 6)) == [3]
+    assert not list(tmp_path.glob("*.part"))
+
+def test_cancel_drops_queued_frames(addon, monkeypatch, tmp_path):
+    pipeline, client = addon.pipeline, addon.client
+    sending, release = threading.Event(), threading.Event()
+    sent = []
+
+    def send_api_request(api_key, prompt, image_bytes=None, **kwargs):
+        sent.append(image_bytes)
+        sending.set()
+        release.wait(5)
+        return "url"
+
+    monkeypatch.setattr(client, "send_api_request", send_api_request)
+    monkeypatch.setattr(client, "download_image", lambda url, path: open(path, "wb").close())
+    batch = pipeline.BatchPipeline("key", "prompt", 0.75, 64, 64, str(tmp_path), generate_workers=1, queue_size=4)
+    captures = [FakeCapture(frame) for frame in range(1, 4)]
+    for capture in captures:
+        batch.put_capture(capture.frame, capture)
+    assert sending.wait(5)
+    batch.cancel()
+    release.set()
+    wait_until_finished(batch)
+
+    # The frame being generated is dropped, the queued ones are never sent
+    assert sent == [b"frame 1"]
+    assert not batch.completed and not list(tmp_path.iterdir())
+    assert all(capture.cleaned for capture in captures)
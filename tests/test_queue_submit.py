@@ -0,0 +1,164 @@
+import http.server
+import json
+import threading
+import time
+
+from benchmarks.fake_fal import FakeFalServer
+
+def test_to_queue_endpoint(addon):
+    client = addon.client
+    assert client.to_queue_endpoint("https://fal.run/fal-ai/flux/schnell") == "https://queue.fal.run/fal-ai/flux/schnell"
+    assert client.to_queue_endpoint("http://127.0.0.1:8000/google/nano-banana-pro") == "http://127.0.0.1:8000/google/nano-banana-pro"
+
+def test_queue_mode_job_reaches_the_result(addon, make_context, monkeypatch):
+    client, operators = addon.client, addon.operators
+    monkeypatch.setattr(addon.async_queue, "POLL_INITIAL", 0.05)
+    with FakeFalServer(latency=0.1, jitter=0.0, image_bytes=1024) as server:
+        monkeypatch.setattr(client, "MODEL_ENDPOINT", server.model_endpoint)
+        # The fake server's queue API lives under /queue rather than on queue.fal.run
+        monkeypatch.setattr(client, "to_queue_endpoint", server.queue_endpoint)
+        context = make_context(ai_submit_mode='QUEUE')
+        job = operators.AIRenderJob(context)
+        job.run()
+        deadline = time.monotonic() + 10
+        # Submitted, polled, then downloaded on a worker; done once the result waits for the main thread
+        while not job.success and job.error_msg is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+    assert job.error_msg is None
+    assert job.success
+    assert job.result_url == server.base_url + "/files/result.png"
+
+class ThrottlingQueueServer:
+    """
+    Queue API answering the first submit and the first status poll with 429
+    and a Retry-After of `retry_after` seconds.
+    """
+    def __init__(self, retry_after=0.3):
+        self.calls = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _throttle_first(self, kind):
+                server.calls.append(kind)
+                if server.calls.count(kind) == 1:
+                    self._send(429, {"detail": "slow down"}, {"Retry-After": str(retry_after)})
+                    return True
+                return False
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self._throttle_first("submit"):
+                    return
+                base = f"{server.base_url}/requests/1"
+                self._send(200, {"status_url": base + "/status", "response_url": base, "cancel_url": base + "/cancel"})
+
+            def do_GET(self):
+                if self.path.endswith("/status"):
+                    if self._throttle_first("status"):
+                        return
+                    return self._send(200, {"status": "COMPLETED"})
+                server.calls.append("result")
+                self._send(200, {"images": [{"url": server.base_url + "/result.png"}]})
+
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def test_queue_mode_honours_retry_after_and_retries(addon, monkeypatch):
+    async_queue, client, ratelimit = addon.async_queue, addon.client, addon.ratelimit
+    monkeypatch.setattr(async_queue, "POLL_INITIAL", 0.05)
+    ratelimit.reset()
+    server = ThrottlingQueueServer(retry_after=0.3)
+    queue_client = async_queue.QueueClient()
+    try:
+        start = time.monotonic()
+        future = queue_client.submit("key", "test", width=512, height=512, endpoint=server.base_url + "/queue",
+                                     retry_policy=client.RetryPolicy(3, base_delay=0.01))
+        assert future.result(timeout=10) == server.base_url + "/result.png"
+        elapsed = time.monotonic() - start
+    finally:
+        queue_client.close()
+        server.close()
+    assert server.calls == ["submit", "submit", "status", "status", "result"]
+    # The submit waited out the key's pause before going again, and so did the poll
+    assert elapsed >= 0.6
+    assert sum(stats["throttled"] for stats in ratelimit.stats()) == 2
+    ratelimit.reset()
+
+def test_queue_mode_shares_the_in_flight_limit_and_reuses_connections(addon, monkeypatch):
+    async_queue, client, scheduler = addon.async_queue, addon.client, addon.scheduler
+    monkeypatch.setattr(async_queue, "POLL_INITIAL", 0.05)
+    job_scheduler = scheduler.JobScheduler(num_workers=1, max_in_flight=2)
+    monkeypatch.setattr(scheduler, "_scheduler", job_scheduler)
+    queue_client = async_queue.QueueClient()
+    try:
+        with FakeFalServer(latency=0.3, jitter=0.0, image_bytes=1024) as server:
+            endpoint = server.queue_endpoint(server.model_endpoint)
+            start = time.monotonic()
+            futures = [queue_client.submit("key", "test", width=512, height=512, endpoint=endpoint) for _ in range(6)]
+            for future in futures:
+                future.result(timeout=10)
+            elapsed = time.monotonic() - start
+    finally:
+        queue_client.close()
+        job_scheduler.shutdown()
+    # Three rounds of two, not six at once
+    assert elapsed >= 0.9
+    stats = queue_client._pool.stats
+    assert stats["new_connections"] <= 2
+    assert stats["reused_connections"] > stats["new_connections"]
+
+def test_queued_requests_share_one_thread_and_cancel_on_the_server(addon, monkeypatch):
+    async_queue = addon.async_queue
+    monkeypatch.setattr(async_queue, "POLL_INITIAL", 0.05)
+    polling = set()
+    poll = async_queue.QueueClient._poll
+
+    async def recording_poll(self, handle, auth, lease):
+        polling.add(handle["request_id"])
+        return await poll(self, handle, auth, lease)
+
+    monkeypatch.setattr(async_queue.QueueClient, "_poll", recording_poll)
+    queue_client = async_queue.QueueClient(max_in_flight=32)
+    try:
+        with FakeFalServer(latency=30.0, jitter=0.0, image_bytes=1024) as server:
+            endpoint = server.queue_endpoint(server.model_endpoint)
+            threads_before = set(threading.enumerate())
+            futures = [queue_client.submit("key", "test", width=512, height=512, endpoint=endpoint) for _ in range(20)]
+            deadline = time.monotonic() + 10
+            # Until a request has its handle back there is nothing to cancel it by
+            while len(polling) < 20 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert len(server._queued) == 20
+            # Server handler threads come and go; the client adds none of its own
+            assert not [t for t in set(threading.enumerate()) - threads_before if t.name.startswith("AIRender")]
+
+            for future in futures:
+                future.cancel()
+            while server._queued and time.monotonic() < deadline:
+                time.sleep(0.02)
+            # Each cancelled request told the server to drop it and gave back its slot
+            assert not server._queued
+            while queue_client._in_flight._value < 32 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert queue_client._in_flight._value == 32
+    finally:
+        queue_client.close()
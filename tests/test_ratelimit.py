@@ -0,0 +1,56 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+KEY = "test-key-0001"
+
+@pytest.fixture
+def one_slot(addon):
+    """
+    One request at a time per key, and a queue client to wait on it from.
+    """
+    ratelimit = addon.ratelimit
+    ratelimit.reset()
+    ratelimit.configure(0, 1)
+    queue_client = addon.async_queue.QueueClient()
+    yield ratelimit, queue_client
+    queue_client.close()
+    ratelimit.reset()
+    ratelimit.configure()
+
+def in_flight(ratelimit):
+    return sum(stats["in_flight"] for stats in ratelimit.stats())
+
+def test_queue_requests_wait_for_a_key_without_a_thread_each(one_slot):
+    ratelimit, queue_client = one_slot
+    held = ratelimit.acquire(KEY)
+    threads_before = set(threading.enumerate())
+    waiting = [asyncio.run_coroutine_threadsafe(queue_client._acquire_lease(KEY), queue_client._loop)
+               for _ in range(20)]
+    time.sleep(0.3)
+    assert not any(future.done() for future in waiting)
+    # Threads of earlier tests may still be winding down; none may have started
+    assert set(threading.enumerate()) <= threads_before
+
+    held.__exit__(None, None, None)
+    pending = set(waiting)
+    while pending:
+        done, pending = concurrent.futures.wait(pending, timeout=2, return_when=concurrent.futures.FIRST_COMPLETED)
+        assert len(done) == 1
+        assert in_flight(ratelimit) == 1
+        done.pop().result().__exit__(None, None, None)
+    assert in_flight(ratelimit) == 0
+
+def test_cancelled_wait_holds_no_lease(one_slot):
+    ratelimit, queue_client = one_slot
+    held = ratelimit.acquire(KEY)
+    waiting = asyncio.run_coroutine_threadsafe(queue_client._acquire_lease(KEY), queue_client._loop)
+    time.sleep(0.15)
+    waiting.cancel()
+    held.__exit__(None, None, None)
+    time.sleep(0.3)
+    assert in_flight(ratelimit) == 0
+    ratelimit.acquire(KEY).__exit__(None, None, None)
@@ -0,0 +1,73 @@
+import pytest
+
+@pytest.fixture
+def routing(addon, monkeypatch):
+    """
+    A main backend with two fallbacks on their own endpoints, and fresh
+    latency, breaker and routing state.
+    """
+    client, backends = addon.client, addon.backends
+    for name in ("_latencies", "_breakers", "_route_fallbacks"):
+        monkeypatch.setattr(client, name, {})
+    monkeypatch.setattr(client, "_attempt_stats", dict(client._attempt_stats))
+
+    def make(name, nominal_latency, fallbacks=(), max_side=None):
+        backend = type(name, (backends.Backend,), {
+            "name": name, "label": name, "endpoint": f"http://127.0.0.1:1/{name}",
+            "edit_endpoint": f"http://127.0.0.1:1/{name}/edit", "nominal_latency": nominal_latency,
+            "fallbacks": fallbacks, "max_side": max_side,
+        })()
+        monkeypatch.setitem(backends._backends, name, backend)
+        return backend
+
+    make("fast", 4.0)
+    make("faster", 2.0)
+    make("main", 20.0, fallbacks=("fast", "faster"), max_side=2048)
+    return client
+
+def record(client, name, seconds, failures=0):
+    tracker = client.get_latency_tracker(f"http://127.0.0.1:1/{name}")
+    for _ in range(client.HEDGE_MIN_SAMPLES):
+        tracker.add(seconds)
+    for _ in range(failures):
+        tracker.add_failure()
+
+def chosen(client, fallback_after=30.0, width=1024, height=1024):
+    return client.choose_backend(False, width, height, "main", fallback_after).name
+
+def test_main_backend_is_kept_without_fallback(routing):
+    record(routing, "main", 120.0)
+    assert chosen(routing, fallback_after=None) == "main"
+    assert chosen(routing) == "faster"
+
+def test_unsupported_resolution_always_falls_back(routing, addon):
+    assert chosen(routing, fallback_after=None, width=4096) == "faster"
+    addon.backends._backends["fast"].max_side = addon.backends._backends["faster"].max_side = 2048
+    with pytest.raises(RuntimeError, match="No backend supports"):
+        chosen(routing, width=4096)
+
+def test_slow_main_backend_is_probed_while_falling_back(routing):
+    record(routing, "main", 60.0)
+    picks = [chosen(routing) for _ in range(2 * routing.ROUTE_PROBE_INTERVAL)]
+    assert picks.count("main") == 2
+    assert picks[routing.ROUTE_PROBE_INTERVAL - 1] == "main"
+    assert set(picks) == {"main", "faster"}
+    assert routing.attempt_stats()["fallbacks"] == len(picks) - 2
+
+def test_slow_main_backend_is_kept_when_nothing_is_faster(routing):
+    record(routing, "main", 40.0)
+    record(routing, "fast", 50.0)
+    record(routing, "faster", 45.0)
+    assert chosen(routing) == "main"
+
+def test_failing_backends_are_avoided(routing):
+    record(routing, "main", 1.0, failures=3 * routing.HEDGE_MIN_SAMPLES)
+    record(routing, "faster", 1.0, failures=2 * routing.HEDGE_MIN_SAMPLES)
+    # The main backend is fast but failing, and so is the faster fallback
+    assert chosen(routing) == "fast"
+
+    breaker = routing.get_breaker("http://127.0.0.1:1/fast")
+    for _ in range(routing.BREAKER_THRESHOLD):
+        breaker.record_failure()
+    # Everything is failing: the one expected to be quickest despite errors
+    assert chosen(routing) == "faster"
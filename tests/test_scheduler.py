@@ -0,0 +1,39 @@
+import threading
+import time
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_repeated_shrinks_keep_the_pool_at_size(addon):
+    scheduler = addon.scheduler.JobScheduler(num_workers=2)
+    release = threading.Event()
+    try:
+        # Both workers busy while the pool is resized up and down twice, as
+        # get_job_scheduler(scene, min_workers) does around every render
+        for _ in range(2):
+            scheduler.run_in_worker(release.wait)
+        for _ in range(2):
+            scheduler.configure(4, 4)
+            scheduler.configure(2, 4)
+        release.set()
+
+        ran = threading.Event()
+        scheduler.run_in_worker(ran.set)
+        assert ran.wait(2.0)
+        assert wait_for(lambda: len(scheduler._workers) == 2)
+        time.sleep(0.1)
+        assert len([w for w in scheduler._workers if w.is_alive()]) == 2
+    finally:
+        release.set()
+        scheduler.shutdown()
+
+def test_shutdown_stops_every_worker(addon):
+    scheduler = addon.scheduler.JobScheduler(num_workers=3)
+    workers = list(scheduler._workers)
+    scheduler.shutdown()
+    assert wait_for(lambda: not any(w.is_alive() for w in workers))
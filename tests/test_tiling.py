@@ -0,0 +1,53 @@
+import pytest
+
+def test_overlap_is_clamped_to_half_a_tile(addon):
+    tiling = addon.tiling
+    assert tiling.clamp_overlap(256, 512) == 128
+    assert tiling.clamp_overlap(1024, 128) == 128
+    # 256px tiles overlapping by 512 would otherwise step one pixel at a time
+    boxes = tiling.tile_grid(1024, 256, 256, 512)
+    assert [x for x, _, _, _ in boxes] == list(range(0, 769, 128))
+
+def test_too_many_tiles_fail_before_anything_is_requested(addon):
+    tiling = addon.tiling
+    with pytest.raises(RuntimeError, match="tiles"):
+        tiling.tile_grid(3840, 2160, 256, 512)
+    assert len(tiling.tile_grid(3840, 2160, 1024, 128)) <= tiling.MAX_TILES
+
+def test_grid_covers_the_image_with_the_requested_overlap(addon):
+    boxes = addon.tiling.tile_grid(1920, 1080, 768, 96)
+    xs = sorted({x for x, _, _, _ in boxes})
+    ys = sorted({y for _, y, _, _ in boxes})
+    assert len(boxes) == len(xs) * len(ys)
+    assert all((w, h) == (768, 768) for _, _, w, h in boxes)
+    assert xs[0] == ys[0] == 0
+    assert xs[-1] + 768 == 1920 and ys[-1] + 768 == 1080
+    assert all(b - a <= 768 - 96 for starts in (xs, ys) for a, b in zip(starts, starts[1:]))
+
+def test_image_smaller_than_a_tile_is_one_tile(addon):
+    assert addon.tiling.tile_grid(640, 480, 1024, 128) == [(0, 0, 640, 480)]
+
+def test_feather_weights_add_up_to_one(addon):
+    np = pytest.importorskip("numpy")
+    tiling = addon.tiling
+    boxes = tiling.tile_grid(1000, 700, 400, 64)
+    total = np.zeros((700, 1000), dtype=np.float32)
+    for (x, y, w, h), weights in zip(boxes, tiling.feather_weights(boxes)):
+        total[y:y + h, x:x + w] += weights
+    assert np.allclose(total, 1.0, atol=1e-5)
+
+def test_stitch_blends_seams_and_keeps_the_rest(addon):
+    np = pytest.importorskip("numpy")
+    tiling = addon.tiling
+    image = np.random.default_rng(0).random((300, 500, 4), dtype=np.float32)
+    boxes = tiling.tile_grid(500, 300, 200, 40)
+
+    # Tiles cut from one image stitch back into it
+    tiles = [image[y:y + h, x:x + w] for x, y, w, h in boxes]
+    assert np.allclose(tiling.stitch(tiles, boxes, 500, 300), image, atol=1e-5)
+
+    # Tiles that disagree meet in a ramp rather than a hard edge
+    flat = [np.full((h, w, 4), float(i % 2), dtype=np.float32) for i, (_, _, w, h) in enumerate(boxes)]
+    row = tiling.stitch(flat, boxes, 500, 300)[0, :, 0]
+    assert row[0] == 0.0 and 0.0 < row[boxes[1][0] + 5] < 1.0
+    assert np.all(np.abs(np.diff(row)) < 0.1)
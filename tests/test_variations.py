@@ -0,0 +1,14 @@
+def test_cancelled_variation_is_no_longer_pending(addon, make_context):
+    variations, operators = addon.variations, addon.operators
+    items = [variations.Variation(i, f"Seed {i}", "prompt", i) for i in range(2)]
+    session = variations.start_session(items, 16 / 9)
+    jobs = [operators.VariationJob(make_context(), session, item, None, None) for item in items]
+
+    jobs[0].cancel()
+    assert items[0].state == variations.CANCELLED
+    assert items[1].state == variations.PENDING
+    assert not session.finished
+
+    session.cancel()
+    assert items[1].state == variations.CANCELLED
+    assert session.finished